@@ -1,19 +1,32 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
 from app.config.app_config import Config  # Updated import
 from app.utils.logger import get_logger
+from app.web.admin_controller import router as admin_router
+from app.web.database_controller import router as database_router
+from app.web.metrics_controller import RequestMetricsMiddleware
+from app.web.metrics_controller import router as metrics_router
 from app.web.order_controller import router as order_router
+from app.web.processor_controller import router as processor_router
+from app.web.stream_controller import router as stream_router
 
 logger = get_logger("main")
 
 # Initialize FastAPI app
-app = FastAPI(title="Lemon Markets Orders API")
+app = FastAPI(title="Lemon Markets Orders API", default_response_class=ORJSONResponse)
 
 # Configure app with dependencies and handlers
 Config.configure(app)
 
 # Include routers
 app.include_router(order_router, prefix="/orders")
+app.include_router(processor_router, prefix="/processor")
+app.include_router(database_router, prefix="/database")
+app.include_router(stream_router)
+app.include_router(admin_router, prefix="/admin")
+app.include_router(metrics_router)
+app.add_middleware(RequestMetricsMiddleware)
 
 logger.info("FastAPI application initialized")
 
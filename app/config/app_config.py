@@ -1,15 +1,44 @@
+import hmac
 import os
 import sys
+from functools import partial
+from typing import Callable, Optional
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Header
+from sqlalchemy import create_engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
 
-from app.config.database import SessionLocal
+from app.config.database import (
+    SQLALCHEMY_DATABASE_URL,
+    AsyncSessionLocal,
+    SessionLocal,
+    engine,
+    get_db,
+    pool_stats,
+)
 from app.exception.global_handler import register_exception_handlers
+from app.exception.order_exception import AdminAccessDeniedException
 from app.mapper.order_mapper import OrderMapper
-from app.processor.order_book import OrderBook
+from app.processor.async_stock_exchange_processor import AsyncStockExchangeProcessor
+from app.processor.engine_client import EngineClient
+from app.processor.engine_pool import EnginePool
+from app.processor.order_book_loader import load_order_books
+from app.processor.order_book_registry import OrderBookRegistry
 from app.processor.stock_exchange_processor import StockExchangeProcessor
+from app.service.async_order_service import AsyncOrderService
+from app.service.broadcaster import Broadcaster
+from app.service.idempotency_key_cleaner import IdempotencyKeyCleaner
+from app.service.order_cache import OrderCache
 from app.service.order_service import OrderService
+from app.utils.cache import LRUCache
 from app.utils.logger import get_logger
+from app.utils.metrics import registry
+from app.utils.profiler import (
+    RequestProfiler,
+    RequestProfilerMiddleware,
+    SamplingProfiler,
+)
 
 # Add project root to sys.path for module resolution
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
@@ -17,13 +46,226 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".
 logger = get_logger("config")
 
 
-def get_order_service() -> OrderService:
+def env_flag(name: str, default: bool = False) -> bool:
     """
-    Dependency override to return the singleton OrderService.
+    Read a boolean flag from the environment.
     """
-    if order_service_singleton is None:
-        raise Exception("OrderService singleton not initialized")
-    return order_service_singleton
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Builds the OrderService of a request around its session, set by Config
+order_service_factory: Optional[Callable[[Session], OrderService]] = None
+
+
+def get_order_service(db: Session = Depends(get_db)) -> OrderService:
+    """
+    Dependency returning an OrderService bound to the request's own session.
+    """
+    if order_service_factory is None:
+        raise Exception("OrderService factory not initialized")
+    return order_service_factory(db)
+
+
+# Fans order events out to push subscribers, set by Config
+broadcaster: Optional[Broadcaster] = None
+
+
+def get_broadcaster() -> Broadcaster:
+    """
+    Dependency returning the broadcaster of order events.
+    """
+    if broadcaster is None:
+        raise Exception("Broadcaster not initialized")
+    return broadcaster
+
+
+# Diagnostics of the admin endpoints, set by Config
+profiler: Optional[SamplingProfiler] = None
+request_profiler: Optional[RequestProfiler] = None
+admin_token: Optional[str] = None
+
+
+def get_profiler() -> SamplingProfiler:
+    """
+    Dependency returning the sampling profiler.
+    """
+    if profiler is None:
+        raise Exception("Profiler not initialized")
+    return profiler
+
+
+def get_request_profiler() -> RequestProfiler:
+    """
+    Dependency returning the per-request profiler.
+    """
+    if request_profiler is None:
+        raise Exception("Request profiler not initialized")
+    return request_profiler
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Dependency guarding admin endpoints, which are disabled without ADMIN_TOKEN.
+    """
+    if not admin_token:
+        raise AdminAccessDeniedException("Admin endpoints are disabled")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, admin_token):
+        raise AdminAccessDeniedException("Invalid admin token")
+
+
+def create_processor(use_asyncio: bool = False) -> StockExchangeProcessor:
+    """
+    Build the matching processor and its order books from the environment.
+
+    With `use_asyncio` orders queued in memory are matched by the asyncio
+    processor, which has to be started on the event loop.
+    """
+    order_books = OrderBookRegistry()
+    warm_start = env_flag("WARM_START", default=True)
+    chunk_size = int(
+        os.getenv("WARM_START_CHUNK_SIZE", 10000)
+    )  # Configurable via environment variable
+    engine_processes = int(
+        os.getenv("ENGINE_PROCESSES", 0)
+    )  # Configurable via environment variable, 0 matches in this process
+    engine_pool = None
+    open_orders = []  # unmatched orders found by the warm start
+    if engine_processes > 0:
+        # Each engine process warm starts the books of its own instruments
+        engine_pool = EnginePool(
+            engine_processes,
+            partial(create_engine, SQLALCHEMY_DATABASE_URL),
+            warm_start=warm_start,
+            warm_start_chunk_size=chunk_size,
+        )
+    elif warm_start:
+        # Rebuild the books from resting orders before the processor starts
+        try:
+            stats = load_order_books(engine, order_books, chunk_size=chunk_size)
+            open_orders = stats.open_orders
+        except SQLAlchemyError as e:
+            logger.error("Order book warm start failed: %s", e)
+    max_retries = int(
+        os.getenv("MAX_RETRIES", 3)
+    )  # Configurable via environment variable
+    retry_delay = float(
+        os.getenv("RETRY_DELAY", 5.0)
+    )  # Configurable via environment variable
+    max_retry_delay = float(
+        os.getenv("MAX_RETRY_DELAY", 60.0)
+    )  # Configurable via environment variable
+    per_instrument_lanes = env_flag(
+        "PER_INSTRUMENT_LANES"
+    )  # Configurable via environment variable
+    max_lanes = int(os.getenv("MAX_LANES", 8))  # Configurable via environment variable
+    max_submit_concurrency = int(
+        os.getenv("MAX_SUBMIT_CONCURRENCY", 4)
+    )  # Configurable via environment variable
+    batch_size = int(
+        os.getenv("PROCESSOR_BATCH_SIZE", 50)
+    )  # Configurable via environment variable
+    batch_window = float(
+        os.getenv("PROCESSOR_BATCH_WINDOW", 0.005)
+    )  # Configurable via environment variable
+    outbox_poll_interval = float(
+        os.getenv("OUTBOX_POLL_INTERVAL", 0.05)
+    )  # Configurable via environment variable
+    outbox_lease = float(
+        os.getenv("OUTBOX_LEASE_SECONDS", 60.0)
+    )  # Configurable via environment variable
+    max_queue_depth = int(
+        os.getenv("MAX_QUEUE_DEPTH", 0)
+    )  # Configurable via environment variable, 0 disables admission control
+    durable_queue = env_flag("DURABLE_QUEUE")  # Configurable via environment variable
+    if use_asyncio and not durable_queue and engine_pool is None:
+        processor = AsyncStockExchangeProcessor(
+            session_factory=AsyncSessionLocal,
+            order_books=order_books,
+            max_retries=max_retries,
+            retry_delay=retry_delay,
+            max_retry_delay=max_retry_delay,
+            max_submit_concurrency=max_submit_concurrency,
+            batch_size=batch_size,
+            batch_window=batch_window,
+            max_queue_depth=max_queue_depth,
+        )
+    else:
+        processor = StockExchangeProcessor(
+            session_factory=SessionLocal,
+            order_books=order_books,
+            max_retries=max_retries,
+            retry_delay=retry_delay,
+            max_retry_delay=max_retry_delay,
+            per_instrument_lanes=per_instrument_lanes,
+            max_lanes=max_lanes,
+            max_submit_concurrency=max_submit_concurrency,
+            batch_size=batch_size,
+            batch_window=batch_window,
+            durable_queue=durable_queue,
+            outbox_poll_interval=outbox_poll_interval,
+            outbox_lease=outbox_lease,
+            max_queue_depth=max_queue_depth,
+            engine_pool=engine_pool,
+        )
+    # Match the orders that were accepted but not processed before the restart
+    for order_id, instrument in open_orders:
+        processor.enqueue_id(order_id, instrument)
+    return processor
+
+
+def register_gauges(processor, cache: OrderCache, broadcaster: Broadcaster):
+    """
+    Expose the live state of the pipeline at /metrics, read at scrape time.
+    """
+    registry.gauge(
+        "order_queue_depth",
+        "Accepted orders waiting to be processed",
+        callback=lambda: processor.stats().get("queue_depth", 0),
+    )
+    registry.gauge(
+        "order_queue_lag_seconds",
+        "Seconds the oldest waiting order has been queued",
+        callback=lambda: processor.stats().get("queue_lag_seconds", 0),
+    )
+    registry.gauge(
+        "order_retry_backlog",
+        "Orders waiting for their placement to be retried",
+        callback=lambda: processor.stats().get("retry_backlog", 0),
+    )
+    order_books = getattr(processor, "order_books", None)
+    if order_books is not None:
+        # With the engine pool the books live in the engine processes
+        registry.gauge(
+            "order_book_depth",
+            "Orders resting in the book",
+            ("instrument", "side"),
+            callback=lambda: {
+                (instrument, side): count
+                for instrument, depth in order_books.depth().items()
+                for side, count in zip(("buy", "sell"), depth)
+            },
+        )
+    registry.gauge(
+        "order_cache_hit_ratio",
+        "Share of status reads served from the order cache",
+        callback=lambda: cache.stats()["hit_ratio"],
+    )
+    registry.gauge(
+        "push_subscribers",
+        "Connected WebSocket and SSE subscribers",
+        callback=lambda: broadcaster.stats()["subscribers"],
+    )
+    registry.gauge(
+        "db_pool_checked_out",
+        "Database connections in use",
+        ("pool",),
+        callback=lambda: {
+            (name,): stats["checked_out"] for name, stats in pool_stats().items()
+        },
+    )
 
 
 class Config:
@@ -36,26 +278,125 @@ class Config:
 
         # Initialize dependencies
         mapper = OrderMapper()
-        order_book = OrderBook()
-        max_retries = int(
-            os.getenv("MAX_RETRIES", 3)
+        engine_socket = os.getenv(
+            "ENGINE_SOCKET"
         )  # Configurable via environment variable
-        retry_delay = float(
-            os.getenv("RETRY_DELAY", 5.0)
+        use_asyncio = env_flag("ASYNC_DB")  # Configurable via environment variable
+        if engine_socket:
+            # Matching runs in the shared engine process (python -m app.engine)
+            processor = EngineClient(engine_socket)
+        else:
+            processor = create_processor(use_asyncio)
+        if isinstance(processor, AsyncStockExchangeProcessor):
+            app.add_event_handler("startup", processor.start)
+        durable_queue = env_flag(
+            "DURABLE_QUEUE"
         )  # Configurable via environment variable
-        processor = StockExchangeProcessor(
-            session_factory=SessionLocal,
-            order_book=order_book,
-            max_retries=max_retries,
-            retry_delay=retry_delay,
-        )
+        retry_after = int(
+            os.getenv("QUEUE_FULL_RETRY_AFTER", 1)
+        )  # Configurable via environment variable
+        max_batch_size = int(
+            os.getenv("MAX_BATCH_SIZE", 1000)
+        )  # Configurable via environment variable
+        cache_size = int(
+            os.getenv("ORDER_CACHE_SIZE", 10000)
+        )  # Configurable via environment variable
+        cache_ttl = float(
+            os.getenv("ORDER_CACHE_TTL", 5.0)
+        )  # Configurable via environment variable
+        cache = OrderCache(max_size=cache_size, ttl=cache_ttl)
+        export_chunk_size = int(
+            os.getenv("EXPORT_CHUNK_SIZE", 1000)
+        )  # Configurable via environment variable
+        # Order statuses are dropped from the cache as the processor changes them
+        processor.add_listener(cache.on_order_events)
+        broadcast_buffer = int(
+            os.getenv("BROADCAST_BUFFER_SIZE", 256)
+        )  # Configurable via environment variable
+        idempotency_cache_size = int(
+            os.getenv("IDEMPOTENCY_CACHE_SIZE", 10000)
+        )  # Configurable via environment variable
+        idempotency_cache_ttl = float(
+            os.getenv("IDEMPOTENCY_CACHE_TTL", 86400)
+        )  # Configurable via environment variable
+        # Repeats are answered from memory, older keys from their table
+        idempotency_cache = LRUCache(idempotency_cache_size, idempotency_cache_ttl)
+        idempotency_key_ttl = float(
+            os.getenv("IDEMPOTENCY_KEY_TTL", 86400)
+        )  # Configurable via environment variable
+        idempotency_cleanup_interval = float(
+            os.getenv("IDEMPOTENCY_CLEANUP_INTERVAL", 3600)
+        )  # Configurable via environment variable, 0 keeps expired keys
+        if idempotency_cleanup_interval > 0:
+            IdempotencyKeyCleaner(
+                SessionLocal, interval=idempotency_cleanup_interval
+            ).start()
+        global broadcaster
+        broadcaster = Broadcaster(max_buffer=broadcast_buffer)
+        # Status changes are pushed to WebSocket and SSE subscribers
+        processor.add_listener(broadcaster.publish)
+        register_gauges(processor, cache, broadcaster)
 
-        # Initialize OrderService singleton
-        global order_service_singleton
-        order_service_singleton = OrderService(
-            db=SessionLocal(), mapper=mapper, processor=processor
-        )
+        global admin_token, profiler, request_profiler
+        admin_token = os.getenv(
+            "ADMIN_TOKEN"
+        )  # Configurable via environment variable, unset disables /admin
+        profile_interval = float(
+            os.getenv("PROFILE_INTERVAL", 0.005)
+        )  # Configurable via environment variable
+        profile_output = os.getenv(
+            "PROFILE_OUTPUT"
+        )  # Configurable via environment variable
+        profile_seconds = float(
+            os.getenv("PROFILE_SECONDS", 0)
+        )  # Configurable via environment variable, 0 starts no window
+        profile_request_every = int(
+            os.getenv("PROFILE_REQUEST_EVERY", 0)
+        )  # Configurable via environment variable, 0 profiles no requests
+        profiler = SamplingProfiler(interval=profile_interval, output=profile_output)
+        if profile_seconds > 0:
+            # Profile startup and the first traffic without an admin call
+            profiler.start(profile_seconds)
+        request_profiler = RequestProfiler(every=profile_request_every)
+        app.add_middleware(RequestProfilerMiddleware, profiler=request_profiler)
+
+        # Services share the mapper and processor, sessions are per request
+        global order_service_factory
+        if use_asyncio:
+            # Requests await their database I/O instead of blocking the loop,
+            # the async service opens its own session per call
+            async_service = AsyncOrderService(
+                session_factory=AsyncSessionLocal,
+                mapper=mapper,
+                processor=processor,
+                outbox=durable_queue,
+                retry_after=retry_after,
+                max_batch_size=max_batch_size,
+                cache=cache,
+                broadcaster=broadcaster,
+                idempotency_cache=idempotency_cache,
+                idempotency_key_ttl=idempotency_key_ttl,
+                export_chunk_size=export_chunk_size,
+            )
+
+            def order_service_factory(db: Session) -> AsyncOrderService:
+                return async_service
+
+        else:
+            order_service_factory = partial(
+                OrderService,
+                mapper=mapper,
+                processor=processor,
+                outbox=durable_queue,
+                retry_after=retry_after,
+                max_batch_size=max_batch_size,
+                cache=cache,
+                broadcaster=broadcaster,
+                idempotency_cache=idempotency_cache,
+                idempotency_key_ttl=idempotency_key_ttl,
+                export_chunk_size=export_chunk_size,
+            )
 
         # Override dependency
         app.dependency_overrides[OrderService] = get_order_service
-        logger.info("OrderService singleton initialized and injected")
+        logger.info("OrderService factory initialized and injected")
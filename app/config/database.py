@@ -2,8 +2,11 @@ import os
 from typing import Generator
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Session, scoped_session, sessionmaker
 
+from app.config.pool import TimedAsyncAdaptedQueuePool, TimedQueuePool
+
 # Database configuration from environment variables (or defaults)
 db_host = os.environ.get("DB_HOST", "localhost")
 db_user = os.environ.get("DB_USER", "root")
@@ -15,21 +18,58 @@ SQLALCHEMY_DATABASE_URL = (
     f"mysql+mysqlconnector://{db_user}:{db_password}@{db_host}/{db_name}"
 )
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_size=5, max_overflow=10)
+# Connection pool configuration, shared by the sync and the async engine
+pool_options = dict(
+    pool_size=int(os.environ.get("DB_POOL_SIZE", 5)),
+    max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+    # Seconds to wait for a free connection before giving up
+    pool_timeout=float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+    # Replace connections before MySQL's wait_timeout closes them server side
+    pool_recycle=int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+    # Test connections on checkout so a dropped one is replaced, not handed out
+    pool_pre_ping=os.environ.get("DB_POOL_PRE_PING", "true").lower()
+    in ("1", "true", "yes", "on"),
+)
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, poolclass=TimedQueuePool, **pool_options
+)
+SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Use scoped_session to ensure thread safety
-SessionLocal = scoped_session(
-    sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = scoped_session(SessionFactory)
+
+# Same database through aiomysql for the asyncio path (ASYNC_DB)
+ASYNC_SQLALCHEMY_DATABASE_URL = (
+    f"mysql+aiomysql://{db_user}:{db_password}@{db_host}/{db_name}"
+)
+
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    poolclass=TimedAsyncAdaptedQueuePool,
+    **pool_options,
+)
+# AsyncSessions must not be shared between concurrent tasks, take one per unit
+# of work. Objects stay loaded after commit, lazy loads cannot be awaited.
+AsyncSessionLocal = sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
 )
 
 
 def get_db() -> Generator[Session, None, None]:
     """
-    Get a database session.  This function uses a scoped session, which is
-    thread-safe.
+    Get a database session for one request. The session checks a connection
+    out of the pool on first use and returns it when the request is done.
     """
-    db = SessionLocal()
+    db = SessionFactory()
     try:
         yield db
     finally:
         db.close()
-        SessionLocal.remove()
+
+
+def pool_stats() -> dict:
+    """Checkout wait metrics and usage of the connection pools"""
+    return {
+        "sync": engine.pool.metrics.snapshot(engine.pool),
+        "async": async_engine.pool.metrics.snapshot(async_engine.pool),
+    }
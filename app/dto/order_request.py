@@ -1,8 +1,9 @@
+from datetime import datetime
 from typing import Optional
 
 from pydantic import BaseModel, Field, condecimal, conint, constr, root_validator
 
-from app.dto.types import OrderSide, OrderType
+from app.dto.types import OrderSide, OrderStatus, OrderType
 
 
 class CreateOrderModel(BaseModel):
@@ -21,3 +22,13 @@ class CreateOrderModel(BaseModel):
         if values.get("type_") == OrderType.LIMIT and not values.get("limit_price"):
             raise ValueError("Attribute `limit_price` is required for type `limit`")
         return values
+
+
+class OrderFilter(BaseModel):
+    """Query filters of the order listing and exports, all optional"""
+
+    instrument: Optional[constr(min_length=12, max_length=12)]  # type: ignore
+    status: Optional[OrderStatus]
+    side: Optional[OrderSide]
+    created_from: Optional[datetime]  # inclusive
+    created_to: Optional[datetime]  # exclusive
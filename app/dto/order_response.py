@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -11,3 +11,46 @@ class OrderResponse(BaseModel):
     instrument: str
     limit_price: Optional[float]
     quantity: int
+
+    @classmethod
+    def from_mapped(cls, values: dict) -> "OrderResponse":
+        """Build from OrderMapper output, whose values are typed already, unvalidated"""
+        fields = dict(values)
+        fields["type_"] = fields.pop("type")
+        return cls.construct(**fields)
+
+
+class OrderSummaryResponse(OrderResponse):
+    """Listed order, its quantity is what is left unfilled"""
+
+    status: str
+
+
+class OrderPageResponse(BaseModel):
+    items: List[OrderSummaryResponse]
+    # Pass as `after` to get the next page, None on the last page
+    next_cursor: Optional[int]
+
+
+class BatchOrderResult(BaseModel):
+    index: int  # position of the order in the submitted batch
+    order: Optional[OrderResponse]
+    errors: Optional[List[str]]
+
+
+class BatchOrderResponse(BaseModel):
+    accepted: int
+    rejected: int
+    results: List[BatchOrderResult]
+
+
+class OrderFillResponse(BaseModel):
+    matched_quantity: int
+    matched_at: str
+
+
+class OrderStatusResponse(OrderResponse):
+    status: str
+    filled_quantity: int
+    remaining_quantity: int
+    fills: List[OrderFillResponse]
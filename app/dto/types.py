@@ -15,6 +15,20 @@ class OrderType(Enum):
     LIMIT = "limit"
 
 
+class OrderStatus(Enum):
+    OPEN = "OPEN"
+    SUBMITTED = "SUBMITTED"
+    PARTIAL = "PARTIAL"
+    MATCHED = "MATCHED"
+    FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
+
+
+class ExportFormat(Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
 class Order(BaseModel):
     # id generated by the database
     id_: str = Field(..., alias="id")
@@ -0,0 +1,32 @@
+import os
+
+from app.config.app_config import create_processor
+from app.processor.engine_server import EngineServer
+from app.utils.logger import get_logger
+
+logger = get_logger("engine")
+
+
+def run_engine():
+    """
+    Run the shared matching engine, owning the order books of all instruments.
+
+    API workers started with the same ENGINE_SOCKET forward their orders here
+    instead of matching them themselves.
+    """
+    path = os.getenv(
+        "ENGINE_SOCKET", "/tmp/order-engine.sock"
+    )  # Configurable via environment variable
+    processor = create_processor()
+    server = EngineServer(path, processor)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Matching engine interrupted")
+    finally:
+        server.server_close()
+        processor.stop()
+
+
+if __name__ == "__main__":
+    run_engine()
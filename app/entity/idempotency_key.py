@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+
+from app.entity.base import Base
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "order_idempotency_keys"
+    # Idempotency-Key header of the request that created the order
+    key = Column(String(128), primary_key=True)
+    # SHA-256 of the request body, a key may not be reused for another order
+    request_hash = Column(String(64), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    # Response returned to the original request, replayed for repeats
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.now, nullable=False, index=True)
+    # Kept at least until then, expired keys are deleted in the background
+    expires_at = Column(DateTime, nullable=False, index=True)
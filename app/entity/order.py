@@ -1,6 +1,15 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Float, Integer, String, UniqueConstraint
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    Numeric,
+    String,
+    UniqueConstraint,
+)
 
 from app.entity.base import Base
 
@@ -13,8 +22,16 @@ class Order(Base):
     type = Column(String(10), nullable=False)
     side = Column(String(10), nullable=False)
     instrument = Column(String(12), nullable=False)
-    limit_price = Column(Float, nullable=True)
+    limit_price = Column(Numeric(18, 2), nullable=True)
+    # Limit price in integer ticks of the instrument, used for matching
+    limit_price_ticks = Column(BigInteger, nullable=True)
     quantity = Column(Integer, nullable=False)
     status = Column(String(10), default="OPEN", nullable=False)
 
-    __table_args__ = (UniqueConstraint("order_id", name="uq_order_id"),)
+    __table_args__ = (
+        UniqueConstraint("order_id", name="uq_order_id"),
+        # Keyset pagination seeks by id within the listing filters
+        Index("ix_orders_instrument_id", "instrument", "id"),
+        Index("ix_orders_status_id", "status", "id"),
+        Index("ix_orders_created_at", "created_at"),
+    )
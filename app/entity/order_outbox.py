@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, String
+
+from app.entity.base import Base
+
+
+class OrderOutbox(Base):
+    __tablename__ = "order_outbox"
+    # SQLite only autoincrements INTEGER primary keys
+    id = Column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    )
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    instrument = Column(String(12), nullable=False)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    # Not claimable before this time, used to delay retries
+    available_at = Column(DateTime, default=datetime.now, nullable=False, index=True)
+    # Processor instance holding the entry and when its lease expires
+    claimed_by = Column(String(64), nullable=True)
+    claimed_until = Column(DateTime, nullable=True)
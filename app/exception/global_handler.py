@@ -1,7 +1,18 @@
 from fastapi import Request, status
 from fastapi.responses import JSONResponse
 
-from app.exception.order_exception import OrderException
+from app.exception.order_exception import (
+    AdminAccessDeniedException,
+    IdempotencyKeyReusedException,
+    InvalidOrderBatchException,
+    InvalidPriceException,
+    OrderBatchTooLargeException,
+    OrderException,
+    OrderNotFoundException,
+    OrderQueueFullException,
+    OrderStateException,
+    ProfilerRunningException,
+)
 from app.utils.logger import get_logger
 
 logger = get_logger("global_handler")
@@ -10,15 +21,106 @@ logger = get_logger("global_handler")
 async def order_exception_handler(
     request: Request, exc: OrderException
 ) -> JSONResponse:
-    logger.error(f"OrderException: {str(exc)}")
+    logger.error("OrderException: %s", exc)
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={"detail": {"message": str(exc)}},
     )
 
 
+async def order_not_found_handler(
+    request: Request, exc: OrderNotFoundException
+) -> JSONResponse:
+    logger.info("OrderNotFoundException: %s", exc)
+    return JSONResponse(
+        status_code=status.HTTP_404_NOT_FOUND,
+        content={"detail": {"message": str(exc)}},
+    )
+
+
+async def order_state_handler(
+    request: Request, exc: OrderStateException
+) -> JSONResponse:
+    logger.info("OrderStateException: %s", exc)
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": {"message": str(exc)}},
+    )
+
+
+async def invalid_price_handler(
+    request: Request, exc: InvalidPriceException
+) -> JSONResponse:
+    logger.info("InvalidPriceException: %s", exc)
+    return JSONResponse(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        content={"detail": {"message": str(exc)}},
+    )
+
+
+async def order_queue_full_handler(
+    request: Request, exc: OrderQueueFullException
+) -> JSONResponse:
+    logger.warning("OrderQueueFullException: %s", exc)
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": {"message": str(exc)}},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+async def invalid_order_batch_handler(
+    request: Request, exc: InvalidOrderBatchException
+) -> JSONResponse:
+    logger.info("InvalidOrderBatchException: %s", exc)
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={"detail": {"message": str(exc)}},
+    )
+
+
+async def order_batch_too_large_handler(
+    request: Request, exc: OrderBatchTooLargeException
+) -> JSONResponse:
+    logger.info("OrderBatchTooLargeException: %s", exc)
+    return JSONResponse(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        content={"detail": {"message": str(exc)}},
+    )
+
+
+async def idempotency_key_reused_handler(
+    request: Request, exc: IdempotencyKeyReusedException
+) -> JSONResponse:
+    logger.info("IdempotencyKeyReusedException: %s", exc)
+    return JSONResponse(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        content={"detail": {"message": str(exc)}},
+    )
+
+
+async def admin_access_denied_handler(
+    request: Request, exc: AdminAccessDeniedException
+) -> JSONResponse:
+    logger.warning("AdminAccessDeniedException: %s", exc)
+    return JSONResponse(
+        status_code=status.HTTP_403_FORBIDDEN,
+        content={"detail": {"message": str(exc)}},
+    )
+
+
+async def profiler_running_handler(
+    request: Request, exc: ProfilerRunningException
+) -> JSONResponse:
+    logger.info("ProfilerRunningException: %s", exc)
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": {"message": str(exc)}},
+    )
+
+
 async def generic_exception_handler(request: Request, exc: Exception) -> JSONResponse:
-    logger.error(f"Unexpected error: {str(exc)}", exc_info=True)
+    logger.error("Unexpected error: %s", exc, exc_info=True)
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={"detail": {"message": "Unexpected server error"}},
@@ -27,4 +129,17 @@ async def generic_exception_handler(request: Request, exc: Exception) -> JSONRes
 
 def register_exception_handlers(app):
     app.add_exception_handler(OrderException, order_exception_handler)
+    app.add_exception_handler(OrderNotFoundException, order_not_found_handler)
+    app.add_exception_handler(OrderStateException, order_state_handler)
+    app.add_exception_handler(InvalidPriceException, invalid_price_handler)
+    app.add_exception_handler(OrderQueueFullException, order_queue_full_handler)
+    app.add_exception_handler(InvalidOrderBatchException, invalid_order_batch_handler)
+    app.add_exception_handler(
+        OrderBatchTooLargeException, order_batch_too_large_handler
+    )
+    app.add_exception_handler(
+        IdempotencyKeyReusedException, idempotency_key_reused_handler
+    )
+    app.add_exception_handler(AdminAccessDeniedException, admin_access_denied_handler)
+    app.add_exception_handler(ProfilerRunningException, profiler_running_handler)
     app.add_exception_handler(Exception, generic_exception_handler)
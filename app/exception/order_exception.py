@@ -1,2 +1,40 @@
 class OrderException(Exception):
     pass
+
+
+class OrderNotFoundException(OrderException):
+    pass
+
+
+class OrderStateException(OrderException):
+    pass
+
+
+class InvalidPriceException(OrderException):
+    pass
+
+
+class OrderQueueFullException(OrderException):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class InvalidOrderBatchException(OrderException):
+    pass
+
+
+class OrderBatchTooLargeException(OrderException):
+    pass
+
+
+class IdempotencyKeyReusedException(OrderException):
+    pass
+
+
+class AdminAccessDeniedException(OrderException):
+    pass
+
+
+class ProfilerRunningException(OrderException):
+    pass
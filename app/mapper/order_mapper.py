@@ -1,11 +1,24 @@
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from pydantic import ValidationError
+
 from app.dto.order_request import CreateOrderModel
 from app.entity.order import Order
+from app.entity.order_matching import OrderMatching
+from app.exception.order_exception import InvalidPriceException
+from app.utils.id_generator import IdGenerator
 from app.utils.logger import get_logger
+from app.utils.price import TickSizes, tick_sizes
 
 logger = get_logger("order_mapper")
 
 
 class OrderMapper:
+    def __init__(self, tick_sizes: TickSizes = tick_sizes):
+        self.tick_sizes = tick_sizes
+
     def to_entity(self, order_request: CreateOrderModel, order_id: str) -> Order:
         """
         Maps an OrderRequest DTO to an Order entity.
@@ -16,36 +29,145 @@ class OrderMapper:
 
         Returns:
             An Order entity.
+
+        Raises:
+            InvalidPriceException: If the limit price is off the tick grid.
         """
+        limit_price_ticks = None
+        if order_request.limit_price is not None:
+            try:
+                limit_price_ticks = self.tick_sizes.to_ticks(
+                    order_request.instrument, order_request.limit_price
+                )
+            except ValueError as e:
+                raise InvalidPriceException(str(e)) from e
         db_order = Order(
             order_id=order_id,  # Use order_id
             type=order_request.type_.value,
             side=order_request.side.value,
             instrument=order_request.instrument,
             limit_price=order_request.limit_price,
+            limit_price_ticks=limit_price_ticks,
             quantity=order_request.quantity,
+            # Set up front so the response is known before the insert, in
+            # whole seconds like the DATETIME column so it reads back the same
+            created_at=datetime.now().replace(microsecond=0),
         )
-        logger.debug(f"Mapped OrderRequest to entity: {order_id}")
+        logger.debug("Mapped OrderRequest to entity: %s", order_id)
         return db_order
 
+    def request_hash(self, order_request: CreateOrderModel) -> str:
+        """
+        Fingerprints an order request, telling retries from other orders sent
+        with the same idempotency key.
+
+        Args:
+            order_request: The OrderRequest DTO.
+
+        Returns:
+            The hex SHA-256 of the request's canonical JSON.
+        """
+        canonical = order_request.json(by_alias=True, sort_keys=True)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def batch_to_entities(
+        self, items: list
+    ) -> Tuple[List[Tuple[int, Order]], Dict[int, List[str]]]:
+        """
+        Validates and maps the raw items of an order batch in one pass.
+
+        Args:
+            items: The decoded JSON objects of the batch.
+
+        Returns:
+            The (index, entity) pairs of the valid items and the validation
+            errors of the others by index.
+        """
+        entities = []
+        errors = {}
+        for index, item in enumerate(items):
+            try:
+                order_request = CreateOrderModel.parse_obj(item)
+                entities.append(
+                    (index, self.to_entity(order_request, IdGenerator.generate()))
+                )
+            except ValidationError as e:
+                errors[index] = [
+                    f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                    for error in e.errors()
+                ]
+            except InvalidPriceException as e:
+                errors[index] = [f"limit_price: {str(e)}"]
+        logger.debug("Mapped batch: %s valid, %s invalid", len(entities), len(errors))
+        return entities, errors
+
     def to_response(self, order: Order) -> dict:
         """
         Maps an Order entity to a response dictionary.
 
+        The values have the types of OrderResponse already, so responses can
+        be built with `OrderResponse.from_mapped` and serialized without
+        validating them again.
+
         Args:
             order: The Order entity.
 
         Returns:
             A dictionary representing the order.
         """
+        limit_price = order.limit_price
         response = {
             "id": order.order_id,  # Use order.order_id
             "created_at": order.created_at.isoformat(),
             "type": order.type,
             "side": order.side,
             "instrument": order.instrument,
-            "limit_price": order.limit_price,
+            "limit_price": float(limit_price) if limit_price is not None else None,
             "quantity": order.quantity,
         }
-        logger.debug(f"Mapped entity to response: {order.order_id}")
+        logger.debug("Mapped entity to response: %s", order.order_id)
+        return response
+
+    def to_summary_response(self, order: Order) -> dict:
+        """
+        Maps a listed Order entity to a response dictionary with its status.
+
+        Args:
+            order: The Order entity.
+
+        Returns:
+            A dictionary representing the order and its status.
+        """
+        response = self.to_response(order)
+        response["status"] = order.status
+        return response
+
+    def to_status_response(self, order: Order, fills: List[OrderMatching]) -> dict:
+        """
+        Maps an Order entity and its fills to a status response dictionary.
+
+        Args:
+            order: The Order entity, whose quantity is what is left unfilled.
+            fills: The order matchings the order took part in.
+
+        Returns:
+            A dictionary representing the order, its status and its fills.
+        """
+        filled_quantity = sum(fill.matched_quantity for fill in fills)
+        response = self.to_response(order)
+        response.update(
+            {
+                "quantity": order.quantity + filled_quantity,
+                "status": order.status,
+                "filled_quantity": filled_quantity,
+                "remaining_quantity": order.quantity,
+                "fills": [
+                    {
+                        "matched_quantity": fill.matched_quantity,
+                        "matched_at": fill.matched_at.isoformat(),
+                    }
+                    for fill in sorted(fills, key=lambda fill: fill.id)
+                ],
+            }
+        )
         return response
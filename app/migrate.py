@@ -1,9 +1,104 @@
 import os
 import time
+from decimal import Decimal
 
 import mysql.connector
 from mysql.connector import Error
 
+from app.utils.price import tick_sizes
+
+
+def column_exists(cursor, db_name, table, column):
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = %s AND table_name = %s AND column_name = %s
+        """,
+        (db_name, table, column),
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def migrate_fixed_point_prices(cursor, db_name):
+    """Move existing orders tables from FLOAT prices to DECIMAL and integer ticks"""
+    if column_exists(cursor, db_name, "orders", "limit_price_ticks"):
+        return
+    cursor.execute(
+        """
+        ALTER TABLE orders
+            MODIFY limit_price DECIMAL(18, 2),
+            ADD COLUMN limit_price_ticks BIGINT AFTER limit_price
+        """
+    )
+    # Convert with the runtime tick sizes, so migrated orders match the ticks
+    # the service computes for new orders of the same instrument
+    cursor.execute(
+        "SELECT id, instrument, limit_price FROM orders WHERE limit_price IS NOT NULL"
+    )
+    updates = []
+    for order_id, instrument, limit_price in cursor.fetchall():
+        try:
+            ticks = tick_sizes.to_ticks(instrument, limit_price)
+        except ValueError:
+            # Prices off the instrument's grid go to the nearest tick
+            ticks = round(Decimal(str(limit_price)) / tick_sizes.tick_size(instrument))
+            print(f"Rounded price {limit_price} of order {order_id} to {ticks} ticks")
+        updates.append((ticks, order_id))
+    cursor.executemany(
+        "UPDATE orders SET limit_price_ticks = %s WHERE id = %s", updates
+    )
+    print("Migrated orders to fixed-point prices")
+
+
+def add_idempotency_key_expiry(cursor, db_name):
+    """Give keys created before they expired the retention of new ones"""
+    if column_exists(cursor, db_name, "order_idempotency_keys", "expires_at"):
+        return
+    ttl = int(float(os.environ.get("IDEMPOTENCY_KEY_TTL", 86400)))
+    cursor.execute(
+        """
+        ALTER TABLE order_idempotency_keys
+            ADD COLUMN expires_at DATETIME NULL,
+            ADD INDEX ix_order_idempotency_keys_expires_at (expires_at)
+        """
+    )
+    cursor.execute(
+        """
+        UPDATE order_idempotency_keys
+        SET expires_at = created_at + INTERVAL %s SECOND
+        """,
+        (ttl,),
+    )
+    cursor.execute(
+        "ALTER TABLE order_idempotency_keys MODIFY expires_at DATETIME NOT NULL"
+    )
+    print("Added expiry to idempotency keys")
+
+
+def index_exists(cursor, db_name, table, index):
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = %s AND table_name = %s AND index_name = %s
+        """,
+        (db_name, table, index),
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def add_listing_indexes(cursor, db_name):
+    """Indexes behind the filtered, keyset-paginated order listing and exports"""
+    indexes = [
+        ("orders", "ix_orders_instrument_id", "instrument, id"),
+        ("orders", "ix_orders_status_id", "status, id"),
+        ("orders", "ix_orders_created_at", "created_at"),
+        ("order_matching", "ix_order_matching_matched_at", "matched_at"),
+    ]
+    for table, index, columns in indexes:
+        if not index_exists(cursor, db_name, table, index):
+            cursor.execute(f"CREATE INDEX {index} ON {table} ({columns})")
+            print(f"Created index {index}")
+
 
 def run_migrations():
     max_retries = 5
@@ -33,7 +128,8 @@ def run_migrations():
                     side VARCHAR(10) NOT NULL,
                     status VARCHAR(10) NOT NULL,
                     instrument VARCHAR(12) NOT NULL,
-                    limit_price FLOAT,
+                    limit_price DECIMAL(18, 2),
+                    limit_price_ticks BIGINT,
                     quantity INTEGER NOT NULL
                 );
                 """,
@@ -50,12 +146,41 @@ def run_migrations():
                     CHECK (matched_quantity > 0)
                 );
                 """,
+                """
+                CREATE TABLE IF NOT EXISTS order_outbox (
+                    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                    order_id INT NOT NULL,
+                    instrument VARCHAR(12) NOT NULL,
+                    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    available_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    claimed_by VARCHAR(64),
+                    claimed_until DATETIME,
+                    INDEX ix_order_outbox_available_at (available_at),
+                    FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE
+                );
+                """,
+                """
+                CREATE TABLE IF NOT EXISTS order_idempotency_keys (
+                    `key` VARCHAR(128) PRIMARY KEY,
+                    request_hash VARCHAR(64) NOT NULL,
+                    order_id INT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    expires_at DATETIME NOT NULL,
+                    INDEX ix_order_idempotency_keys_created_at (created_at),
+                    INDEX ix_order_idempotency_keys_expires_at (expires_at),
+                    FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE
+                );
+                """,
             ]
 
             # Execute migration queries
             for query in migration_queries:
                 cursor.execute(query)
                 print("Executed migration query successfully")
+            migrate_fixed_point_prices(cursor, db_name)
+            add_idempotency_key_expiry(cursor, db_name)
+            add_listing_indexes(cursor, db_name)
 
             # Commit changes
             connection.commit()
@@ -0,0 +1,197 @@
+import asyncio
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app.entity.order import Order
+from app.stock_exchange import OrderPlacementError, place_order
+from app.utils.logger import get_logger
+from app.utils.metrics import stage_seconds
+
+from .order_book_registry import OrderBookRegistry
+from .stock_exchange_processor import StockExchangeProcessor
+
+logger = get_logger("async_stock_exchange_processor")
+
+
+class AsyncStockExchangeProcessor(StockExchangeProcessor):
+    """
+    asyncio flavour of the processor for the async API path.
+
+    Orders wait on an `asyncio.Queue` and are matched in batches by a task on
+    the event loop. Database work goes through `AsyncSession.run_sync`, which
+    shares the matching code with the threaded processor while the I/O is
+    awaited. The blocking exchange call still runs on the submission pool.
+
+    Orders are queued in memory only, the durable outbox is polled by the
+    threaded processor.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        order_books: OrderBookRegistry,
+        max_retries: int = 3,
+        retry_delay: float = 5.0,
+        max_retry_delay: float = 60.0,
+        max_submit_concurrency: int = 4,
+        batch_size: int = 50,
+        batch_window: float = 0.005,
+        max_queue_depth: int = 0,
+    ):
+        super().__init__(
+            session_factory=session_factory,
+            order_books=order_books,
+            max_retries=max_retries,
+            retry_delay=retry_delay,
+            max_retry_delay=max_retry_delay,
+            max_submit_concurrency=max_submit_concurrency,
+            batch_size=batch_size,
+            batch_window=batch_window,
+            max_queue_depth=max_queue_depth,
+        )
+        self.max_submit_concurrency = max_submit_concurrency
+        self._loop = None
+        self._task = None
+        self._placements = set()  # running placement tasks
+        # Matching runs on the loop thread and awaits its queries while holding
+        # the book's re-entrant lock, which cancellations on the same thread
+        # would pass straight through. They wait for this lock instead
+        self._matching = None
+
+    def _start_workers(self):
+        """The worker task needs the running loop, see `start`"""
+
+    async def start(self):
+        """Start matching on the running event loop"""
+        self._loop = asyncio.get_running_loop()
+        # Created on the loop, asyncio queues bind to it on older Pythons
+        early, self.q = self.q, asyncio.Queue()
+        while not early.empty():
+            self.q.put_nowait(early.get_nowait())
+        self._submit_slots = asyncio.Semaphore(self.max_submit_concurrency)
+        self._matching = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+        logger.info("AsyncStockExchangeProcessor task started")
+
+    async def _run(self):
+        while True:
+            order_ids = await self._next_batch(self.q)
+            try:
+                await self._process_batch(order_ids, self.q)
+            except Exception as e:
+                logger.error("Failed to process batch %s: %s", order_ids, e)
+
+    async def _next_batch(self, q: asyncio.Queue) -> list:
+        """Wait for one order ID, then collect more until the batch is full or the window closes"""
+        order_ids = [await q.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(order_ids) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if not q.empty():
+                order_ids.append(q.get_nowait())
+            elif timeout <= 0:
+                break
+            else:
+                try:
+                    order_ids.append(await asyncio.wait_for(q.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+        return order_ids
+
+    async def _process_batch(self, order_ids: list, q: asyncio.Queue):
+        """Process a batch of orders as one unit of work, committed in a single transaction"""
+        logger.debug("Processing batch of order IDs: %s", order_ids)
+        self._dequeued(order_ids)
+        to_submit = []  # unmatched orders, submitted once the batch is committed
+        touched = set()  # orders whose book state changed within the batch
+        async with self.session_factory() as session:
+            try:
+                async with self._matching:
+                    matches = await session.run_sync(
+                        self._match_batch, order_ids, q, to_submit, touched
+                    )
+                events = await session.run_sync(self._order_events, touched)
+                with stage_seconds.labels("commit").time():
+                    await session.commit()
+                logger.debug(
+                    "Committed batch of %s orders with %s matches",
+                    len(order_ids),
+                    matches,
+                )
+                self._notify(events)
+            except Exception as e:
+                logger.error(
+                    "Failed to commit batch %s: %s", order_ids, e, exc_info=True
+                )
+                await session.rollback()
+                # The books already reflect the lost batch, reload it from the database
+                async with self._matching:
+                    await session.run_sync(self._reload, touched | set(order_ids), q)
+                to_submit = []
+
+        for order_id in to_submit:
+            task = asyncio.create_task(self._place_async(order_id, q))
+            self._placements.add(task)
+            task.add_done_callback(self._placements.discard)
+
+    def _requeue(self, q: asyncio.Queue, order_id):
+        # Called from the retry scheduler thread, hand the order to the loop
+        self._loop.call_soon_threadsafe(q.put_nowait, order_id)
+
+    def _reload_later(self, order_ids, q: asyncio.Queue, attempt: int):
+        # Called from the retry scheduler thread, reload on the loop
+        asyncio.run_coroutine_threadsafe(
+            self._reload_async(order_ids, q, attempt), self._loop
+        )
+
+    async def _reload_async(self, order_ids, q: asyncio.Queue, attempt: int):
+        async with self.session_factory() as session, self._matching:
+            await session.run_sync(self._reload, order_ids, q, attempt)
+
+    async def cancel_async(self, order: Order):
+        """Take an order out of its book once no batch is being matched"""
+        if self._matching is None:
+            self.cancel(order)
+            return
+        async with self._matching:
+            self.cancel(order)
+
+    async def _place_async(self, order_id, q: asyncio.Queue):
+        """Place an unmatched order at the stock exchange without blocking the loop"""
+        async with self._submit_slots:
+            async with self.session_factory() as session:
+                try:
+                    order = await session.run_sync(self._placement_target, order_id)
+                    if order is None:
+                        return
+                    try:
+                        with stage_seconds.labels("place_order").time():
+                            await self._loop.run_in_executor(
+                                self.submit_pool, place_order, order
+                            )
+                        error = None
+                    except OrderPlacementError as e:
+                        error = e
+                    failed = await session.run_sync(
+                        self._placement_done, order, error, q
+                    )
+                except Exception as e:
+                    logger.error(
+                        "Failed to submit order %s: %s", order_id, e, exc_info=True
+                    )
+                    await session.rollback()
+                    self.retry_counts.pop(order_id, None)
+                    failed = True
+                if failed:
+                    # The book is only changed between batches, like cancellations
+                    async with self._matching:
+                        self.order_books.remove_order(order_id)
+
+    def _dispatch(self, order_id, instrument: str):
+        self.q.put_nowait(order_id)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        super().stop()
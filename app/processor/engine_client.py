@@ -0,0 +1,116 @@
+import asyncio
+import socket
+import threading
+import time
+from typing import List
+
+from app.entity.order import Order
+from app.utils.logger import get_logger
+
+from .engine_protocol import CANCEL, ORDER, STATS, encode_frame, read_reply
+
+logger = get_logger("engine_client")
+
+
+class EngineClient:
+    """
+    Stands in for the processor in API workers when matching runs in the shared
+    engine process, forwarding order IDs and cancellations over its Unix socket.
+
+    Nothing is matched here, so every worker feeds the same order books. Lost
+    frames are tolerated like a crash of the in-memory queue: the order is
+    already committed, and in durable mode it is still in the outbox.
+    """
+
+    def __init__(self, path: str, timeout: float = 5.0, stats_ttl: float = 0.5):
+        self.path = path
+        self.timeout = timeout
+        # Saturation is checked on every new order, reuse recent engine stats
+        self.stats_ttl = stats_ttl
+        self._stats = {}
+        self._stats_at = 0.0
+        self._sock = None
+        self._stream = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.path)
+        self._sock = sock
+        self._stream = sock.makefile("rb")
+        logger.info("Connected to matching engine at %s", self.path)
+
+    def _close(self):
+        if self._sock is not None:
+            self._stream.close()
+            self._sock.close()
+        self._sock = self._stream = None
+
+    def _send(self, frame: bytes, reply: bool = False):
+        """Send a frame, reconnecting once if the engine was restarted"""
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._sock.sendall(frame)
+                    return read_reply(self._stream) if reply else None
+                except OSError:
+                    self._close()
+                    if attempt:
+                        raise
+
+    def enqueue(self, order: Order):
+        logger.debug("Forwarding order to matching engine: %s", order.id)
+        try:
+            self._send(encode_frame(ORDER, order.id, order.instrument))
+        except OSError as e:
+            logger.error("Failed to forward order %s: %s", order.id, e)
+
+    def enqueue_many(self, orders: List[Order]):
+        """Forward a batch of orders in a single write"""
+        logger.debug("Forwarding %s orders to matching engine", len(orders))
+        try:
+            self._send(
+                b"".join(
+                    encode_frame(ORDER, order.id, order.instrument) for order in orders
+                )
+            )
+        except OSError as e:
+            logger.error("Failed to forward %s orders: %s", len(orders), e)
+
+    def cancel(self, order: Order):
+        """The engine drops cancelled orders from its book asynchronously"""
+        logger.debug("Forwarding cancellation to matching engine: %s", order.id)
+        try:
+            self._send(encode_frame(CANCEL, order.id, order.instrument))
+        except OSError as e:
+            logger.error("Failed to forward cancellation %s: %s", order.id, e)
+
+    async def cancel_async(self, order: Order):
+        """`cancel` for the async API, the socket write runs off the event loop"""
+        await asyncio.get_running_loop().run_in_executor(None, self.cancel, order)
+
+    def add_listener(self, listener):
+        """
+        Orders change in the engine process, which does not report back to API
+        workers; their caches rely on expiry instead.
+        """
+
+    def stats(self) -> dict:
+        if time.monotonic() - self._stats_at >= self.stats_ttl:
+            try:
+                self._stats = self._send(encode_frame(STATS), reply=True) or {}
+            except OSError as e:
+                logger.error("Failed to read matching engine stats: %s", e)
+                self._stats = {}
+            self._stats_at = time.monotonic()
+        return self._stats
+
+    def is_saturated(self) -> bool:
+        return bool(self.stats().get("saturated"))
+
+    def stop(self):
+        with self._lock:
+            self._close()
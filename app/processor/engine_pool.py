@@ -0,0 +1,202 @@
+import bisect
+import hashlib
+import multiprocessing
+import threading
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from app.utils.logger import get_logger, stop_logging
+
+from .order_book_loader import load_order_books
+from .order_book_registry import OrderBookRegistry
+
+logger = get_logger("engine_pool")
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping instruments to engine shards.
+
+    Each shard owns `replicas` points on the ring, so instruments spread evenly
+    and changing the number of shards only moves the instruments of the shards
+    that were added or removed. Keys are hashed with MD5 rather than `hash()`,
+    which is salted per process.
+    """
+
+    def __init__(self, nodes: Iterable[int], replicas: int = 64):
+        points = sorted(
+            (self._hash(f"{node}:{replica}"), node)
+            for node in nodes
+            for replica in range(replicas)
+        )
+        self._keys = [key for key, _ in points]
+        self._nodes = [node for _, node in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+    def node_for(self, key: str) -> int:
+        """Shard owning the first ring point at or after the key's hash"""
+        index = bisect.bisect_left(self._keys, self._hash(key)) % len(self._keys)
+        return self._nodes[index]
+
+
+def _run_engine(
+    shard: int,
+    ring: HashRing,
+    inbox,
+    events,
+    engine_factory: Callable[[], Engine],
+    processor_kwargs: dict,
+    warm_start: bool,
+    warm_start_chunk_size: int,
+):
+    """Entry point of an engine process, owning the books of its instruments"""
+    # Imported here to avoid a circular import with the processor module
+    from .stock_exchange_processor import StockExchangeProcessor
+
+    engine = engine_factory()
+    session_factory = scoped_session(
+        sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    )
+    order_books = OrderBookRegistry()
+    open_orders = []
+    if warm_start:
+        open_orders = load_order_books(
+            engine,
+            order_books,
+            chunk_size=warm_start_chunk_size,
+            instruments=lambda instrument: ring.node_for(instrument) == shard,
+        ).open_orders
+    processor = StockExchangeProcessor(
+        session_factory=session_factory,
+        order_books=order_books,
+        poll_outbox=False,
+        on_dequeued=lambda order_ids: events.put(("dequeued", order_ids)),
+        **processor_kwargs,
+    )
+    processor.add_listener(lambda changes: events.put(("changed", changes)))
+    # In durable mode their outbox entries are still queued, the poller of
+    # the parent process claims them again
+    for order_id, instrument in open_orders:
+        processor.enqueue_id(order_id, instrument)
+    logger.info("Matching engine %s started", shard)
+    for kind, order_id, instrument in iter(inbox.get, None):
+        if kind == "order":
+            processor._dispatch(order_id, instrument)
+        elif kind == "cancel":
+            processor._cancel(order_id, instrument)
+    processor.stop()
+    engine.dispose()
+    logger.info("Matching engine %s stopped", shard)
+    # Worker processes exit without running atexit hooks
+    stop_logging()
+
+
+class EnginePool:
+    """
+    Fans orders out over several matching engine processes.
+
+    Each process owns the order books and database session of a consistent-hash
+    slice of the instruments, so matching is not bound to a single core by the
+    GIL. Order IDs and cancellations travel to the engines over multiprocessing
+    queues; the engines report back the order IDs they picked up, which feeds
+    the admission control of the processor in the API process, and the events
+    of the orders they changed.
+    """
+
+    def __init__(
+        self,
+        processes: int,
+        engine_factory: Callable[[], Engine],
+        processor_kwargs: Optional[dict] = None,
+        warm_start: bool = True,
+        warm_start_chunk_size: int = 10000,
+        replicas: int = 64,
+    ):
+        self.processes = processes
+        self.engine_factory = engine_factory
+        self.processor_kwargs = dict(processor_kwargs or {})
+        self.warm_start = warm_start
+        self.warm_start_chunk_size = warm_start_chunk_size
+        self.ring = HashRing(range(processes), replicas)
+        # Spawned rather than forked, the API process runs threads and pools
+        self._context = multiprocessing.get_context("spawn")
+        self._inboxes = []
+        self._workers = []
+        self._events = None
+        self.collector = None
+
+    def start(
+        self,
+        on_dequeued: Callable[[list], None],
+        on_changed: Optional[Callable[[list], None]] = None,
+        **processor_kwargs,
+    ):
+        """
+        Start the engine processes, `on_dequeued` receives picked up order IDs
+        and `on_changed` the events of orders whose changes were committed.
+        """
+        self.processor_kwargs.update(processor_kwargs)
+        self._events = self._context.Queue()
+        for shard in range(self.processes):
+            inbox = self._context.Queue()
+            worker = self._context.Process(
+                target=_run_engine,
+                args=(
+                    shard,
+                    self.ring,
+                    inbox,
+                    self._events,
+                    self.engine_factory,
+                    self.processor_kwargs,
+                    self.warm_start,
+                    self.warm_start_chunk_size,
+                ),
+                name=f"matching-engine-{shard}",
+                daemon=True,
+            )
+            worker.start()
+            self._inboxes.append(inbox)
+            self._workers.append(worker)
+        self.collector = threading.Thread(
+            target=self._collect,
+            args=(on_dequeued, on_changed),
+            name="engine-pool",
+            daemon=True,
+        )
+        self.collector.start()
+        logger.info("Started %s matching engine processes", self.processes)
+
+    def _collect(
+        self,
+        on_dequeued: Callable[[list], None],
+        on_changed: Optional[Callable[[list], None]],
+    ):
+        for kind, payload in iter(self._events.get, None):
+            if kind == "dequeued":
+                on_dequeued(payload)
+            elif on_changed is not None:
+                on_changed(payload)
+
+    def shard_for(self, instrument: str) -> int:
+        return self.ring.node_for(instrument)
+
+    def dispatch(self, order_id, instrument: str):
+        self._inboxes[self.shard_for(instrument)].put(("order", order_id, instrument))
+
+    def cancel(self, order_id, instrument: str):
+        self._inboxes[self.shard_for(instrument)].put(("cancel", order_id, instrument))
+
+    def stop(self, timeout: float = 5.0):
+        """Ask the engines to stop once their inbox is drained and wait for them"""
+        for inbox in self._inboxes:
+            inbox.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
+        if self._events is not None:
+            self._events.put(None)
+        logger.info("Matching engine processes stopped")
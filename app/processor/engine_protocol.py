@@ -0,0 +1,58 @@
+import json
+import struct
+from typing import BinaryIO, NamedTuple, Optional
+
+# Frame kinds sent by the API workers to the matching engine
+ORDER = 1
+CANCEL = 2
+STATS = 3  # answered with a stats reply
+
+# kind, order id, length of the instrument that follows (ASCII)
+_FRAME = struct.Struct("!BqB")
+# Stats replies are a length prefixed JSON document
+_REPLY = struct.Struct("!I")
+
+
+class Frame(NamedTuple):
+    kind: int
+    order_id: int
+    instrument: str
+
+
+def encode_frame(kind: int, order_id: int = 0, instrument: str = "") -> bytes:
+    """Encode a frame, 10 bytes plus the instrument (22 bytes for an ISIN)"""
+    data = instrument.encode("ascii")
+    return _FRAME.pack(kind, order_id, len(data)) + data
+
+
+def _read_exactly(stream: BinaryIO, size: int) -> Optional[bytes]:
+    data = stream.read(size)
+    if len(data) < size:
+        return None  # peer closed the connection
+    return data
+
+
+def read_frame(stream: BinaryIO) -> Optional[Frame]:
+    """Read the next frame from a buffered stream, None once the peer is gone"""
+    header = _read_exactly(stream, _FRAME.size)
+    if header is None:
+        return None
+    kind, order_id, length = _FRAME.unpack(header)
+    instrument = _read_exactly(stream, length) if length else b""
+    if instrument is None:
+        return None
+    return Frame(kind, order_id, instrument.decode("ascii"))
+
+
+def encode_reply(stats: dict) -> bytes:
+    data = json.dumps(stats).encode()
+    return _REPLY.pack(len(data)) + data
+
+
+def read_reply(stream: BinaryIO) -> Optional[dict]:
+    header = _read_exactly(stream, _REPLY.size)
+    if header is None:
+        return None
+    (length,) = _REPLY.unpack(header)
+    data = _read_exactly(stream, length)
+    return json.loads(data) if data is not None else None
@@ -0,0 +1,50 @@
+import os
+import socketserver
+
+from app.utils.logger import get_logger
+
+from .engine_protocol import CANCEL, ORDER, STATS, encode_reply, read_frame
+from .stock_exchange_processor import StockExchangeProcessor
+
+logger = get_logger("engine_server")
+
+
+class EngineRequestHandler(socketserver.StreamRequestHandler):
+    """Serves one API worker connection until the worker disconnects"""
+
+    def handle(self):
+        processor = self.server.processor
+        while True:
+            frame = read_frame(self.rfile)
+            if frame is None:
+                return
+            if frame.kind == ORDER:
+                processor.enqueue_id(frame.order_id, frame.instrument)
+            elif frame.kind == CANCEL:
+                processor.cancel_id(frame.order_id, frame.instrument)
+            elif frame.kind == STATS:
+                self.wfile.write(encode_reply(processor.stats()))
+            else:
+                logger.error("Unknown frame kind %s, closing connection", frame.kind)
+                return
+
+
+class EngineServer(socketserver.ThreadingUnixStreamServer):
+    """
+    Unix socket front of the shared matching engine, one thread per API worker.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: str, processor: StockExchangeProcessor):
+        # A socket file left behind by a previous engine would block the bind
+        if os.path.exists(path):
+            os.unlink(path)
+        self.processor = processor
+        super().__init__(path, EngineRequestHandler)
+        logger.info("Matching engine listening on %s", path)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
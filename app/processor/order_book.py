@@ -1,72 +1,227 @@
-from collections import defaultdict
+import itertools
+import threading
+from typing import Tuple
 
+from sortedcontainers import SortedDict
+
+from app.dto.types import OrderSide
 from app.entity.order import Order
+from app.utils.price import MARKET_ASK_TICKS, MARKET_BID_TICKS
+
+# Order statuses that may rest in the book
+RESTING_STATUSES = ("OPEN", "SUBMITTED", "PARTIAL")
+
+
+class RestingOrder:
+    """Compact in-memory record of an order resting in the book.
+
+    Detached from the SQLAlchemy entity, it only keeps what matching needs and
+    doubles as the node of its price level's intrusive linked list. Prices are
+    integer ticks; market orders rest at the most aggressive price of their
+    side so that they sit at the top of the book and cross every price.
+    """
+
+    __slots__ = ("id", "side", "price", "quantity", "seq", "prev", "next")
+
+    def __init__(self, id, side: OrderSide, price: int, quantity: int, seq: int = 0):
+        self.id = id
+        self.side = side
+        self.price = price
+        self.quantity = quantity  # remaining quantity
+        self.seq = seq  # arrival sequence within the book
+        self.prev = None
+        self.next = None
+
+    @classmethod
+    def from_order(cls, order: Order, seq: int = 0) -> "RestingOrder":
+        side = OrderSide(order.side.lower())
+        if order.type.lower() == "market":
+            price = MARKET_BID_TICKS if side is OrderSide.BUY else MARKET_ASK_TICKS
+        else:
+            price = order.limit_price_ticks
+        return cls(order.id, side, price, order.quantity, seq)
+
+    def __repr__(self) -> str:
+        return (
+            f"RestingOrder(id={self.id!r}, side={self.side.value}, "
+            f"price={self.price}, quantity={self.quantity})"
+        )
+
+
+class PriceLevel:
+    """FIFO of the orders resting at one price, with O(1) append and unlink"""
+
+    __slots__ = ("head", "tail", "size")
+
+    def __init__(self):
+        self.head = None
+        self.tail = None
+        self.size = 0
+
+    def append(self, record: RestingOrder):
+        record.prev = self.tail
+        record.next = None
+        if self.tail is None:
+            self.head = record
+        else:
+            self.tail.next = record
+        self.tail = record
+        self.size += 1
+
+    def unlink(self, record: RestingOrder):
+        if record.prev is None:
+            self.head = record.next
+        else:
+            record.prev.next = record.next
+        if record.next is None:
+            self.tail = record.prev
+        else:
+            record.next.prev = record.prev
+        record.prev = record.next = None
+        self.size -= 1
+
+    def __iter__(self):
+        record = self.head
+        while record is not None:
+            # Read the successor first so the current order may be unlinked
+            next_record = record.next
+            yield record
+            record = next_record
+
+    def __len__(self) -> int:
+        return self.size
 
 
 class OrderBook:
     def __init__(self):
-        # Use defaultdict to store orders at each price level
-        self.bids = defaultdict(
-            list
-        )  # {price: [(order_id, order, timestamp)]} list of buy orders
-        self.asks = defaultdict(
-            list
-        )  # {price: [(order_id, order, timestamp)]} list of sell orders
-        self.orders = {}  # {order_id: order}
+        # Price levels kept sorted by price, each level is a FIFO linked list so
+        # the oldest order at a price is always served first (price-time priority)
+        self.bids = SortedDict()  # {price ticks: PriceLevel} list of buy orders
+        self.asks = SortedDict()  # {price ticks: PriceLevel} list of sell orders
+        self.orders = {}  # {order_id: RestingOrder}
+        # Guards the book against the worker thread and API cancellations
+        self.lock = threading.RLock()
+        self._seq = itertools.count()
+
+    def _book_for(self, record: RestingOrder) -> SortedDict:
+        return self.bids if record.side is OrderSide.BUY else self.asks
 
     def add_order(self, order: Order):
-        """Add an order to the order book with price-time priority"""
-        order_book = self.bids if order.side.lower() == "buy" else self.asks
-        price = float("inf") if order.type.lower() == "market" else order.limit_price
+        """Add an order to the order book with price-time priority.
 
-        order_book[price].append((order.id, order, order.created_at))
-        self.orders[order.id] = order
+        Returns the order's resting record, or None if the order cannot rest.
+        """
+        record = self.orders.get(order.id)
+        if record is not None:
+            # Re-processed orders keep their original queue position
+            return record
+        if order.status not in RESTING_STATUSES or order.quantity <= 0:
+            return None
 
-        # Sort by timestamp for same price level (earlier orders first)
-        order_book[price].sort(key=lambda x: x[2])
+        record = RestingOrder.from_order(order, next(self._seq))
+        order_book = self._book_for(record)
+        level = order_book.get(record.price)
+        if level is None:
+            level = order_book[record.price] = PriceLevel()
+        level.append(record)
+        self.orders[record.id] = record
+        return record
 
-    def remove_order(self, order_id: str):
-        """Remove an order from the order book"""
-        if order_id not in self.orders:
+    def remove_order(self, order_id):
+        """Remove an order from the order book in O(1) using its record"""
+        record = self.orders.pop(order_id, None)
+        if record is None:
             return
 
-        order = self.orders[order_id]
-        order_book = self.bids if order.side.lower() == "buy" else self.asks
-        price = float("inf") if order.type.lower() == "market" else order.limit_price
+        order_book = self._book_for(record)
+        level = order_book[record.price]
+        level.unlink(record)
+        if not level:
+            del order_book[record.price]
 
-        if price in order_book:
-            order_book[price] = [
-                (oid, o, ts) for oid, o, ts in order_book[price] if oid != order_id
-            ]
-            if not order_book[price]:
-                del order_book[price]
+    def restore(self, order: Order):
+        """Bring an order's entry back in line with its database row.
 
-        del self.orders[order_id]
+        Used after a rollback. Entries still in the book keep their place in
+        the queue, orders that no longer rest are removed. Returns the resting
+        record, or None.
+        """
+        record = self.orders.get(order.id)
+        if record is None:
+            return self.add_order(order)
+        if order.status not in RESTING_STATUSES or order.quantity <= 0:
+            self.remove_order(order.id)
+            return None
+        record.quantity = order.quantity
+        return record
 
-    def get_matching_orders(self, order: Order):
-        """Get matching orders following price-time precedence"""
-        matches = []
-        opposite_book = self.asks if order.side.lower() == "buy" else self.bids
+    def fill(self, record: RestingOrder, quantity: int):
+        """Reduce a resting order by a filled quantity, removing it when done"""
+        record.quantity -= quantity
+        if record.quantity <= 0:
+            self.remove_order(record.id)
 
-        # Sort prices: descending for bids (higher first), ascending for asks (lower first)
-        prices = sorted(opposite_book.keys(), reverse=(order.side.lower() == "buy"))
+    def depth(self) -> Tuple[int, int]:
+        """Number of resting (bids, asks)"""
+        with self.lock:
+            return (
+                sum(len(level) for level in self.bids.values()),
+                sum(len(level) for level in self.asks.values()),
+            )
 
-        if order.type.lower() == "market":
-            # Market orders match with best available price
-            for price in prices:
-                for order_id, match_order, _ in opposite_book[price]:
-                    if match_order.status in ["OPEN", "SUBMITTED"]:
-                        matches.append(match_order)
+    def best_bid(self):
+        """Highest bid price, or None if there are no bids"""
+        return self.bids.peekitem(-1)[0] if self.bids else None
+
+    def best_ask(self):
+        """Lowest ask price, or None if there are no asks"""
+        return self.asks.peekitem(0)[0] if self.asks else None
+
+    def _crossing_prices(self, taker: RestingOrder):
+        """Yield the opposite side's prices that cross the taker, best first.
+
+        The next level is looked up by bisecting from the last visited price,
+        so levels may be emptied and deleted while this generator is running.
+        """
+        is_buy = taker.side is OrderSide.BUY
+        opposite_book = self.asks if is_buy else self.bids
+
+        index = 0 if is_buy else len(opposite_book) - 1
+        while 0 <= index < len(opposite_book):
+            price = opposite_book.peekitem(index)[0]
+            # Buy orders match with asks <= buy price, lowest first
+            # Sell orders match with bids >= sell price, highest first
+            if price > taker.price if is_buy else price < taker.price:
+                return
+            yield price
+            if is_buy:
+                index = opposite_book.bisect_right(price)
+            else:
+                index = opposite_book.bisect_left(price) - 1
+
+    def iter_matching_orders(self, order, quantity: int = None):
+        """Lazily yield matching resting orders following price-time precedence.
+
+        Stops as soon as the yielded orders cover `quantity`, so only the
+        orders that will actually be filled are touched.
+        """
+        if isinstance(order, RestingOrder):
+            taker = order
         else:
-            # Limit orders match with opposite side orders at same or better price
-            for price in prices:
-                # For buy orders: match with asks <= buy price
-                # For sell orders: match with bids >= sell price
-                if (order.side.lower() == "buy" and price <= order.limit_price) or (
-                    order.side.lower() == "sell" and price >= order.limit_price
-                ):
-                    for order_id, match_order, _ in opposite_book[price]:
-                        if match_order.status in ["OPEN", "SUBMITTED"]:
-                            matches.append(match_order)
-
-        return matches
+            taker = RestingOrder.from_order(order)
+        opposite_book = self.asks if taker.side is OrderSide.BUY else self.bids
+        remaining = quantity
+        for price in self._crossing_prices(taker):
+            level = opposite_book.get(price)
+            if level is None:
+                continue
+            for match in level:
+                if remaining is not None:
+                    remaining -= match.quantity
+                yield match
+                if remaining is not None and remaining <= 0:
+                    return
+
+    def get_matching_orders(self, order):
+        """Get matching orders following price-time precedence"""
+        return list(self.iter_matching_orders(order))
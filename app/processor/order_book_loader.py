@@ -0,0 +1,105 @@
+import time
+from typing import Callable, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from app.entity.order import Order
+from app.utils.logger import get_logger
+
+from .order_book import RESTING_STATUSES
+from .order_book_registry import OrderBookRegistry
+
+logger = get_logger("order_book_loader")
+
+
+class LoadStats(NamedTuple):
+    rows: int
+    books: int
+    seconds: float
+    # (id, instrument) of the OPEN orders found, to be enqueued as takers
+    open_orders: Tuple[Tuple[int, str], ...] = ()
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else float(self.rows)
+
+
+def load_order_books(
+    engine: Engine,
+    order_books: OrderBookRegistry,
+    chunk_size: int = 10000,
+    instruments: Optional[Callable[[str], bool]] = None,
+) -> LoadStats:
+    """
+    Rebuild the in-memory order books from the resting orders in the database.
+
+    Orders are streamed in primary key chunks through a server-side cursor as
+    plain rows, without ORM instances, and added in primary key order so each
+    price level keeps its arrival (time) priority. When `instruments` is given
+    only the orders of the instruments it accepts are loaded; they are picked
+    from the distinct instruments with resting orders and filtered in the query.
+
+    Only SUBMITTED and PARTIAL orders rest in the loaded books. OPEN orders
+    were never matched and may cross them, they are returned in
+    `LoadStats.open_orders` for the caller to enqueue once the processor runs.
+    """
+    orders = Order.__table__
+    columns = [
+        orders.c.id,
+        orders.c.side,
+        orders.c.type,
+        orders.c.status,
+        orders.c.instrument,
+        orders.c.limit_price_ticks,
+        orders.c.quantity,
+    ]
+    started = time.perf_counter()
+    rows = 0
+    last_id = 0
+    open_orders = []
+    resting = [orders.c.status.in_(RESTING_STATUSES)]
+    with engine.connect() as connection:
+        if instruments is not None:
+            owned = [
+                instrument
+                for (instrument,) in connection.execute(
+                    select(orders.c.instrument).where(*resting).distinct()
+                )
+                if instruments(instrument)
+            ]
+            resting.append(orders.c.instrument.in_(owned))
+        connection = connection.execution_options(stream_results=True)
+        while instruments is None or owned:
+            chunk = connection.execute(
+                select(*columns)
+                .where(*resting, orders.c.id > last_id)
+                .order_by(orders.c.id)
+                .limit(chunk_size)
+            )
+            count = loaded = 0
+            for row in chunk:
+                last_id = row.id
+                count += 1
+                if row.status == "OPEN":
+                    open_orders.append((row.id, row.instrument))
+                else:
+                    order_books.get(row.instrument).add_order(row)
+                    loaded += 1
+            rows += loaded
+            if count < chunk_size:
+                break
+
+    stats = LoadStats(
+        rows, len(order_books), time.perf_counter() - started, tuple(open_orders)
+    )
+    logger.info(
+        "Loaded %s resting orders into %s order books in %.2fs (%.0f rows/s), "
+        "%s open orders to match",
+        stats.rows,
+        stats.books,
+        stats.seconds,
+        stats.rows_per_second,
+        len(open_orders),
+    )
+    return stats
@@ -0,0 +1,42 @@
+import threading
+from typing import Dict, Iterator, Tuple
+
+from .order_book import OrderBook
+
+
+class OrderBookRegistry:
+    """Hands out one OrderBook per instrument so instruments never share levels"""
+
+    def __init__(self):
+        self._books: Dict[str, OrderBook] = {}  # {instrument: order book}
+        self._lock = threading.Lock()
+
+    def get(self, instrument: str) -> OrderBook:
+        """Return the order book of an instrument, creating it on first use"""
+        book = self._books.get(instrument)
+        if book is None:
+            with self._lock:
+                book = self._books.setdefault(instrument, OrderBook())
+        return book
+
+    def remove_order(self, order_id):
+        """Remove an order without knowing its instrument"""
+        for book in list(self._books.values()):
+            # Matching may be walking the book, wait for it to finish
+            with book.lock:
+                if order_id in book.orders:
+                    book.remove_order(order_id)
+                    return
+
+    def depth(self) -> Dict[str, Tuple[int, int]]:
+        """Number of resting (bids, asks) by instrument"""
+        return {instrument: book.depth() for instrument, book in self.items()}
+
+    def items(self) -> Iterator[Tuple[str, OrderBook]]:
+        return iter(list(self._books.items()))
+
+    def __contains__(self, instrument: str) -> bool:
+        return instrument in self._books
+
+    def __len__(self) -> int:
+        return len(self._books)
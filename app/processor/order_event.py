@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import NamedTuple
+
+from app.entity.order import Order
+
+
+class OrderEvent(NamedTuple):
+    """A committed change of an order, reported to processor listeners"""
+
+    id: int  # primary key
+    order_id: str  # public order ID
+    instrument: str
+    status: str
+    remaining_quantity: int
+    at: datetime
+
+    @classmethod
+    def of(cls, order: Order) -> "OrderEvent":
+        """Snapshot an order, taken before its session commits and expires it"""
+        return cls(
+            order.id,
+            order.order_id,
+            order.instrument,
+            order.status,
+            order.quantity,
+            datetime.now(),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.order_id,
+            "instrument": self.instrument,
+            "status": self.status,
+            "remaining_quantity": self.remaining_quantity,
+            "at": self.at.isoformat(),
+        }
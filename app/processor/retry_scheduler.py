@@ -0,0 +1,70 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from typing import Callable
+
+from app.utils.logger import get_logger
+
+logger = get_logger("retry_scheduler")
+
+
+class RetryScheduler:
+    """
+    Parks retries on a timer heap and runs them when due on its own thread, so
+    the threads that schedule them never sleep.
+
+    Delays grow exponentially with the attempt number, capped at `max_delay`,
+    with "equal jitter": half of the delay is fixed and the other half random,
+    which spreads out retries that failed together.
+    """
+
+    def __init__(
+        self,
+        base_delay: float = 5.0,
+        max_delay: float = 60.0,
+        rng: random.Random = None,
+    ):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng or random.Random()
+        self._heap = []  # [(due, seq, action)]
+        self._seq = itertools.count()
+        self._cv = threading.Condition()
+        self.thread = threading.Thread(
+            target=self._run, name="retry-scheduler", daemon=True
+        )
+        self.thread.start()
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (0 based)"""
+        delay = min(self.max_delay, self.base_delay * (2**attempt))
+        return delay / 2 + self.rng.uniform(0, delay / 2)
+
+    def schedule(self, attempt: int, action: Callable[[], None]) -> float:
+        """Run `action` after the backoff of `attempt`, returns the delay used"""
+        delay = self.backoff(attempt)
+        with self._cv:
+            heapq.heappush(
+                self._heap, (time.monotonic() + delay, next(self._seq), action)
+            )
+            self._cv.notify()
+        return delay
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def _run(self):
+        while True:
+            with self._cv:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    timeout = (
+                        self._heap[0][0] - time.monotonic() if self._heap else None
+                    )
+                    self._cv.wait(timeout)
+                _, _, action = heapq.heappop(self._heap)
+            try:
+                action()
+            except Exception as e:
+                logger.error("Scheduled retry failed: %s", e, exc_info=True)
@@ -1,169 +1,737 @@
+import os
 import queue
+import socket
 import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, List
 
 from sqlalchemy.orm import Session, sessionmaker
 
+from app.dto.types import OrderSide
 from app.entity.order import Order
-from app.entity.order_matching import OrderMatching
 from app.repo.order_matching_repository import OrderMatchingRepository
+from app.repo.order_outbox_repository import OrderOutboxRepository
 from app.stock_exchange import OrderPlacementError, place_order
 from app.utils.logger import get_logger
+from app.utils.metrics import registry, stage_seconds
 
-from .order_book import OrderBook
+from .engine_pool import EnginePool, HashRing
+from .order_book import RESTING_STATUSES, OrderBook, RestingOrder
+from .order_book_registry import OrderBookRegistry
+from .order_event import OrderEvent
+from .retry_scheduler import RetryScheduler
 
 logger = get_logger("stock_exchange_processor")
 
+placement_retries = registry.counter(
+    "order_placement_retries",
+    "Exchange placements that failed transiently and were scheduled again",
+)
+placement_failures = registry.counter(
+    "order_placement_failures", "Orders failed after their last placement"
+)
+
 
 class StockExchangeProcessor:
     def __init__(
         self,
         session_factory: sessionmaker,
-        order_book: OrderBook,
+        order_books: OrderBookRegistry,
         max_retries: int = 3,
         retry_delay: float = 5.0,
+        max_retry_delay: float = 60.0,
+        per_instrument_lanes: bool = False,
+        max_lanes: int = 8,
+        max_submit_concurrency: int = 4,
+        batch_size: int = 50,
+        batch_window: float = 0.005,
+        durable_queue: bool = False,
+        worker_id: str = None,
+        outbox_poll_interval: float = 0.05,
+        outbox_lease: float = 60.0,
+        max_queue_depth: int = 0,
+        engine_pool: EnginePool = None,
+        poll_outbox: bool = True,
+        on_dequeued: Callable[[list], None] = None,
     ):
         self.q = queue.Queue()
         self.session_factory = session_factory
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.retry_counts = {}
-        self.order_book = order_book
-        self.thread = threading.Thread(target=self._worker, daemon=True)
-        self.thread.start()
-        logger.info("StockExchangeProcessor thread started")
+        # Orders are processed and committed in batches of up to batch_size,
+        # waiting at most batch_window seconds for a batch to fill up
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.retry_scheduler = RetryScheduler(
+            base_delay=retry_delay, max_delay=max_retry_delay
+        )
+        self.order_books = order_books
+        self.per_instrument_lanes = per_instrument_lanes
+        # Instruments are hashed onto a fixed number of lanes, so the threads
+        # stay bounded however many instruments are traded
+        self.lane_ring = HashRing(range(max_lanes))
+        self.lanes = {}  # {lane: (queue, thread)}
+        self._lanes_lock = threading.Lock()
+        # Exchange calls are slow, overlap them on a bounded pool of workers
+        self.submit_pool = ThreadPoolExecutor(
+            max_workers=max_submit_concurrency, thread_name_prefix="exchange-submit"
+        )
+        # Bounds submissions waiting for a worker so a slow exchange holds back
+        # matching instead of growing an unbounded backlog
+        self._submit_slots = threading.BoundedSemaphore(max_submit_concurrency * 4)
+        # In durable mode order IDs are claimed from the outbox table, so they
+        # survive crashes and can be shared by several processor instances
+        self.durable_queue = durable_queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.outbox_poll_interval = outbox_poll_interval
+        self.outbox_lease = outbox_lease
+        self._outbox_wakeup = threading.Event()
+        self._stopped = threading.Event()
+        # Orders accepted but not processed yet, for admission control. In
+        # memory they are tracked oldest first, the outbox backlog is sampled
+        self.max_queue_depth = max_queue_depth  # 0 means unbounded
+        self._pending = OrderedDict()  # {order_id: enqueue time}
+        self._pending_lock = threading.Lock()
+        self._outbox_backlog = (0, None)  # (entries, oldest created_at)
+        # Called with the order IDs of every batch picked up for processing
+        self.on_dequeued = on_dequeued
+        # Called with an OrderEvent for every order change that was committed
+        self._listeners = []
+        # With an engine pool, matching runs in engine processes and this
+        # processor only routes orders and cancellations to them
+        self.engine_pool = engine_pool
+        if engine_pool is not None:
+            engine_pool.start(
+                self._dequeued,
+                self._notify,
+                max_retries=max_retries,
+                retry_delay=retry_delay,
+                max_retry_delay=max_retry_delay,
+                per_instrument_lanes=per_instrument_lanes,
+                max_lanes=max_lanes,
+                max_submit_concurrency=max_submit_concurrency,
+                batch_size=batch_size,
+                batch_window=batch_window,
+                durable_queue=durable_queue,
+                worker_id=self.worker_id,
+                outbox_lease=outbox_lease,
+            )
+        self.poll_outbox = poll_outbox
+        self.thread = None
+        self._start_workers()
 
-    def _worker(self):
-        while True:
-            order_id = self.q.get()
-            logger.debug(f"Processing order ID: {order_id}")
+    def _start_workers(self):
+        if self.durable_queue and self.poll_outbox:
+            self.outbox_thread = threading.Thread(
+                target=self._poll_outbox, name="outbox-poller", daemon=True
+            )
+            self.outbox_thread.start()
+            logger.info("Polling the order outbox as %s", self.worker_id)
+        if self.engine_pool is not None:
+            logger.info("StockExchangeProcessor started in engine pool mode")
+        elif self.per_instrument_lanes:
+            logger.info("StockExchangeProcessor started in per-instrument lane mode")
+        else:
+            self.thread = threading.Thread(
+                target=self._worker, args=(self.q,), name="order-processor", daemon=True
+            )
+            self.thread.start()
+            logger.info("StockExchangeProcessor thread started")
+
+    def _lane_queue(self, instrument: str) -> queue.Queue:
+        """Return the queue of an instrument's lane, starting the lane on first use"""
+        index = self.lane_ring.node_for(instrument)
+        lane = self.lanes.get(index)
+        if lane is None:
+            with self._lanes_lock:
+                lane = self.lanes.get(index)
+                if lane is None:
+                    lane_queue = queue.Queue()
+                    thread = threading.Thread(
+                        target=self._worker,
+                        args=(lane_queue,),
+                        name=f"lane-{index}",
+                        daemon=True,
+                    )
+                    lane = self.lanes[index] = (lane_queue, thread)
+                    thread.start()
+                    logger.info("Started matching lane %s", index)
+        return lane[0]
+
+    def _dispatch(self, order_id, instrument: str):
+        if self.engine_pool is not None:
+            self.engine_pool.dispatch(order_id, instrument)
+        elif self.per_instrument_lanes:
+            self._lane_queue(instrument).put(order_id)
+        else:
+            self.q.put(order_id)
+
+    def _poll_outbox(self):
+        """Claim due outbox entries in bulk and dispatch them to the workers"""
+        backlog_sampled_at = 0.0
+        while not self._stopped.is_set():
+            self._outbox_wakeup.wait(self.outbox_poll_interval)
+            self._outbox_wakeup.clear()
+            if self._stopped.is_set():
+                break
             session = self.session_factory()
-            order_matching_repo = OrderMatchingRepository(session)
             try:
-                order = session.query(Order).get(order_id)
-                if not order:
-                    logger.debug(f"Order {order_id} not found")
-                    session.commit()
-                    self.retry_counts.pop(order_id, None)
-                    self.order_book.remove_order(order_id)
-                    continue
-
-                if order.status not in ("OPEN", "SUBMITTED"):
-                    logger.debug(f"Order {order_id} is not open or submitted")
-                    session.commit()
-                    self.retry_counts.pop(order_id, None)
-                    self.order_book.remove_order(order_id)
-                    continue
+                outbox_repo = OrderOutboxRepository(session)
+                claimed = outbox_repo.claim(
+                    self.worker_id, self.batch_size, self.outbox_lease
+                )
+                if time.monotonic() - backlog_sampled_at >= 1.0:
+                    self._outbox_backlog = outbox_repo.backlog()
+                    backlog_sampled_at = time.monotonic()
+            except Exception as e:
+                logger.error("Failed to claim outbox entries: %s", e, exc_info=True)
+                session.rollback()
+                claimed = []
+            finally:
+                session.close()
+            for order_id, instrument in claimed:
+                self._dispatch(order_id, instrument)
+            if len(claimed) == self.batch_size:
+                # There may be more due entries, claim again right away
+                self._outbox_wakeup.set()
+
+    def _worker(self, q: queue.Queue):
+        while True:
+            order_ids = self._next_batch(q)
+            try:
+                self._process_batch(order_ids, q)
+            finally:
+                for _ in order_ids:
+                    q.task_done()
+
+    def _next_batch(self, q: queue.Queue) -> list:
+        """Block for one order ID, then collect more until the batch is full or the window closes"""
+        order_ids = [q.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(order_ids) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                order_ids.append(
+                    q.get(timeout=timeout) if timeout > 0 else q.get_nowait()
+                )
+            except queue.Empty:
+                break
+        return order_ids
+
+    def _process_batch(self, order_ids: list, q: queue.Queue):
+        """Process a batch of orders as one unit of work, committed in a single transaction"""
+        logger.debug("Processing batch of order IDs: %s", order_ids)
+        self._dequeued(order_ids)
+        session = self.session_factory()
+        to_submit = []  # unmatched orders, submitted once the batch is committed
+        touched = set()  # orders whose book state changed within the batch
+        try:
+            matches = self._match_batch(session, order_ids, q, to_submit, touched)
+            events = self._order_events(session, touched)
+            with stage_seconds.labels("commit").time():
+                session.commit()
+            logger.debug(
+                "Committed batch of %s orders with %s matches", len(order_ids), matches
+            )
+            self._notify(events)
+        except Exception as e:
+            logger.error("Failed to commit batch %s: %s", order_ids, e, exc_info=True)
+            session.rollback()
+            # The books already reflect the lost batch, reload it from the database
+            self._reload(session, touched | set(order_ids), q)
+            to_submit = []
+        finally:
+            session.expunge_all()
+            session.close()
+
+        for order_id in to_submit:
+            # Placement overlaps with matching on the submission pool
+            self._submit(order_id, q)
+
+    def _match_batch(
+        self,
+        session: Session,
+        order_ids: list,
+        q: queue.Queue,
+        to_submit: list,
+        touched: set,
+    ) -> int:
+        """Match a batch and stage its writes in the session without committing.
+
+        Returns the number of matches recorded.
+        """
+        match_rows = []  # order_matching rows, inserted in bulk
+        # Load the whole batch into the identity map in one round trip. The
+        # rows stay locked until the batch commits, so a cancellation cannot
+        # land between reading an order's status and writing its new one
+        session.query(Order).filter(Order.id.in_(order_ids)).with_for_update().all()
+        for order_id in order_ids:
+            self._process_order(session, order_id, q, match_rows, to_submit, touched)
+        if match_rows:
+            OrderMatchingRepository(session).save_all(match_rows)
+        if self.durable_queue:
+            # Acknowledge the claimed entries together with the order updates.
+            # Unmatched orders keep theirs until the placement commits, so a
+            # crash in between leaves them to be claimed again
+            pending = set(to_submit)
+            OrderOutboxRepository(session).ack(
+                [i for i in order_ids if i not in pending], self.worker_id
+            )
+        return len(match_rows)
+
+    def _order_events(self, session: Session, order_ids) -> List[OrderEvent]:
+        """Snapshot changed orders of the session before it commits"""
+        return [OrderEvent.of(session.query(Order).get(i)) for i in order_ids]
+
+    def add_listener(self, listener: Callable[[List[OrderEvent]], None]):
+        """Register a callback for the orders changed by the processor"""
+        self._listeners.append(listener)
+
+    def _notify(self, events: List[OrderEvent]):
+        """Tell the listeners about committed changes, never failing the caller"""
+        if not events:
+            return
+        for listener in self._listeners:
+            try:
+                listener(events)
+            except Exception as e:
+                logger.error("Order listener failed: %s", e, exc_info=True)
+
+    def _dequeued(self, order_ids: list):
+        """Drop picked up orders from the pending ones"""
+        now = time.monotonic()
+        waits = []
+        with self._pending_lock:
+            for order_id in order_ids:
+                enqueued_at = self._pending.pop(order_id, None)
+                if enqueued_at is not None:
+                    waits.append(now - enqueued_at)
+        queue_wait = stage_seconds.labels("queue_wait")
+        for waited in waits:
+            queue_wait.observe(waited)
+        if self.on_dequeued is not None:
+            self.on_dequeued(order_ids)
+
+    def _process_order(
+        self,
+        session: Session,
+        order_id,
+        q: queue.Queue,
+        match_rows: list,
+        to_submit: list,
+        touched: set,
+    ):
+        """Match one order of a batch within its own savepoint"""
+        savepoint = session.begin_nested()
+        order_touched = set()
+        try:
+            order = session.query(Order).get(order_id)
+            if not order:
+                logger.debug("Order %s not found", order_id)
+                savepoint.commit()
+                self.retry_counts.pop(order_id, None)
+                self.order_books.remove_order(order_id)
+                return
+
+            order_book = self.order_books.get(order.instrument)
+            if order.status not in ("OPEN", "SUBMITTED"):
+                logger.debug("Order %s is not open or submitted", order_id)
+                savepoint.commit()
+                self.retry_counts.pop(order_id, None)
+                with order_book.lock:
+                    order_book.remove_order(order_id)
+                return
 
+            locked = self._lock_makers(session, order_book, order)
+            with order_book.lock, stage_seconds.labels("match").time():
                 # Add order to order book
-                self.order_book.add_order(order)
-
-                # Temporarily treat SUBMITTED as OPEN for matching
-                if order.status == "SUBMITTED":
-                    order.status = "OPEN"
-                    session.commit()
-
-                matches = self._find_matches(session, order)
-                if not matches:
-                    logger.debug(f"No matches for order {order_id}")
-                    try:
-                        place_order(order)
-                        order.status = "SUBMITTED"
-                        session.commit()
-                        logger.info(
-                            f"Order submitted to exchange without match: {order.id}"
-                        )
-                        self.retry_counts.pop(order_id, None)
-                    except OrderPlacementError as e:
-                        retry_count = self.retry_counts.get(order_id, 0)
-                        if (
-                            retry_count < self.max_retries
-                            and "Connection not available" in str(e)
-                        ):
-                            self.retry_counts[order_id] = retry_count + 1
-                            logger.warning(
-                                f"Transient error for order {order_id} (attempt {retry_count + 1}/{self.max_retries}): {str(e)}. "
-                                f"Re-enqueuing after {self.retry_delay}s delay."
-                            )
-                            session.commit()
-                            time.sleep(self.retry_delay)
-                            self.q.put(order_id)
-                            continue
-                        else:
-                            logger.error(
-                                f"Failed to place order {order_id} after {retry_count} retries: {str(e)}"
-                            )
-                            order.status = "FAILED"
-                            session.commit()
-                            self.retry_counts.pop(order_id, None)
-                            self.order_book.remove_order(order_id)
-                            continue
+                taker = order_book.add_order(order)
+                rows_before = len(match_rows)
+                try:
+                    filled = self._execute_matches(
+                        session,
+                        order_book,
+                        order,
+                        taker,
+                        match_rows,
+                        order_touched,
+                        locked,
+                    )
+                except Exception:
+                    del match_rows[rows_before:]
+                    raise
+
+            savepoint.commit()
+            touched |= order_touched
+            if not filled:
+                logger.debug("No matches for order %s", order_id)
+                to_submit.append(order_id)
+            else:
+                logger.info("Order %s processed successfully with matches", order_id)
+                self.retry_counts.pop(order_id, None)
+
+        except Exception as e:
+            logger.error("Failed to process order %s: %s", order_id, e, exc_info=True)
+            savepoint.rollback()
+            self.retry_counts.pop(order_id, None)
+            self.order_books.remove_order(order_id)
+            # Resting orders filled against it were rolled back, reload them
+            self._reload(session, order_touched - {order_id}, q)
+
+    def _reload(self, session: Session, order_ids, q: queue.Queue, attempt: int = 0):
+        """Rebuild the book entries of orders whose changes were rolled back.
+
+        Entries are restored from the orders' database rows, except for orders
+        still OPEN, which are re-enqueued right away to be matched as takers. If the rows
+        cannot be read, the orders leave the book until a later reload.
+        """
+        if not order_ids:
+            return
+        try:
+            orders = [(i, session.query(Order).get(i)) for i in order_ids]
+        except Exception as e:
+            logger.error("Failed to reload orders %s: %s", order_ids, e, exc_info=True)
+            for order_id in order_ids:
+                self.order_books.remove_order(order_id)
+            if attempt < self.max_retries:
+                order_ids = set(order_ids)
+                self.retry_scheduler.schedule(
+                    attempt, lambda: self._reload_later(order_ids, q, attempt + 1)
+                )
+            return
+
+        for order_id, order in orders:
+            if order is None:
+                self.order_books.remove_order(order_id)
+                continue
+            order_book = self.order_books.get(order.instrument)
+            with order_book.lock:
+                if order.status == "OPEN":
+                    # Not matched yet, it rejoins the book when processed again
+                    order_book.remove_order(order_id)
                 else:
-                    remaining_quantity = order.quantity
-                    for match in matches:
-                        if remaining_quantity <= 0:
-                            break
-
-                        matched_quantity = min(remaining_quantity, match.quantity)
-                        logger.debug(
-                            f"Matched order {order.id} with {match.id}: {matched_quantity} units"
-                        )
-
-                        # Record match
-                        match_record = OrderMatching(
-                            order_buy_id=(
-                                order.id if order.side.lower() == "buy" else match.id
-                            ),
-                            order_sell_id=(
-                                order.id if order.side.lower() == "sell" else match.id
-                            ),
-                            matched_quantity=matched_quantity,
-                            instrument=order.instrument,
-                        )
-                        order_matching_repo.save(match_record)
-
-                        # Update quantities
-                        order.quantity -= matched_quantity
-                        match.quantity -= matched_quantity
-                        order.status = "MATCHED" if order.quantity == 0 else "PARTIAL"
-                        match.status = "MATCHED" if match.quantity == 0 else "PARTIAL"
-                        remaining_quantity -= matched_quantity
-
-                        # Update order book
-                        if order.quantity == 0:
-                            self.order_book.remove_order(order.id)
-                        if match.quantity == 0:
-                            self.order_book.remove_order(match.id)
-
-                        logger.info(
-                            f"Updated orders: {order.id} ({order.quantity}), {match.id} ({match.quantity})"
-                        )
-
-                    session.commit()
-                    logger.info(f"Order {order_id} processed successfully with matches")
-                    self.retry_counts.pop(order_id, None)
+                    order_book.restore(order)
+            if order.status == "OPEN":
+                self._requeue(q, order_id)
 
-            except Exception as e:
-                logger.error(
-                    f"Failed to process order {order_id}: {str(e)}", exc_info=True
+    def _reload_later(self, order_ids, q: queue.Queue, attempt: int):
+        """Retry a failed reload in a session of its own, called from the retry scheduler"""
+        session = self.session_factory()
+        try:
+            self._reload(session, order_ids, q, attempt)
+        finally:
+            session.close()
+
+    def _requeue(self, q: queue.Queue, order_id):
+        """Put an order back on a worker queue, called from the retry scheduler"""
+        q.put(order_id)
+
+    def _submit(self, order_id, q: queue.Queue):
+        """Hand an unmatched order to the submission pool, waiting if it is full"""
+        self._submit_slots.acquire()
+        try:
+            future = self.submit_pool.submit(self._place, order_id, q)
+        except Exception:
+            self._submit_slots.release()
+            raise
+        future.add_done_callback(lambda _: self._submit_slots.release())
+
+    def _place(self, order_id, q: queue.Queue):
+        """Place an unmatched order at the stock exchange, runs on the submission pool"""
+        session = self.session_factory()
+        try:
+            order = self._placement_target(session, order_id)
+            if order is None:
+                return
+            try:
+                with stage_seconds.labels("place_order").time():
+                    place_order(order)
+                error = None
+            except OrderPlacementError as e:
+                error = e
+            if self._placement_done(session, order, error, q):
+                self.order_books.remove_order(order_id)
+        except Exception as e:
+            logger.error("Failed to submit order %s: %s", order_id, e, exc_info=True)
+            session.rollback()
+            self.retry_counts.pop(order_id, None)
+            self.order_books.remove_order(order_id)
+        finally:
+            session.expunge_all()
+            session.close()
+
+    def _placement_target(self, session: Session, order_id):
+        """Reload an order before placement, None if it no longer needs it"""
+        order = session.query(Order).get(order_id)
+        if not order or order.status not in ("OPEN", "SUBMITTED"):
+            # Filled, cancelled or removed while waiting for submission
+            logger.debug("Order %s no longer needs submission", order_id)
+            if self.durable_queue:
+                self._ack_placement(session, order_id)
+                session.commit()
+            self.retry_counts.pop(order_id, None)
+            return None
+        return order
+
+    def _placement_done(
+        self,
+        session: Session,
+        order: Order,
+        error: OrderPlacementError,
+        q: queue.Queue,
+    ) -> bool:
+        """Record the outcome of a placement, parking or failing it on error.
+
+        Returns True if the order failed, the caller then takes it out of its book.
+        """
+        order_id = order.id
+        # Re-read under a row lock, the order may have been cancelled during the call
+        session.refresh(order, with_for_update=True)
+        if order.status not in ("OPEN", "SUBMITTED"):
+            logger.debug("Order %s no longer needs submission", order_id)
+            self._ack_placement(session, order_id)
+            session.commit()
+            self.retry_counts.pop(order_id, None)
+            return False
+        if error is None:
+            # Matching may have moved the order on while it was placed
+            events = []
+            if order.status == "OPEN":
+                order.status = "SUBMITTED"
+                events.append(OrderEvent.of(order))
+            self._ack_placement(session, order_id)
+            session.commit()
+            logger.info("Order submitted to exchange without match: %s", order.id)
+            self.retry_counts.pop(order_id, None)
+            self._notify(events)
+            return False
+
+        retry_count = self.retry_counts.get(order_id, 0)
+        if retry_count < self.max_retries and "Connection not available" in str(error):
+            self.retry_counts[order_id] = retry_count + 1
+            placement_retries.inc()
+            # Park the order instead of sleeping, it is re-enqueued when due
+            if self.durable_queue:
+                delay = self.retry_scheduler.backoff(retry_count)
+                outbox_repo = OrderOutboxRepository(session)
+                if not outbox_repo.release(order_id, self.worker_id, delay):
+                    outbox_repo.add(order_id, order.instrument, delay)
+                session.commit()
+            else:
+                session.commit()
+                delay = self.retry_scheduler.schedule(
+                    retry_count, lambda: self._requeue(q, order_id)
                 )
-                session.rollback()
-                self.retry_counts.pop(order_id, None)
-                self.order_book.remove_order(order_id)
-            finally:
-                session.expunge_all()
-                session.close()
-                self.q.task_done()
+            logger.warning(
+                "Transient error for order %s (attempt %s/%s): %s. "
+                "Re-enqueuing after %.2fs delay.",
+                order_id,
+                retry_count + 1,
+                self.max_retries,
+                error,
+                delay,
+            )
+        else:
+            logger.error(
+                "Failed to place order %s after %s retries: %s",
+                order_id,
+                retry_count,
+                error,
+            )
+            order.status = "FAILED"
+            event = OrderEvent.of(order)
+            placement_failures.inc()
+            self._ack_placement(session, order_id)
+            session.commit()
+            self.retry_counts.pop(order_id, None)
+            self._notify([event])
+            return True
+        return False
+
+    def _ack_placement(self, session: Session, order_id):
+        """Acknowledge the outbox entry of a placed order with its outcome"""
+        if self.durable_queue:
+            OrderOutboxRepository(session).ack([order_id], self.worker_id)
+
+    def _lock_makers(self, session: Session, order_book: OrderBook, order: Order):
+        """Lock the resting orders an order is about to fill in one round trip.
+
+        Runs before the book lock is taken, so matching does not hold the book
+        while waiting on the database. Returns the IDs of the locked orders.
+        """
+        with order_book.lock:
+            maker_ids = [
+                match.id
+                for match in order_book.iter_matching_orders(order, order.quantity)
+            ]
+        if maker_ids:
+            session.query(Order).filter(Order.id.in_(maker_ids)).with_for_update().all()
+        return set(maker_ids)
+
+    def _execute_matches(
+        self,
+        session: Session,
+        order_book: OrderBook,
+        order: Order,
+        taker: RestingOrder,
+        match_rows: list,
+        touched: set,
+        locked: set = frozenset(),
+    ) -> int:
+        """Fill the order against the book, writing back only the orders that change.
+
+        Match rows are appended to `match_rows` and the IDs of changed orders to
+        `touched`; nothing is committed here. Resting orders in `locked` were
+        already loaded under a row lock. Returns the filled quantity, 0 when
+        nothing matched.
+        """
+        filled = 0
+        is_buy = taker.side is OrderSide.BUY
+        # Unbounded but lazy: the loop stops once the taker is filled, so resting
+        # orders skipped below do not use up its quantity
+        for match in order_book.iter_matching_orders(taker):
+            # Only orders that are actually filled are loaded, locked and
+            # re-read so that a committed cancellation is seen. Orders that
+            # joined the book since the bulk lock are locked one by one
+            if match.id in locked:
+                match_order = session.query(Order).get(match.id)
+            else:
+                match_order = session.query(Order).with_for_update().get(match.id)
+            if match_order is None or match_order.status not in RESTING_STATUSES:
+                # Cancellations from other processes may reach the book late
+                logger.debug("Resting order %s is gone, dropping it", match.id)
+                order_book.remove_order(match.id)
+                continue
+
+            matched_quantity = min(taker.quantity, match.quantity)
+            logger.debug(
+                "Matched order %s with %s: %s units",
+                order.id,
+                match.id,
+                matched_quantity,
+            )
+
+            # Record match
+            match_rows.append(
+                dict(
+                    order_buy_id=(order.id if is_buy else match.id),
+                    order_sell_id=(match.id if is_buy else order.id),
+                    matched_quantity=matched_quantity,
+                    instrument=order.instrument,
+                )
+            )
+
+            # Update order book, fully filled orders leave it
+            order_book.fill(taker, matched_quantity)
+            order_book.fill(match, matched_quantity)
+            touched.update((order.id, match.id))
+            filled += matched_quantity
+
+            # Write the new state back to the database with the batch
+            order.quantity = taker.quantity
+            match_order.quantity = match.quantity
+            order.status = "MATCHED" if order.quantity == 0 else "PARTIAL"
+            match_order.status = "MATCHED" if match.quantity == 0 else "PARTIAL"
+
+            logger.debug(
+                "Updated orders: %s (%s), %s (%s)",
+                order.id,
+                order.quantity,
+                match.id,
+                match.quantity,
+            )
+            if taker.quantity == 0:
+                break
+
+        return filled
 
-    def _find_matches(self, session: Session, order: Order):
-        """Find matching orders using the order book, ensuring orders are bound to the session"""
-        # Merge the order into the current session to ensure it's attached
-        order = session.merge(order, load=True)
-        matches = self.order_book.get_matching_orders(order)
-        # Merge matching orders into the current session
-        matches = [session.merge(match, load=True) for match in matches]
-        return matches
+    def cancel(self, order: Order):
+        """Take a resting order out of its book so it can no longer be matched"""
+        self.cancel_id(order.id, order.instrument)
+
+    async def cancel_async(self, order: Order):
+        """`cancel` for the async API, the books are guarded by their thread locks"""
+        self.cancel(order)
+
+    def cancel_id(self, order_id, instrument: str):
+        logger.info("Cancelling order: %s", order_id)
+        if self.engine_pool is not None:
+            self.engine_pool.cancel(order_id, instrument)
+        else:
+            self._cancel(order_id, instrument)
+
+    def _cancel(self, order_id, instrument: str):
+        order_book = self.order_books.get(instrument)
+        with order_book.lock:
+            order_book.remove_order(order_id)
+        self.retry_counts.pop(order_id, None)
+
+    def queue_depth(self) -> int:
+        """Number of accepted orders waiting to be processed"""
+        if self.durable_queue:
+            return self._outbox_backlog[0]
+        return len(self._pending)
+
+    def queue_lag(self) -> float:
+        """Seconds the oldest waiting order has been queued"""
+        if self.durable_queue:
+            oldest = self._outbox_backlog[1]
+            if oldest is None:
+                return 0.0
+            return max(0.0, (datetime.now() - oldest).total_seconds())
+        with self._pending_lock:
+            oldest = next(iter(self._pending.values()), None)
+        return time.monotonic() - oldest if oldest is not None else 0.0
+
+    def is_saturated(self) -> bool:
+        """Whether the queue reached its high-water mark and new orders should be shed"""
+        return 0 < self.max_queue_depth <= self.queue_depth()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth(),
+            "queue_lag_seconds": round(self.queue_lag(), 3),
+            "max_queue_depth": self.max_queue_depth,
+            "saturated": self.is_saturated(),
+            "retry_backlog": len(self.retry_scheduler),
+            "engine_processes": self.engine_pool.processes if self.engine_pool else 0,
+        }
+
+    def stop(self):
+        """Stop claiming outbox entries and accepting exchange submissions"""
+        self._stopped.set()
+        self._outbox_wakeup.set()
+        self.submit_pool.shutdown(wait=False)
+        if self.engine_pool is not None:
+            self.engine_pool.stop()
+        logger.info("StockExchangeProcessor stopped")
 
     def enqueue(self, order: Order):
-        logger.info(f"Enqueuing order: {order.id}")
-        self.q.put(order.id)
+        self.enqueue_id(order.id, order.instrument)
+
+    def enqueue_many(self, orders: List[Order]):
+        """Enqueue a batch of saved orders at once"""
+        logger.info("Enqueuing %s orders", len(orders))
+        if self.durable_queue:
+            self._outbox_wakeup.set()
+            return
+        now = time.monotonic()
+        with self._pending_lock:
+            for order in orders:
+                self._pending.setdefault(order.id, now)
+        for order in orders:
+            self._dispatch(order.id, order.instrument)
+
+    def enqueue_id(self, order_id, instrument: str):
+        logger.debug("Enqueuing order: %s", order_id)
+        if self.durable_queue:
+            # Already in the outbox with the order, just claim it without delay
+            self._outbox_wakeup.set()
+        else:
+            with self._pending_lock:
+                self._pending.setdefault(order_id, time.monotonic())
+            self._dispatch(order_id, instrument)
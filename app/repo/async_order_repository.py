@@ -0,0 +1,125 @@
+from typing import List, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
+
+from app.dto.order_request import OrderFilter
+from app.entity.idempotency_key import IdempotencyKey
+from app.entity.order import Order
+from app.entity.order_matching import OrderMatching
+from app.repo.order_matching_repository import select_fills_export
+from app.repo.order_outbox_repository import OrderOutboxRepository
+from app.repo.order_repository import (
+    CANCELLABLE_STATUSES,
+    insert_rows,
+    select_export,
+    select_page,
+)
+
+
+class AsyncOrderRepository:
+    """OrderRepository for asyncio sessions, every database round trip is awaited"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def save(
+        self, order: Order, idempotency_key: Optional[IdempotencyKey] = None
+    ) -> Order:
+        self.db.add(order)
+        await self._add_idempotency_key(order, idempotency_key)
+        await self.db.commit()
+        await self.db.refresh(order)
+        return order
+
+    async def _add_idempotency_key(
+        self, order: Order, idempotency_key: Optional[IdempotencyKey]
+    ):
+        """Stage the key of a new order in the order's transaction"""
+        if idempotency_key is not None:
+            await self.db.flush()
+            idempotency_key.order_id = order.id
+            self.db.add(idempotency_key)
+
+    async def save_with_outbox(
+        self, order: Order, idempotency_key: Optional[IdempotencyKey] = None
+    ) -> Order:
+        """
+        Save an order together with its outbox entry in one transaction, so an
+        accepted order is never lost before the processor picks it up.
+        """
+        self.db.add(order)
+        await self.db.flush()
+        OrderOutboxRepository(self.db).add(order.id, order.instrument)
+        await self._add_idempotency_key(order, idempotency_key)
+        await self.db.commit()
+        await self.db.refresh(order)
+        return order
+
+    async def save_all(self, orders: List[Order], outbox: bool = False) -> List[Order]:
+        """
+        Insert orders with a single multi-row INSERT in one transaction, see
+        OrderRepository.save_all.
+        """
+        if not orders:
+            return orders
+        await self.db.execute(insert(Order).values(insert_rows(orders)))
+        result = await self.db.execute(
+            select(Order.order_id, Order.id).where(
+                Order.order_id.in_([order.order_id for order in orders])
+            )
+        )
+        ids = dict(result.all())
+        for order in orders:
+            order.id = ids[order.order_id]
+        if outbox:
+            await self.db.run_sync(
+                lambda db: OrderOutboxRepository(db).add_all(
+                    (order.id, order.instrument) for order in orders
+                )
+            )
+        await self.db.commit()
+        return orders
+
+    async def get_by_order_id(self, order_id: str) -> Optional[Order]:
+        result = await self.db.execute(select(Order).where(Order.order_id == order_id))
+        return result.scalars().first()
+
+    async def get_idempotency_key(self, key: str) -> Optional[IdempotencyKey]:
+        return await self.db.get(IdempotencyKey, key)
+
+    async def get_fills(self, order_id: int) -> List[OrderMatching]:
+        """Order matchings the order took part in, on either side"""
+        result = await self.db.execute(
+            select(OrderMatching).where(
+                (OrderMatching.order_buy_id == order_id)
+                | (OrderMatching.order_sell_id == order_id)
+            )
+        )
+        return result.scalars().all()
+
+    async def list_page(
+        self, filters: OrderFilter, after: Optional[int], limit: int
+    ) -> List[Order]:
+        """Up to `limit` + 1 orders following `after`, see select_page"""
+        result = await self.db.execute(select_page(filters, after, limit))
+        return result.scalars().all()
+
+    async def stream(self, filters: OrderFilter) -> AsyncResult:
+        """Export rows of the matching orders, fetched from a server-side cursor"""
+        return await self.db.stream(select_export(filters))
+
+    async def stream_fills(self, filters: OrderFilter) -> AsyncResult:
+        """Export rows of the matching fills, see select_fills_export"""
+        return await self.db.stream(select_fills_export(filters))
+
+    async def cancel(self, order: Order) -> bool:
+        """Flip the order to CANCELLED unless it was filled or failed meanwhile"""
+        result = await self.db.execute(
+            update(Order)
+            .where(Order.id == order.id, Order.status.in_(CANCELLABLE_STATUSES))
+            .values(status="CANCELLED")
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        return result.rowcount == 1
@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.entity.idempotency_key import IdempotencyKey
+
+
+class IdempotencyKeyRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(self, key: str) -> Optional[IdempotencyKey]:
+        # Expired keys are still honored until they are deleted, so a retry
+        # never collides with a leftover row
+        return self.db.query(IdempotencyKey).get(key)
+
+    def delete_expired(self, now: datetime, limit: int = 1000) -> int:
+        """Delete up to `limit` keys expired by `now`, returns how many"""
+        keys = [
+            key
+            for (key,) in self.db.query(IdempotencyKey.key)
+            .filter(IdempotencyKey.expires_at <= now)
+            .order_by(IdempotencyKey.expires_at)
+            .limit(limit)
+        ]
+        if keys:
+            self.db.query(IdempotencyKey).filter(IdempotencyKey.key.in_(keys)).delete(
+                synchronize_session=False
+            )
+        self.db.commit()
+        return len(keys)
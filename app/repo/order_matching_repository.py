@@ -1,10 +1,43 @@
 from typing import List  # Import List for type hint
 
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select
+from sqlalchemy.engine import Result
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.sql import Select
 
+from app.dto.order_request import OrderFilter
+from app.entity.order import Order
 from app.entity.order_matching import OrderMatching
 
 
+def select_fills_export(filters: OrderFilter) -> Select:
+    """
+    Fills with the public order IDs of both sides, for reconciliation. They are
+    filtered by instrument and match time, the other filters apply to orders.
+    """
+    buy = aliased(Order)
+    sell = aliased(Order)
+    query = (
+        select(
+            OrderMatching.id,
+            buy.order_id.label("buy_order_id"),
+            sell.order_id.label("sell_order_id"),
+            OrderMatching.instrument,
+            OrderMatching.matched_quantity,
+            OrderMatching.matched_at,
+        )
+        .join(buy, buy.id == OrderMatching.order_buy_id)
+        .join(sell, sell.id == OrderMatching.order_sell_id)
+    )
+    if filters.instrument is not None:
+        query = query.where(OrderMatching.instrument == filters.instrument)
+    if filters.created_from is not None:
+        query = query.where(OrderMatching.matched_at >= filters.created_from)
+    if filters.created_to is not None:
+        query = query.where(OrderMatching.matched_at < filters.created_to)
+    return query.order_by(OrderMatching.id).execution_options(stream_results=True)
+
+
 class OrderMatchingRepository:
     def __init__(self, db: Session):
         self.db = db
@@ -15,6 +48,14 @@ class OrderMatchingRepository:
         self.db.refresh(order_matching)
         return order_matching
 
+    def save_all(self, rows: List[dict]) -> int:
+        """
+        Insert many order matchings with one executemany, committed by the caller.
+        """
+        if rows:
+            self.db.execute(insert(OrderMatching), rows)
+        return len(rows)
+
     def get_by_order_id(self, order_id: int) -> List[OrderMatching]:
         return (
             self.db.query(OrderMatching)
@@ -24,3 +65,7 @@ class OrderMatchingRepository:
             )
             .all()
         )
+
+    def stream(self, filters: OrderFilter) -> Result:
+        """Export rows of the matching fills, fetched from a server-side cursor"""
+        return self.db.execute(select_fills_export(filters))
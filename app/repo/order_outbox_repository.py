@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, insert, or_
+from sqlalchemy.orm import Session
+
+from app.entity.order_outbox import OrderOutbox
+
+
+class OrderOutboxRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def add(self, order_id: int, instrument: str, delay: float = 0.0) -> OrderOutbox:
+        """
+        Queue an order for processing, committed with the caller's transaction.
+        """
+        now = datetime.now()
+        entry = OrderOutbox(
+            order_id=order_id,
+            instrument=instrument,
+            created_at=now,
+            available_at=now + timedelta(seconds=delay),
+        )
+        self.db.add(entry)
+        return entry
+
+    def add_all(self, entries: Iterable[Tuple[int, str]]) -> int:
+        """
+        Queue many orders with one multi-row INSERT, committed by the caller.
+        """
+        now = datetime.now()
+        rows = [
+            dict(
+                order_id=order_id,
+                instrument=instrument,
+                created_at=now,
+                available_at=now,
+            )
+            for order_id, instrument in entries
+        ]
+        if rows:
+            self.db.execute(insert(OrderOutbox).values(rows))
+        return len(rows)
+
+    def claim(
+        self, worker_id: str, limit: int, lease_seconds: float
+    ) -> List[Tuple[int, str]]:
+        """
+        Claim up to `limit` due entries for a lease and return their
+        (order_id, instrument) pairs.
+
+        Rows locked by other processors are skipped (FOR UPDATE SKIP LOCKED on
+        MySQL, SQLite serializes writers instead), and entries whose lease ran
+        out are claimable again, so a crashed processor's work is picked up.
+        """
+        now = datetime.now()
+        entries = (
+            self.db.query(OrderOutbox)
+            .filter(
+                OrderOutbox.available_at <= now,
+                or_(
+                    OrderOutbox.claimed_until.is_(None),
+                    OrderOutbox.claimed_until < now,
+                ),
+            )
+            .order_by(OrderOutbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        claimed = []
+        for entry in entries:
+            entry.claimed_by = worker_id
+            entry.claimed_until = now + timedelta(seconds=lease_seconds)
+            claimed.append((entry.order_id, entry.instrument))
+        self.db.commit()
+        return claimed
+
+    def ack(self, order_ids: Iterable[int], worker_id: str) -> int:
+        """
+        Remove processed entries, committed with the caller's order updates.
+        """
+        return (
+            self.db.query(OrderOutbox)
+            .filter(
+                OrderOutbox.order_id.in_(list(order_ids)),
+                OrderOutbox.claimed_by == worker_id,
+            )
+            .delete(synchronize_session=False)
+        )
+
+    def release(self, order_id: int, worker_id: str, delay: float = 0.0) -> int:
+        """
+        Hand a claimed entry back to be claimed again after `delay` seconds,
+        committed by the caller. Returns 0 if the worker does not hold it.
+        """
+        return (
+            self.db.query(OrderOutbox)
+            .filter(
+                OrderOutbox.order_id == order_id,
+                OrderOutbox.claimed_by == worker_id,
+            )
+            .update(
+                dict(
+                    available_at=datetime.now() + timedelta(seconds=delay),
+                    claimed_by=None,
+                    claimed_until=None,
+                ),
+                synchronize_session=False,
+            )
+        )
+
+    def backlog(self) -> Tuple[int, Optional[datetime]]:
+        """
+        Number of queued entries and the creation time of the oldest one.
+        """
+        count, oldest = self.db.query(
+            func.count(OrderOutbox.id), func.min(OrderOutbox.created_at)
+        ).one()
+        self.db.commit()
+        return count, oldest
@@ -1,14 +1,171 @@
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.engine import Result
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
 
+from app.dto.order_request import OrderFilter
+from app.entity.idempotency_key import IdempotencyKey
 from app.entity.order import Order
+from app.repo.order_outbox_repository import OrderOutboxRepository
+
+# Statuses of orders that still rest in the book and may be cancelled
+CANCELLABLE_STATUSES = ("OPEN", "SUBMITTED", "PARTIAL")
+
+# Columns written when orders are inserted in bulk
+INSERT_COLUMNS = (
+    "order_id",
+    "created_at",
+    "type",
+    "side",
+    "instrument",
+    "limit_price",
+    "limit_price_ticks",
+    "quantity",
+    "status",
+)
+
+
+# Columns of exported orders, by their public order_id
+EXPORT_COLUMNS = (
+    Order.order_id.label("id"),
+    Order.created_at,
+    Order.type,
+    Order.side,
+    Order.instrument,
+    Order.limit_price,
+    Order.quantity,
+    Order.status,
+)
+
+
+def filter_orders(query: Select, filters: OrderFilter) -> Select:
+    """Apply the listing filters to a select over orders"""
+    if filters.instrument is not None:
+        query = query.where(Order.instrument == filters.instrument)
+    if filters.status is not None:
+        query = query.where(Order.status == filters.status.value)
+    if filters.side is not None:
+        query = query.where(Order.side == filters.side.value)
+    if filters.created_from is not None:
+        query = query.where(Order.created_at >= filters.created_from)
+    if filters.created_to is not None:
+        query = query.where(Order.created_at < filters.created_to)
+    return query
+
+
+def select_page(filters: OrderFilter, after: Optional[int], limit: int) -> Select:
+    """
+    Keyset page of orders after the primary key `after`, with one extra row
+    telling whether another page follows. Unlike an offset, seeking by key
+    costs the same on every page.
+    """
+    query = filter_orders(select(Order), filters)
+    if after is not None:
+        query = query.where(Order.id > after)
+    return query.order_by(Order.id).limit(limit + 1)
+
+
+def select_export(filters: OrderFilter) -> Select:
+    return (
+        filter_orders(select(*EXPORT_COLUMNS), filters)
+        .order_by(Order.id)
+        .execution_options(stream_results=True)
+    )
+
+
+def insert_rows(orders: List[Order]) -> List[dict]:
+    """Fill in the column defaults of new orders and return their insert rows"""
+    now = datetime.now()
+    for order in orders:
+        order.created_at = order.created_at or now
+        order.status = order.status or "OPEN"
+    return [{c: getattr(order, c) for c in INSERT_COLUMNS} for order in orders]
 
 
 class OrderRepository:
     def __init__(self, db: Session):
         self.db = db
 
-    def save(self, order: Order) -> Order:
+    def save(
+        self, order: Order, idempotency_key: Optional[IdempotencyKey] = None
+    ) -> Order:
         self.db.add(order)
+        self._add_idempotency_key(order, idempotency_key)
         self.db.commit()
         self.db.refresh(order)
         return order
+
+    def _add_idempotency_key(
+        self, order: Order, idempotency_key: Optional[IdempotencyKey]
+    ):
+        """Stage the key of a new order in the order's transaction"""
+        if idempotency_key is not None:
+            self.db.flush()
+            idempotency_key.order_id = order.id
+            self.db.add(idempotency_key)
+
+    def save_with_outbox(
+        self, order: Order, idempotency_key: Optional[IdempotencyKey] = None
+    ) -> Order:
+        """
+        Save an order together with its outbox entry in one transaction, so an
+        accepted order is never lost before the processor picks it up.
+        """
+        self.db.add(order)
+        self.db.flush()
+        OrderOutboxRepository(self.db).add(order.id, order.instrument)
+        self._add_idempotency_key(order, idempotency_key)
+        self.db.commit()
+        self.db.refresh(order)
+        return order
+
+    def save_all(self, orders: List[Order], outbox: bool = False) -> List[Order]:
+        """
+        Insert orders with a single multi-row INSERT in one transaction and set
+        their primary keys, read back by their unique order_id. With `outbox`
+        their outbox entries are written in the same transaction.
+        """
+        if not orders:
+            return orders
+        self.db.execute(insert(Order).values(insert_rows(orders)))
+        ids = dict(
+            self.db.execute(
+                select(Order.order_id, Order.id).where(
+                    Order.order_id.in_([order.order_id for order in orders])
+                )
+            ).all()
+        )
+        for order in orders:
+            order.id = ids[order.order_id]
+        if outbox:
+            OrderOutboxRepository(self.db).add_all(
+                (order.id, order.instrument) for order in orders
+            )
+        self.db.commit()
+        return orders
+
+    def get_by_order_id(self, order_id: str) -> Optional[Order]:
+        return self.db.query(Order).filter(Order.order_id == order_id).first()
+
+    def list_page(
+        self, filters: OrderFilter, after: Optional[int], limit: int
+    ) -> List[Order]:
+        """Up to `limit` + 1 orders following `after`, see select_page"""
+        return self.db.execute(select_page(filters, after, limit)).scalars().all()
+
+    def stream(self, filters: OrderFilter) -> Result:
+        """Export rows of the matching orders, fetched from a server-side cursor"""
+        return self.db.execute(select_export(filters))
+
+    def cancel(self, order: Order) -> bool:
+        """Flip the order to CANCELLED unless it was filled or failed meanwhile"""
+        updated = (
+            self.db.query(Order)
+            .filter(Order.id == order.id, Order.status.in_(CANCELLABLE_STATUSES))
+            .update({Order.status: "CANCELLED"}, synchronize_session=False)
+        )
+        self.db.commit()
+        return updated == 1
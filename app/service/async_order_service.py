@@ -0,0 +1,172 @@
+import time
+from typing import AsyncIterator, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.dto.order_request import CreateOrderModel, OrderFilter
+from app.dto.order_response import (
+    BatchOrderResponse,
+    OrderPageResponse,
+    OrderResponse,
+    OrderStatusResponse,
+)
+from app.dto.types import ExportFormat
+from app.exception.order_exception import OrderNotFoundException
+from app.mapper.order_mapper import OrderMapper
+from app.processor.order_event import OrderEvent
+from app.repo.async_order_repository import AsyncOrderRepository
+from app.service.order_service_base import OrderServiceBase
+from app.utils.export import aiter_export
+from app.utils.logger import get_logger
+from app.utils.metrics import stage_seconds
+
+logger = get_logger("async_order_service")
+
+
+class AsyncOrderService(OrderServiceBase):
+    """
+    OrderService for the asyncio path. Each call works in its own AsyncSession
+    from `session_factory`, so concurrent requests never share a session and a
+    slow insert only suspends its own request.
+    """
+
+    def __init__(
+        self, session_factory: sessionmaker, mapper: OrderMapper, *args, **kwargs
+    ):
+        super().__init__(mapper, *args, **kwargs)
+        self.session_factory = session_factory
+        logger.info("AsyncOrderService initialized")
+
+    async def create_order(
+        self, order: CreateOrderModel, idempotency_key: Optional[str] = None
+    ) -> OrderResponse:
+        logger.debug("Creating order: %s", order)
+        request_hash = None
+        if idempotency_key is not None:
+            # Retries of a created order get its response without a new insert
+            request_hash = self.mapper.request_hash(order)
+            replayed = await self._replay(idempotency_key, request_hash)
+            if replayed is not None:
+                return replayed
+        self._check_admission()
+        db_order, key = self._new_order(order, idempotency_key, request_hash)
+        async with self.session_factory() as db:
+            repository = AsyncOrderRepository(db)
+            try:
+                with stage_seconds.labels("save").time():
+                    if self.outbox:
+                        saved_order = await repository.save_with_outbox(db_order, key)
+                    else:
+                        saved_order = await repository.save(db_order, key)
+            except IntegrityError:
+                await db.rollback()
+                # A concurrent request with the same key created the order first
+                replayed = None
+                if key is not None:
+                    replayed = await self._replay(idempotency_key, request_hash)
+                if replayed is None:
+                    raise
+                return replayed
+            logger.debug("Saved order: %s", saved_order.id)
+            self.processor.enqueue(saved_order)
+            response_dict = self.mapper.to_response(saved_order)
+        logger.info("Order created successfully: %s", saved_order.id)
+        return self._created(response_dict, key, request_hash)
+
+    async def _replay(
+        self, idempotency_key: str, request_hash: str
+    ) -> Optional[OrderResponse]:
+        """Response of the order created with a key, None if the key is new"""
+        cached = self._cached_replay(idempotency_key)
+        row = None
+        if cached is None:
+            async with self.session_factory() as db:
+                row = await AsyncOrderRepository(db).get_idempotency_key(
+                    idempotency_key
+                )
+        return self._replayed(idempotency_key, request_hash, cached, row)
+
+    async def create_orders(self, items: list) -> BatchOrderResponse:
+        """
+        Create a batch of orders with one insert, reporting the outcome per item.
+        Invalid items are rejected without failing the valid ones.
+        """
+        logger.info("Creating batch of %s orders", len(items))
+        self._check_batch_size(items)
+        self._check_admission()
+        with stage_seconds.labels("validate").time():
+            entities, errors = self.mapper.batch_to_entities(items)
+        async with self.session_factory() as db:
+            with stage_seconds.labels("save").time():
+                saved_orders = await AsyncOrderRepository(db).save_all(
+                    [entity for _, entity in entities], outbox=self.outbox
+                )
+        if saved_orders:
+            self.processor.enqueue_many(saved_orders)
+        return self._batch_response(entities, errors, saved_orders)
+
+    async def get_order(self, order_id: str) -> OrderStatusResponse:
+        logger.debug("Reading order: %s", order_id)
+        if self.cache is not None:
+            cached = self.cache.get(order_id)
+            if cached is not None:
+                return cached
+        loaded_at = time.monotonic()
+        async with self.session_factory() as db:
+            repository = AsyncOrderRepository(db)
+            order = await repository.get_by_order_id(order_id)
+            if order is None:
+                raise OrderNotFoundException(f"Order {order_id} not found")
+            fills = await repository.get_fills(order.id)
+        response = OrderStatusResponse(**self.mapper.to_status_response(order, fills))
+        if self.cache is not None:
+            self.cache.put(response, order.id, since=loaded_at)
+        return response
+
+    async def list_orders(
+        self, filters: OrderFilter, after: Optional[int], limit: int
+    ) -> OrderPageResponse:
+        async with self.session_factory() as db:
+            orders = await AsyncOrderRepository(db).list_page(filters, after, limit)
+        return self._page(orders, limit)
+
+    async def export_orders(
+        self, filters: OrderFilter, fmt: ExportFormat
+    ) -> AsyncIterator[str]:
+        logger.info("Exporting orders as %s: %s", fmt.value, filters)
+        return self._export(lambda repository: repository.stream(filters), fmt)
+
+    async def export_fills(
+        self, filters: OrderFilter, fmt: ExportFormat
+    ) -> AsyncIterator[str]:
+        logger.info("Exporting fills as %s: %s", fmt.value, filters)
+        return self._export(lambda repository: repository.stream_fills(filters), fmt)
+
+    async def _export(self, stream, fmt: ExportFormat) -> AsyncIterator[str]:
+        """Stream an export within its own session, held until the stream ends"""
+        async with self.session_factory() as db:
+            result = await stream(AsyncOrderRepository(db))
+            async for chunk in aiter_export(result, fmt, self.export_chunk_size):
+                yield chunk
+
+    async def cancel_order(self, order_id: str) -> None:
+        logger.info("Cancelling order: %s", order_id)
+        async with self.session_factory() as db:
+            repository = AsyncOrderRepository(db)
+            order = await repository.get_by_order_id(order_id)
+            if order is None:
+                raise OrderNotFoundException(f"Order {order_id} not found")
+            self._check_cancellable(order_id, order)
+            # Pull the order from its book first so the processor cannot match
+            # it while the status change is being written
+            await self.processor.cancel_async(order)
+            # Snapshot before the commit expires the order
+            event = OrderEvent.of(order)._replace(status="CANCELLED")
+            self._check_cancelled(order_id, await repository.cancel(order))
+        self._publish_cancellation(event)
+        logger.info("Order cancelled successfully: %s", order_id)
+
+    def processor_stats(self) -> dict:
+        """Live depth and lag of the processor queue"""
+        return self.processor.stats()
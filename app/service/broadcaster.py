@@ -0,0 +1,117 @@
+import asyncio
+import threading
+from typing import Iterable, List, Optional
+
+from app.processor.order_event import OrderEvent
+from app.utils.logger import get_logger
+
+logger = get_logger("broadcaster")
+
+
+class Subscription:
+    """
+    Events of one push client, buffered in a bounded queue on its event loop.
+
+    `get` returns None once the subscription was dropped for falling behind.
+    """
+
+    def __init__(
+        self, max_buffer: int, order_ids: Iterable[str], instrument: Optional[str]
+    ):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_buffer)
+        self.order_ids = set(order_ids)  # empty for all orders
+        self.instrument = instrument
+        self.dropped = False
+
+    def wants(self, event: OrderEvent) -> bool:
+        if self.order_ids and event.order_id not in self.order_ids:
+            return False
+        return self.instrument is None or event.instrument == self.instrument
+
+    async def get(self) -> Optional[OrderEvent]:
+        return await self.queue.get()
+
+
+class Broadcaster:
+    """
+    Fans order events out to WebSocket and SSE subscribers.
+
+    The processor publishes from its worker threads; delivery is handed to the
+    event loop of each subscriber, so publishing never blocks on a client. A
+    subscriber whose buffer of `max_buffer` events is full is dropped instead
+    of holding events for it, and is expected to reconnect and catch up with
+    `GET /orders/{id}`.
+    """
+
+    def __init__(self, max_buffer: int = 256):
+        self.max_buffer = max_buffer
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(
+        self, order_ids: Iterable[str] = (), instrument: Optional[str] = None
+    ) -> Subscription:
+        """Subscribe on the running event loop, to all orders unless filtered"""
+        subscription = Subscription(self.max_buffer, order_ids, instrument)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, events: List[OrderEvent]):
+        """Processor listener, safe to call from any thread"""
+        with self._lock:
+            loops = {subscription.loop for subscription in self._subscribers}
+        if not loops:
+            return
+        self.published += len(events)
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._fan_out, loop, events)
+            except RuntimeError:
+                # The loop was closed, its subscribers are gone with it
+                pass
+
+    def _fan_out(self, loop: asyncio.AbstractEventLoop, events: List[OrderEvent]):
+        """Deliver events to the subscribers of the loop this runs on"""
+        with self._lock:
+            subscriptions = [s for s in self._subscribers if s.loop is loop]
+        for subscription in subscriptions:
+            for event in events:
+                if not subscription.wants(event):
+                    continue
+                try:
+                    subscription.queue.put_nowait(event)
+                    self.delivered += 1
+                except asyncio.QueueFull:
+                    self._drop(subscription)
+                    break
+
+    def _drop(self, subscription: Subscription):
+        logger.warning(
+            "Dropping slow subscriber after %s undelivered events", self.max_buffer
+        )
+        self.unsubscribe(subscription)
+        self.dropped += 1
+        subscription.dropped = True
+        # Discard its backlog and mark the end of its stream
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            subscribers = len(self._subscribers)
+        return {
+            "subscribers": subscribers,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped_subscribers": self.dropped,
+        }
@@ -0,0 +1,66 @@
+import threading
+from datetime import datetime
+
+from sqlalchemy.orm import sessionmaker
+
+from app.repo.idempotency_key_repository import IdempotencyKeyRepository
+from app.utils.logger import get_logger
+
+logger = get_logger("idempotency_key_cleaner")
+
+
+class IdempotencyKeyCleaner:
+    """
+    Deletes expired idempotency keys every `interval` seconds on a background
+    thread, in chunks of `batch_size` rows so no delete holds locks for long.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        interval: float = 3600.0,
+        batch_size: int = 1000,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self._run, name="idempotency-key-cleaner", daemon=True
+        )
+        self.thread.start()
+        logger.info("Deleting expired idempotency keys every %.0fs", self.interval)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.clean()
+            except Exception as e:
+                logger.error("Failed to delete expired idempotency keys: %s", e)
+
+    def clean(self) -> int:
+        """Delete the keys expired by now, returns how many"""
+        now = datetime.now()
+        deleted = 0
+        session = self.session_factory()
+        try:
+            repository = IdempotencyKeyRepository(session)
+            while True:
+                count = repository.delete_expired(now, self.batch_size)
+                deleted += count
+                if count < self.batch_size:
+                    break
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        if deleted:
+            logger.info("Deleted %s expired idempotency keys", deleted)
+        return deleted
+
+    def stop(self):
+        self._stopped.set()
@@ -0,0 +1,41 @@
+from typing import Iterable, List, Optional
+
+from app.dto.order_response import OrderStatusResponse
+from app.processor.order_event import OrderEvent
+from app.utils.cache import LRUCache
+
+
+class OrderCache:
+    """
+    Read-through cache of order statuses for `GET /orders/{id}`.
+
+    Statuses are cached by primary key, which the processor reports with its
+    order events, so they are invalidated as soon as its changes are
+    committed. The public order_id never changes its primary key and is
+    cached without expiry. The TTL bounds staleness where changes are made in
+    another process, e.g. the shared matching engine.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 5.0):
+        self.statuses = LRUCache(max_size, ttl)  # {id: OrderStatusResponse}
+        self.ids = LRUCache(max_size)  # {order_id: id}
+
+    def get(self, order_id: str) -> Optional[OrderStatusResponse]:
+        key = self.ids.get(order_id)
+        return self.statuses.get(key) if key is not None else None
+
+    def put(self, response: OrderStatusResponse, key: int, since: float):
+        """Cache a status loaded from the database since `since`"""
+        self.ids.put(response.id, key)
+        self.statuses.put(key, response, since=since)
+
+    def invalidate(self, ids: Iterable[int]):
+        """Drop the statuses of changed orders by primary key"""
+        self.statuses.invalidate(ids)
+
+    def on_order_events(self, events: List[OrderEvent]):
+        """Processor listener, drops the statuses of the changed orders"""
+        self.invalidate(event.id for event in events)
+
+    def stats(self) -> dict:
+        return self.statuses.stats()
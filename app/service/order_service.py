@@ -1,39 +1,150 @@
+import time
+from typing import Iterator, Optional
+
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.dto.order_request import CreateOrderModel
-from app.dto.order_response import OrderResponse
+from app.dto.order_request import CreateOrderModel, OrderFilter
+from app.dto.order_response import (
+    BatchOrderResponse,
+    OrderPageResponse,
+    OrderResponse,
+    OrderStatusResponse,
+)
+from app.dto.types import ExportFormat
+from app.exception.order_exception import OrderNotFoundException
 from app.mapper.order_mapper import OrderMapper
-from app.processor.stock_exchange_processor import StockExchangeProcessor
+from app.processor.order_event import OrderEvent
+from app.repo.idempotency_key_repository import IdempotencyKeyRepository
+from app.repo.order_matching_repository import OrderMatchingRepository
 from app.repo.order_repository import OrderRepository
-from app.utils.id_generator import IdGenerator
+from app.service.order_service_base import OrderServiceBase
+from app.utils.export import iter_export
 from app.utils.logger import get_logger
+from app.utils.metrics import stage_seconds
 
 logger = get_logger("order_service")
 
 
-class OrderService:
-    def __init__(
-        self,
-        db: Session,
-        mapper: OrderMapper,
-        processor: StockExchangeProcessor,
-    ):
+class OrderService(OrderServiceBase):
+    def __init__(self, db: Session, mapper: OrderMapper, *args, **kwargs):
+        super().__init__(mapper, *args, **kwargs)
         self.db = db
         self.repository = OrderRepository(db)
-        self.processor = processor
-        self.mapper = mapper
-        logger.info("OrderService initialized")
-
-    def create_order(self, order: CreateOrderModel) -> OrderResponse:
-        logger.info(f"Creating order: {order.dict()}")
-        order_id = IdGenerator.generate()
-        db_order = self.mapper.to_entity(order, order_id)
-        logger.debug(f"Mapped to entity: {db_order.id}")
-        saved_order = self.repository.save(db_order)
-        logger.debug(f"Saved order: {saved_order.id}")
+        logger.debug("OrderService initialized")
+
+    def create_order(
+        self, order: CreateOrderModel, idempotency_key: Optional[str] = None
+    ) -> OrderResponse:
+        logger.debug("Creating order: %s", order)
+        request_hash = None
+        if idempotency_key is not None:
+            # Retries of a created order get its response without a new insert
+            request_hash = self.mapper.request_hash(order)
+            replayed = self._replay(idempotency_key, request_hash)
+            if replayed is not None:
+                return replayed
+        self._check_admission()
+        db_order, key = self._new_order(order, idempotency_key, request_hash)
+        logger.debug("Mapped to entity: %s", db_order.id)
+        try:
+            with stage_seconds.labels("save").time():
+                if self.outbox:
+                    saved_order = self.repository.save_with_outbox(db_order, key)
+                else:
+                    saved_order = self.repository.save(db_order, key)
+        except IntegrityError:
+            self.db.rollback()
+            # A concurrent request with the same key created the order first
+            replayed = self._replay(idempotency_key, request_hash) if key else None
+            if replayed is None:
+                raise
+            return replayed
+        logger.debug("Saved order: %s", saved_order.id)
         self.processor.enqueue(saved_order)
-        logger.debug(f"Enqueued order: {saved_order.id}")
+        logger.debug("Enqueued order: %s", saved_order.id)
         response_dict = self.mapper.to_response(saved_order)
         self.db.commit()  # Commit
-        logger.info(f"Order created successfully: {saved_order.id}")
-        return OrderResponse(**response_dict)
+        logger.info("Order created successfully: %s", saved_order.id)
+        return self._created(response_dict, key, request_hash)
+
+    def _replay(
+        self, idempotency_key: str, request_hash: str
+    ) -> Optional[OrderResponse]:
+        """Response of the order created with a key, None if the key is new"""
+        cached = self._cached_replay(idempotency_key)
+        row = None
+        if cached is None:
+            row = IdempotencyKeyRepository(self.db).get(idempotency_key)
+        return self._replayed(idempotency_key, request_hash, cached, row)
+
+    def create_orders(self, items: list) -> BatchOrderResponse:
+        """
+        Create a batch of orders with one insert, reporting the outcome per item.
+        Invalid items are rejected without failing the valid ones.
+        """
+        logger.info("Creating batch of %s orders", len(items))
+        self._check_batch_size(items)
+        self._check_admission()
+        with stage_seconds.labels("validate").time():
+            entities, errors = self.mapper.batch_to_entities(items)
+        with stage_seconds.labels("save").time():
+            saved_orders = self.repository.save_all(
+                [entity for _, entity in entities], outbox=self.outbox
+            )
+        if saved_orders:
+            self.processor.enqueue_many(saved_orders)
+        return self._batch_response(entities, errors, saved_orders)
+
+    def get_order(self, order_id: str) -> OrderStatusResponse:
+        logger.debug("Reading order: %s", order_id)
+        if self.cache is not None:
+            cached = self.cache.get(order_id)
+            if cached is not None:
+                return cached
+        loaded_at = time.monotonic()
+        order = self.repository.get_by_order_id(order_id)
+        if order is None:
+            raise OrderNotFoundException(f"Order {order_id} not found")
+        fills = OrderMatchingRepository(self.db).get_by_order_id(order.id)
+        response = OrderStatusResponse(**self.mapper.to_status_response(order, fills))
+        if self.cache is not None:
+            self.cache.put(response, order.id, since=loaded_at)
+        return response
+
+    def list_orders(
+        self, filters: OrderFilter, after: Optional[int], limit: int
+    ) -> OrderPageResponse:
+        orders = self.repository.list_page(filters, after, limit)
+        return self._page(orders, limit)
+
+    def export_orders(self, filters: OrderFilter, fmt: ExportFormat) -> Iterator[str]:
+        logger.info("Exporting orders as %s: %s", fmt.value, filters)
+        return iter_export(self.repository.stream(filters), fmt, self.export_chunk_size)
+
+    def export_fills(self, filters: OrderFilter, fmt: ExportFormat) -> Iterator[str]:
+        logger.info("Exporting fills as %s: %s", fmt.value, filters)
+        return iter_export(
+            OrderMatchingRepository(self.db).stream(filters),
+            fmt,
+            self.export_chunk_size,
+        )
+
+    def cancel_order(self, order_id: str) -> None:
+        logger.info("Cancelling order: %s", order_id)
+        order = self.repository.get_by_order_id(order_id)
+        if order is None:
+            raise OrderNotFoundException(f"Order {order_id} not found")
+        self._check_cancellable(order_id, order)
+        # Pull the order from its book first so the processor cannot match it
+        # while the status change is being written
+        self.processor.cancel(order)
+        # Snapshot before the commit expires the order
+        event = OrderEvent.of(order)._replace(status="CANCELLED")
+        self._check_cancelled(order_id, self.repository.cancel(order))
+        self._publish_cancellation(event)
+        logger.info("Order cancelled successfully: %s", order.id)
+
+    def processor_stats(self) -> dict:
+        """Live depth and lag of the processor queue"""
+        return self.processor.stats()
@@ -0,0 +1,200 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+from app.dto.order_request import CreateOrderModel
+from app.dto.order_response import (
+    BatchOrderResponse,
+    BatchOrderResult,
+    OrderPageResponse,
+    OrderResponse,
+    OrderSummaryResponse,
+)
+from app.entity.idempotency_key import IdempotencyKey
+from app.entity.order import Order
+from app.exception.order_exception import (
+    IdempotencyKeyReusedException,
+    OrderBatchTooLargeException,
+    OrderQueueFullException,
+    OrderStateException,
+)
+from app.mapper.order_mapper import OrderMapper
+from app.processor.order_event import OrderEvent
+from app.processor.stock_exchange_processor import StockExchangeProcessor
+from app.repo.order_repository import CANCELLABLE_STATUSES
+from app.service.broadcaster import Broadcaster
+from app.service.order_cache import OrderCache
+from app.utils.cache import LRUCache
+from app.utils.id_generator import IdGenerator
+from app.utils.logger import get_logger
+from app.utils.metrics import stage_seconds
+
+logger = get_logger("order_service")
+
+
+class OrderServiceBase:
+    """
+    Validation and serialization shared by OrderService and AsyncOrderService,
+    which differ only in how they reach the database.
+    """
+
+    def __init__(
+        self,
+        mapper: OrderMapper,
+        processor: StockExchangeProcessor,
+        outbox: bool = False,
+        retry_after: int = 1,
+        max_batch_size: int = 1000,
+        cache: Optional[OrderCache] = None,
+        export_chunk_size: int = 1000,
+        broadcaster: Optional[Broadcaster] = None,
+        idempotency_cache: Optional[LRUCache] = None,
+        idempotency_key_ttl: float = 86400,
+    ):
+        # Queue orders through the durable outbox table instead of in memory
+        self.outbox = outbox
+        # Seconds clients are asked to wait when the processor queue is full
+        self.retry_after = retry_after
+        self.max_batch_size = max_batch_size
+        # Serves status polls without a query, shared by all requests
+        self.cache = cache
+        # Rows fetched from the cursor and encoded at a time by exports
+        self.export_chunk_size = export_chunk_size
+        # Cancellations are pushed to subscribers like processor changes
+        self.broadcaster = broadcaster
+        # Recent {idempotency key: (request hash, response)}, shared by requests
+        self.idempotency_cache = idempotency_cache
+        # Seconds idempotency keys are kept at least
+        self.idempotency_key_ttl = idempotency_key_ttl
+        self.processor = processor
+        self.mapper = mapper
+
+    def _check_admission(self):
+        """Shed load instead of building an unbounded backlog"""
+        if self.processor.is_saturated():
+            raise OrderQueueFullException(
+                "Order queue is full, retry later", retry_after=self.retry_after
+            )
+
+    def _check_batch_size(self, items: list):
+        if len(items) > self.max_batch_size:
+            raise OrderBatchTooLargeException(
+                f"Batch of {len(items)} orders exceeds the limit of {self.max_batch_size}"
+            )
+
+    def _new_order(
+        self,
+        order: CreateOrderModel,
+        idempotency_key: Optional[str],
+        request_hash: Optional[str],
+    ) -> Tuple[Order, Optional[IdempotencyKey]]:
+        """Validated entity of a new order and the idempotency key stored with it"""
+        order_id = IdGenerator.generate()
+        with stage_seconds.labels("validate").time():
+            db_order = self.mapper.to_entity(order, order_id)
+        key = None
+        if idempotency_key is not None:
+            key = IdempotencyKey(
+                key=idempotency_key,
+                request_hash=request_hash,
+                response=orjson.dumps(self.mapper.to_response(db_order)).decode(),
+                expires_at=datetime.now() + timedelta(seconds=self.idempotency_key_ttl),
+            )
+        return db_order, key
+
+    def _created(
+        self,
+        response_dict: dict,
+        key: Optional[IdempotencyKey],
+        request_hash: Optional[str],
+    ) -> OrderResponse:
+        """Response of a created order, remembered for retries with its key"""
+        # The mapper output is already typed, skip validating it again
+        response = OrderResponse.from_mapped(response_dict)
+        if key is not None and self.idempotency_cache is not None:
+            self.idempotency_cache.put(key.key, (request_hash, response))
+        return response
+
+    def _cached_replay(self, idempotency_key: str) -> Optional[tuple]:
+        if self.idempotency_cache is None:
+            return None
+        return self.idempotency_cache.get(idempotency_key)
+
+    def _replayed(
+        self,
+        idempotency_key: str,
+        request_hash: str,
+        cached: Optional[tuple],
+        row: Optional[IdempotencyKey] = None,
+    ) -> Optional[OrderResponse]:
+        """
+        Response to replay for a key, from the cache or its stored `row`, None
+        if the key is new. Raises if the key was used for another request.
+        """
+        if cached is None:
+            if row is None:
+                return None
+            cached = (row.request_hash, OrderResponse.parse_raw(row.response))
+            if self.idempotency_cache is not None:
+                self.idempotency_cache.put(idempotency_key, cached)
+        if cached[0] != request_hash:
+            raise IdempotencyKeyReusedException(
+                f"Idempotency key {idempotency_key} was already used for another order"
+            )
+        logger.info("Replaying order %s for key %s", cached[1].id, idempotency_key)
+        return cached[1]
+
+    def _batch_response(
+        self,
+        entities: List[Tuple[int, Order]],
+        errors: Dict[int, list],
+        saved_orders: List[Order],
+    ) -> BatchOrderResponse:
+        """Outcome of every item of a batch, in request order"""
+        results = [
+            BatchOrderResult(index=index, errors=errors[index]) for index in errors
+        ]
+        results += [
+            BatchOrderResult(
+                index=index,
+                order=OrderResponse.from_mapped(self.mapper.to_response(order)),
+            )
+            for (index, _), order in zip(entities, saved_orders)
+        ]
+        results.sort(key=lambda result: result.index)
+        logger.info(
+            "Batch created: %s accepted, %s rejected", len(saved_orders), len(errors)
+        )
+        return BatchOrderResponse(
+            accepted=len(saved_orders), rejected=len(errors), results=results
+        )
+
+    def _page(self, orders: List[Order], limit: int) -> OrderPageResponse:
+        """A page of a listing fetched with one extra row to detect the next page"""
+        next_cursor = orders[limit - 1].id if len(orders) > limit else None
+        return OrderPageResponse(
+            items=[
+                OrderSummaryResponse(**self.mapper.to_summary_response(order))
+                for order in orders[:limit]
+            ],
+            next_cursor=next_cursor,
+        )
+
+    def _check_cancellable(self, order_id: str, order: Order):
+        if order.status not in CANCELLABLE_STATUSES:
+            raise OrderStateException(
+                f"Order {order_id} cannot be cancelled in status {order.status}"
+            )
+
+    def _check_cancelled(self, order_id: str, cancelled: bool):
+        if not cancelled:
+            raise OrderStateException(
+                f"Order {order_id} was filled or failed before it could be cancelled"
+            )
+
+    def _publish_cancellation(self, event: OrderEvent):
+        if self.cache is not None:
+            self.cache.invalidate([event.id])
+        if self.broadcaster is not None:
+            self.broadcaster.publish([event])
@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+
+
+class LRUCache:
+    """
+    Thread-safe cache bounded to `max_size` entries, evicting the least
+    recently used one, whose entries expire `ttl` seconds after they were put.
+
+    Writers invalidate keys when the underlying data changes. A reader that
+    loaded a value before an invalidation of its key passes the time it
+    started loading as `since`, so the stale value is not put back.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl  # None keeps entries until they are evicted
+        self._entries = OrderedDict()  # {key: (value, expires_at)}
+        # Recent invalidations, bounded like the entries, oldest first
+        self._invalidated = OrderedDict()  # {key: invalidation time}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any, since: Optional[float] = None) -> bool:
+        """
+        Cache a value, unless `key` was invalidated at or after `since` (a
+        `time.monotonic()` value). Returns whether the value was cached.
+        """
+        with self._lock:
+            invalidated = self._invalidated.get(key)
+            if since is not None and invalidated is not None and invalidated >= since:
+                return False
+            expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, keys: Iterable[Hashable]):
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._invalidated.pop(key, None)
+                self._invalidated[key] = now
+            while len(self._invalidated) > self.max_size:
+                self._invalidated.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._invalidated.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
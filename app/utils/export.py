@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import AsyncIterator, Iterator, List, Sequence
+
+from sqlalchemy.engine import Result
+from sqlalchemy.ext.asyncio import AsyncResult
+
+from app.dto.types import ExportFormat
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def encode_rows(columns: List[str], rows: Sequence, fmt: ExportFormat) -> str:
+    """Encode a chunk of result rows as NDJSON lines or CSV records"""
+    if fmt is ExportFormat.NDJSON:
+        return "".join(
+            json.dumps(dict(zip(columns, map(_value, row)))) + "\n" for row in rows
+        )
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(map(_value, row) for row in rows)
+    return buffer.getvalue()
+
+
+def encode_header(columns: List[str], fmt: ExportFormat) -> str:
+    if fmt is ExportFormat.CSV:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(columns)
+        return buffer.getvalue()
+    return ""
+
+
+def iter_export(
+    result: Result, fmt: ExportFormat, chunk_size: int = 1000
+) -> Iterator[str]:
+    """
+    Stream a result in chunks of `chunk_size` rows, so memory stays flat
+    however many rows it has. The result is closed when the stream ends or
+    the client goes away.
+    """
+    try:
+        columns = list(result.keys())
+        header = encode_header(columns, fmt)
+        if header:
+            yield header
+        for rows in result.partitions(chunk_size):
+            yield encode_rows(columns, rows, fmt)
+    finally:
+        result.close()
+
+
+async def aiter_export(
+    result: AsyncResult, fmt: ExportFormat, chunk_size: int = 1000
+) -> AsyncIterator[str]:
+    """iter_export for results of asyncio sessions"""
+    try:
+        columns = list(result.keys())
+        header = encode_header(columns, fmt)
+        if header:
+            yield header
+        async for rows in result.partitions(chunk_size):
+            yield encode_rows(columns, rows, fmt)
+    finally:
+        await result.close()
@@ -1,14 +1,170 @@
+import atexit
+import copy
+import json
 import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")  # Configurable via environment variable
+# "text" or "json", one object per line for log shippers
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # Configurable via environment variable
+# Records per second and message below WARNING, 0 to log all of them,
+# configurable via environment variable
+LOG_RATE_LIMIT = int(os.getenv("LOG_RATE_LIMIT", 50))
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class TextFormatter(logging.Formatter):
+    """The classic format, noting how many similar records were suppressed"""
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            line += f" ({suppressed} similar messages suppressed)"
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Passes at most `rate` records per second of every logger and message
+    below `level`, so a hot path cannot flood the log.
+
+    Messages are told apart by their unformatted template, which is why log
+    calls pass their values as %-style args. The first record of a new second
+    carries the number of records suppressed in the previous one.
+    """
+
+    # Templates tracked at most, f-string messages would grow it without bound
+    MAX_KEYS = 10000
+
+    def __init__(self, rate: int, level: int = logging.WARNING, clock=time.monotonic):
+        super().__init__()
+        self.rate = rate
+        self.level = level
+        self.clock = clock
+        self._windows = {}  # {(name, template): [window start, passed, suppressed]}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= self.level:
+            return True
+        key = (record.name, record.msg)
+        now = self.clock()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= 1.0:
+                if window is None and len(self._windows) >= self.MAX_KEYS:
+                    self._windows.clear()
+                if window is not None and window[2]:
+                    record.suppressed = window[2]
+                self._windows[key] = [now, 1, 0]
+                return True
+            if window[1] < self.rate:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Interpolate on the calling thread while the args are current, the
+        # listener formats the line. Tracebacks are kept apart from the message.
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _formatter() -> logging.Formatter:
+    return JsonFormatter() if LOG_FORMAT == "json" else TextFormatter()
+
+
+# Records are handed to a background thread that formats and writes them, so
+# request and processor threads never block on stdout. The shared handler is
+# created on first use.
+_handler: Optional[QueueHandler] = None
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+
+def _start_listener():
+    global _listener
+    output = logging.StreamHandler()
+    output.setFormatter(_formatter())
+    _listener = QueueListener(_handler.queue, output)
+    _listener.start()
+
+
+def _queue_handler() -> QueueHandler:
+    global _handler
+    with _lock:
+        if _handler is None:
+            _handler = _QueueHandler(queue.SimpleQueue())
+            _handler.addFilter(RateLimitFilter(LOG_RATE_LIMIT))
+            _start_listener()
+            atexit.register(stop_logging)
+        return _handler
+
+
+def stop_logging():
+    """Write the records still queued and stop the background thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _after_fork():
+    # The listener thread does not survive a fork, restart it on a new queue
+    global _listener
+    if _handler is not None:
+        _handler.queue = queue.SimpleQueue()
+        _listener = None
+        _start_listener()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
 
 
 def get_logger(name: str = "app"):
     logger = logging.getLogger(name)
     if not logger.handlers:
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-        logger.setLevel(logging.INFO)
+        logger.addHandler(_queue_handler())
+        logger.setLevel(LOG_LEVEL)
     return logger
@@ -0,0 +1,70 @@
+import os
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Optional, Union
+
+# Prices are stored and matched as integer multiples of the instrument's tick
+DEFAULT_TICK_SIZE = Decimal("0.01")
+# Requests and the limit_price column carry two decimal places, finer ticks
+# could never be quoted
+MIN_TICK_SIZE = Decimal("0.01")
+
+# Sentinel tick prices for market orders, the most aggressive price of a side
+MARKET_BID_TICKS = 2**63 - 1
+MARKET_ASK_TICKS = -(2**63 - 1)
+
+
+class TickSizes:
+    """Tick size per instrument, converting between decimal prices and ticks"""
+
+    def __init__(
+        self,
+        default: Decimal = DEFAULT_TICK_SIZE,
+        overrides: Optional[Dict[str, Decimal]] = None,
+    ):
+        self.default = self._checked(Decimal(default))
+        self.overrides = {
+            k: self._checked(Decimal(v), k) for k, v in (overrides or {}).items()
+        }
+
+    @staticmethod
+    def _checked(tick: Decimal, instrument: str = None) -> Decimal:
+        if tick <= 0 or tick % MIN_TICK_SIZE:
+            of = f" of {instrument}" if instrument else ""
+            raise ValueError(
+                f"Tick size {tick}{of} is not a positive multiple of {MIN_TICK_SIZE}"
+            )
+        return tick
+
+    @classmethod
+    def from_env(cls) -> "TickSizes":
+        """
+        Build from DEFAULT_TICK_SIZE and TICK_SIZES ("ISIN=0.05,ISIN=0.5").
+        """
+        default = Decimal(os.getenv("DEFAULT_TICK_SIZE", str(DEFAULT_TICK_SIZE)))
+        overrides = {}
+        for entry in filter(None, os.getenv("TICK_SIZES", "").split(",")):
+            instrument, _, tick = entry.partition("=")
+            overrides[instrument.strip()] = Decimal(tick.strip())
+        return cls(default, overrides)
+
+    def tick_size(self, instrument: str) -> Decimal:
+        return self.overrides.get(instrument, self.default)
+
+    def to_ticks(self, instrument: str, price: Union[Decimal, float, str]) -> int:
+        """Convert a price to integer ticks, rejecting prices off the tick grid"""
+        try:
+            ticks = Decimal(str(price)) / self.tick_size(instrument)
+        except InvalidOperation as e:
+            raise ValueError(f"Invalid price {price!r}") from e
+        if ticks != ticks.to_integral_value():
+            raise ValueError(
+                f"Price {price} is not a multiple of the tick size "
+                f"{self.tick_size(instrument)} of {instrument}"
+            )
+        return int(ticks)
+
+    def from_ticks(self, instrument: str, ticks: int) -> Decimal:
+        return ticks * self.tick_size(instrument)
+
+
+tick_sizes = TickSizes.from_env()
@@ -0,0 +1,245 @@
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+from app.utils.logger import get_logger
+
+logger = get_logger("profiler")
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of all threads of the process for a time window.
+
+    A background thread reads `sys._current_frames` every `interval` seconds,
+    so the profiled threads (the event loop, the request threadpool and the
+    processor workers) are never instrumented and pay nothing while it is
+    off. The samples are reported as collapsed stacks, one
+    `thread;outer;...;inner count` line per distinct stack, the input of
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval: float = 0.005, output: Optional[str] = None):
+        self.interval = interval
+        # Collapsed stacks are also written to this file when a window ends
+        self.output = output
+        self.samples = Counter()  # {collapsed stack: count}
+        self.started_at = None
+        self.ends_at = None
+        self._thread = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._samples_lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, interval: Optional[float] = None) -> bool:
+        """Start a window of `seconds`, False if one is already running"""
+        with self._lock:
+            if self.running:
+                return False
+            if interval is not None:
+                self.interval = interval
+            with self._samples_lock:
+                self.samples = Counter()
+            self.started_at = time.time()
+            self.ends_at = self.started_at + seconds
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(seconds,), name="profiler", daemon=True
+            )
+            self._thread.start()
+        logger.info("Sampling profiler started for %.1fs", seconds)
+        return True
+
+    def stop(self):
+        """End the running window early"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self, seconds: float):
+        deadline = time.monotonic() + seconds
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval) and time.monotonic() < deadline:
+            self._sample(own)
+        self.ends_at = time.time()
+        logger.info("Sampling profiler stopped after %d samples", self.total())
+        if self.output:
+            try:
+                with open(self.output, "w") as file:
+                    file.write(self.collapsed())
+            except OSError as e:
+                logger.error("Failed to write profile to %s: %s", self.output, e)
+
+    def _sample(self, own: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            stacks.append(";".join(reversed(stack)))
+        with self._samples_lock:
+            self.samples.update(stacks)
+
+    def total(self) -> int:
+        with self._samples_lock:
+            return sum(self.samples.values())
+
+    def collapsed(self) -> str:
+        """The samples so far as collapsed stacks, most frequent first"""
+        with self._samples_lock:
+            samples = self.samples.copy()
+        return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "started_at": self.started_at,
+            "ends_at": self.ends_at,
+            "samples": self.total(),
+        }
+
+
+class RequestProfile:
+    """cProfile runs of one sampled request, one per thread it ran on"""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.seconds = 0.0
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def add(self, profile: cProfile.Profile):
+        with self._lock:
+            self._profiles.append(profile)
+
+    def report(self, limit: int = 30) -> str:
+        """The `limit` functions of the request with the most cumulative time"""
+        buffer = io.StringIO()
+        with self._lock:
+            stats = pstats.Stats(*self._profiles, stream=buffer)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return buffer.getvalue()
+
+
+# The profile of the request being handled, None for requests not sampled
+current_request_profile: ContextVar[Optional[RequestProfile]] = ContextVar(
+    "current_request_profile", default=None
+)
+
+
+def call_profiled(func: Callable, *args):
+    """
+    Call `func`, recording it in the profile of the current request when it
+    was sampled. For work handed to the threadpool, which cProfile does not
+    follow from the event loop thread.
+    """
+    request_profile = current_request_profile.get()
+    if request_profile is None:
+        return func(*args)
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(func, *args)
+    finally:
+        request_profile.add(profile)
+
+
+class RequestProfiler:
+    """
+    Profiles 1 in `every` requests with cProfile, 0 to profile none.
+
+    cProfile hooks the event loop thread, so one request is profiled at a
+    time and its report includes whatever else ran on the loop meanwhile. The
+    reports of the last `keep` profiled requests are kept.
+    """
+
+    def __init__(self, every: int = 0, keep: int = 20):
+        self.every = every
+        self.reports = deque(maxlen=keep)
+        self._counter = itertools.count(1)
+        self._active = False
+        self._lock = threading.Lock()
+
+    def begin(self, method: str, path: str) -> Optional[RequestProfile]:
+        """A profile for the request if it is sampled, else None"""
+        if self.every <= 0 or next(self._counter) % self.every:
+            return None
+        with self._lock:
+            if self._active:
+                return None
+            self._active = True
+        return RequestProfile(method, path)
+
+    def end(self, request_profile: RequestProfile):
+        try:
+            report = request_profile.report()
+        finally:
+            with self._lock:
+                self._active = False
+        self.reports.append(
+            {
+                "method": request_profile.method,
+                "path": request_profile.path,
+                "seconds": round(request_profile.seconds, 6),
+                "report": report,
+            }
+        )
+        logger.info(
+            "Profiled %s %s in %.3fs:\n%s",
+            request_profile.method,
+            request_profile.path,
+            request_profile.seconds,
+            report,
+        )
+
+
+class RequestProfilerMiddleware:
+    """Runs the requests sampled by a RequestProfiler under cProfile"""
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        request_profile = None
+        if scope["type"] == "http":
+            request_profile = self.profiler.begin(scope["method"], scope["path"])
+        if request_profile is None:
+            await self.app(scope, receive, send)
+            return
+        token = current_request_profile.set(request_profile)
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profile.disable()
+            request_profile.seconds = time.perf_counter() - started
+            current_request_profile.reset(token)
+            request_profile.add(profile)
+            self.profiler.end(request_profile)
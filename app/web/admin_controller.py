@@ -0,0 +1,63 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+
+from app.config.app_config import get_profiler, get_request_profiler, require_admin
+from app.exception.order_exception import ProfilerRunningException
+from app.utils.logger import get_logger
+from app.utils.profiler import RequestProfiler, SamplingProfiler
+
+logger = get_logger("admin_controller")
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.post("/profile", status_code=202)
+async def start_profile(
+    seconds: float = Query(30.0, gt=0, le=600),
+    interval: Optional[float] = Query(None, gt=0, le=1),
+    profiler: SamplingProfiler = Depends(get_profiler),
+):
+    """Sample the stacks of all threads for `seconds`"""
+    if not profiler.start(seconds, interval):
+        raise ProfilerRunningException("A profiling window is already running")
+    return profiler.stats()
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def get_profile(profiler: SamplingProfiler = Depends(get_profiler)):
+    """Collapsed stacks of the current or last window, for flamegraph tools"""
+    return PlainTextResponse(profiler.collapsed())
+
+
+@router.get("/profile/status")
+async def profile_status(profiler: SamplingProfiler = Depends(get_profiler)):
+    return profiler.stats()
+
+
+@router.delete("/profile")
+def stop_profile(profiler: SamplingProfiler = Depends(get_profiler)):
+    """Ends the window, joining the sampler thread off the event loop"""
+    logger.info("Received request to stop the profiler")
+    profiler.stop()
+    return profiler.stats()
+
+
+@router.put("/profile/requests")
+async def sample_requests(
+    every: int = Query(..., ge=0),
+    request_profiler: RequestProfiler = Depends(get_request_profiler),
+):
+    """Profile 1 in `every` requests with cProfile, 0 to stop"""
+    logger.info("Profiling 1 in %d requests", every)
+    request_profiler.every = every
+    return {"every": every}
+
+
+@router.get("/profile/requests")
+async def request_profiles(
+    request_profiler: RequestProfiler = Depends(get_request_profiler),
+):
+    """Reports of the last profiled requests, oldest first"""
+    return list(request_profiler.reports)
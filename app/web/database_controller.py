@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+
+from app.config.database import pool_stats
+from app.utils.logger import get_logger
+
+logger = get_logger("database_controller")
+
+router = APIRouter()
+
+
+@router.get("/pool")
+async def database_pool_stats():
+    logger.debug("Received database pool stats request")
+    return pool_stats()
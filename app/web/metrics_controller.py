@@ -0,0 +1,62 @@
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.utils.logger import get_logger
+from app.utils.metrics import registry
+
+logger = get_logger("metrics_controller")
+
+router = APIRouter()
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+request_seconds = registry.histogram(
+    "http_request_duration_seconds",
+    "Seconds from receiving a request to the end of its response, including "
+    "body validation",
+    ("method", "handler", "status"),
+)
+
+
+class RequestMetricsMiddleware:
+    """
+    Times HTTP requests by endpoint. A plain ASGI middleware, so responses
+    are not buffered and streamed exports are timed until their last chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Set by the router, endpoint names keep the label set bounded
+            endpoint = scope.get("endpoint")
+            handler = endpoint.__name__ if endpoint is not None else "unmatched"
+            request_seconds.labels(scope["method"], handler, status).observe(
+                time.perf_counter() - started
+            )
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Gauges take book locks and may call the engine processes, keep them off
+    # the event loop
+    logger.debug("Received metrics request")
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
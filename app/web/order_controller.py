@@ -1,16 +1,48 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
 from app.config.app_config import get_order_service
-from app.dto.order_request import CreateOrderModel
-from app.dto.order_response import OrderResponse
+from app.dto.order_request import CreateOrderModel, OrderFilter
+from app.dto.order_response import (
+    BatchOrderResponse,
+    OrderPageResponse,
+    OrderResponse,
+    OrderStatusResponse,
+)
+from app.dto.types import ExportFormat
+from app.exception.order_exception import InvalidOrderBatchException
 from app.service.order_service import OrderService
+from app.utils.export import MEDIA_TYPES
 from app.utils.logger import get_logger
+from app.utils.profiler import call_profiled
 
 logger = get_logger("order_controller")
 
 router = APIRouter()
 
 
+async def _call(method, *args):
+    """Await async service methods, run blocking ones off the event loop"""
+    if asyncio.iscoroutinefunction(method):
+        return await method(*args)
+    # Blocking calls join the profile of a sampled request from the threadpool
+    return await run_in_threadpool(call_profiled, method, *args)
+
+
+def _json(response: BaseModel, status_code: int = 200) -> ORJSONResponse:
+    """
+    Serialize a response the service built from typed values, skipping the
+    validation FastAPI would run against the response_model again
+    """
+    return ORJSONResponse(response.dict(by_alias=True), status_code=status_code)
+
+
 @router.post(
     "/",
     status_code=201,
@@ -18,9 +50,93 @@ router = APIRouter()
     response_model_by_alias=True,
 )
 async def create_order(
-    model: CreateOrderModel, service: OrderService = Depends(get_order_service)
+    model: CreateOrderModel,
+    service: OrderService = Depends(get_order_service),
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=128),
+):
+    response = await _call(service.create_order, model, idempotency_key)
+    logger.debug("Created order with ID: %s", response.id)
+    return _json(response, status_code=201)
+
+
+async def _read_batch(request: Request) -> list:
+    """Decode a batch body, a JSON array or NDJSON with one order per line"""
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith(
+            ("application/x-ndjson", "application/jsonl")
+        ):
+            return [json.loads(line) for line in body.splitlines() if line.strip()]
+        items = json.loads(body)
+    except ValueError as e:
+        raise InvalidOrderBatchException(f"Malformed order batch: {str(e)}") from e
+    if not isinstance(items, list):
+        raise InvalidOrderBatchException("Order batch must be a JSON array")
+    return items
+
+
+@router.post("/batch", response_model=BatchOrderResponse, response_model_by_alias=True)
+async def create_orders(
+    request: Request, service: OrderService = Depends(get_order_service)
+):
+    items = await _read_batch(request)
+    logger.info("Received batch of %d orders", len(items))
+    response = await _call(service.create_orders, items)
+    logger.info(
+        "Created batch: %d accepted, %d rejected", response.accepted, response.rejected
+    )
+    return _json(response)
+
+
+@router.get("/", response_model=OrderPageResponse, response_model_by_alias=True)
+async def list_orders(
+    filters: OrderFilter = Depends(),
+    after: Optional[int] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    service: OrderService = Depends(get_order_service),
+):
+    return await _call(service.list_orders, filters, after, limit)
+
+
+def _export_response(chunks, fmt: ExportFormat, name: str) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt.value}"'},
+    )
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_orders(
+    filters: OrderFilter = Depends(),
+    fmt: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+    service: OrderService = Depends(get_order_service),
+):
+    chunks = await _call(service.export_orders, filters, fmt)
+    return _export_response(chunks, fmt, "orders")
+
+
+@router.get("/fills/export", response_class=StreamingResponse)
+async def export_fills(
+    filters: OrderFilter = Depends(),
+    fmt: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+    service: OrderService = Depends(get_order_service),
+):
+    chunks = await _call(service.export_fills, filters, fmt)
+    return _export_response(chunks, fmt, "fills")
+
+
+@router.get(
+    "/{order_id}", response_model=OrderStatusResponse, response_model_by_alias=True
+)
+async def get_order(order_id: str, service: OrderService = Depends(get_order_service)):
+    return _json(await _call(service.get_order, order_id))
+
+
+@router.delete("/{order_id}", status_code=204, response_class=Response)
+async def cancel_order(
+    order_id: str, service: OrderService = Depends(get_order_service)
 ):
-    logger.info(f"Received order request: {model.dict()}")
-    response = service.create_order(model)
-    logger.info(f"Created order with ID: {response.id}")
-    return response
+    logger.info("Received cancel request for order: %s", order_id)
+    await _call(service.cancel_order, order_id)
+    return Response(status_code=204)
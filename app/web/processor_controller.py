@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends
+
+from app.config.app_config import get_order_service
+from app.service.order_service import OrderService
+from app.utils.logger import get_logger
+
+logger = get_logger("processor_controller")
+
+router = APIRouter()
+
+
+@router.get("/stats")
+def processor_stats(service: OrderService = Depends(get_order_service)):
+    """Runs on the threadpool, the stats may query the engine processes"""
+    logger.debug("Received processor stats request")
+    return service.processor_stats()
@@ -0,0 +1,93 @@
+import asyncio
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, WebSocket, status
+from fastapi.responses import StreamingResponse
+
+from app.config.app_config import get_broadcaster
+from app.service.broadcaster import Broadcaster, Subscription
+from app.utils.logger import get_logger
+
+logger = get_logger("stream_controller")
+
+router = APIRouter()
+
+# Seconds between SSE comments keeping idle connections open through proxies
+SSE_KEEPALIVE = 15.0
+
+
+async def _send_events(websocket: WebSocket, subscription: Subscription):
+    while True:
+        event = await subscription.get()
+        if event is None:
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            return
+        await websocket.send_json(event.to_dict())
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    # Clients only listen, anything they send is ignored
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@router.websocket("/ws/orders")
+async def order_updates(
+    websocket: WebSocket,
+    order_id: List[str] = Query([]),
+    instrument: Optional[str] = None,
+    broadcaster: Broadcaster = Depends(get_broadcaster),
+):
+    """Push status changes of all orders, or of the given order IDs or instrument"""
+    await websocket.accept()
+    subscription = broadcaster.subscribe(order_id, instrument)
+    logger.info("WebSocket subscriber connected: %s", order_id or instrument or "all")
+    tasks = [
+        asyncio.create_task(_send_events(websocket, subscription)),
+        asyncio.create_task(_wait_for_disconnect(websocket)),
+    ]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            # Retrieve errors, e.g. a client that went away while sending
+            if not task.cancelled() and task.exception() is not None:
+                logger.debug("WebSocket subscriber closed: %r", task.exception())
+    finally:
+        for task in tasks:
+            task.cancel()
+        broadcaster.unsubscribe(subscription)
+        logger.info("WebSocket subscriber disconnected")
+
+
+async def _sse_events(subscription: Subscription, broadcaster: Broadcaster):
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), SSE_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                # Dropped for falling behind, the client should reconnect
+                yield "event: dropped\ndata: {}\n\n"
+                return
+            yield f"event: order\ndata: {json.dumps(event.to_dict())}\n\n"
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+@router.get("/sse/orders", response_class=StreamingResponse)
+async def order_events(
+    order_id: List[str] = Query([]),
+    instrument: Optional[str] = None,
+    broadcaster: Broadcaster = Depends(get_broadcaster),
+):
+    """Server-sent events flavour of /ws/orders"""
+    logger.info("SSE subscriber connected: %s", order_id or instrument or "all")
+    subscription = broadcaster.subscribe(order_id, instrument)
+    return StreamingResponse(
+        _sse_events(subscription, broadcaster),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
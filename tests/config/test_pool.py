@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.config.pool import TimedQueuePool
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    yield engine
+    engine.dispose()
+
+
+def test_checkouts_are_counted(engine):
+    for _ in range(3):
+        with engine.connect():
+            pass
+
+    stats = engine.pool.metrics.snapshot(engine.pool)
+
+    assert stats["checkouts"] == 3
+    assert stats["timeouts"] == 0
+    assert stats["checked_out"] == 0
+
+
+def test_exhausted_pool_records_timeout_and_wait(engine):
+    with engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+        stats = engine.pool.metrics.snapshot(engine.pool)
+
+    assert stats["checked_out"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["max_wait_ms"] >= 50
+
+
+def test_metrics_survive_dispose(engine):
+    with engine.connect():
+        pass
+    engine.dispose()
+    with engine.connect():
+        pass
+
+    assert engine.pool.metrics.checkouts == 2
@@ -1,3 +1,4 @@
+import os
 from unittest.mock import Mock
 
 import pytest
@@ -5,7 +6,10 @@ from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-from app.api import get_app
+# The tests run without MySQL, skip rebuilding the order books at startup
+os.environ.setdefault("WARM_START", "false")
+
+from app.api import get_app  # noqa: E402
 from app.config.database import get_db
 from app.service.order_service import OrderService
 
@@ -0,0 +1,180 @@
+import asyncio
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.entity.base import Base
+from app.entity.order import Order
+from app.entity.order_matching import OrderMatching
+from app.processor.async_stock_exchange_processor import AsyncStockExchangeProcessor
+from app.processor.order_book_registry import OrderBookRegistry
+from app.stock_exchange import OrderPlacementError
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+
+    # Let SQLAlchemy emit BEGIN itself so that savepoints work on SQLite
+    @event.listens_for(engine.sync_engine, "connect")
+    def disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+    async def create_all():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_all())
+    return sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def new_order(order_id, side, quantity):
+    return Order(
+        order_id=order_id,
+        created_at=datetime.utcnow(),
+        type="limit",
+        side=side,
+        status="OPEN",
+        instrument="DE0001234567",
+        limit_price_ticks=10000,
+        quantity=quantity,
+    )
+
+
+async def save(session_factory, *orders):
+    async with session_factory() as session:
+        session.add_all(orders)
+        await session.commit()
+    return orders
+
+
+async def load(session_factory, model):
+    async with session_factory() as session:
+        return (await session.execute(select(model).order_by(model.id))).scalars().all()
+
+
+async def settle(processor, timeout=2.0):
+    """Wait until the queue and the placements are done"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while processor.q.qsize() or processor._placements:
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+
+
+@patch("app.processor.async_stock_exchange_processor.place_order")
+def test_orders_are_matched_and_submitted(place_order_mock, session_factory):
+    async def main():
+        processor = AsyncStockExchangeProcessor(session_factory, OrderBookRegistry())
+        await processor.start()
+        sell, buy = await save(
+            session_factory, new_order("u1", "sell", 5), new_order("u2", "buy", 8)
+        )
+        processor.enqueue(sell)
+        await settle(processor)
+        processor.enqueue(buy)
+        await settle(processor)
+        orders = await load(session_factory, Order)
+        matches = await load(session_factory, OrderMatching)
+        processor.stop()
+        return orders, matches
+
+    orders, matches = asyncio.run(main())
+
+    assert [(o.status, o.quantity) for o in orders] == [("MATCHED", 0), ("PARTIAL", 3)]
+    assert [(m.order_buy_id, m.order_sell_id, m.matched_quantity) for m in matches] == [
+        (2, 1, 5)
+    ]
+    # The resting sell went to the exchange before it was matched
+    assert place_order_mock.call_count == 1
+
+
+@patch("app.processor.async_stock_exchange_processor.place_order")
+def test_order_fails_after_max_retries(place_order_mock, session_factory):
+    place_order_mock.side_effect = OrderPlacementError("Connection not available")
+
+    async def main():
+        processor = AsyncStockExchangeProcessor(
+            session_factory, OrderBookRegistry(), max_retries=0
+        )
+        await processor.start()
+        (order,) = await save(session_factory, new_order("u1", "buy", 5))
+        processor.enqueue(order)
+        await settle(processor)
+        orders = await load(session_factory, Order)
+        processor.stop()
+        return processor, orders
+
+    processor, orders = asyncio.run(main())
+
+    assert orders[0].status == "FAILED"
+    assert not processor.order_books.get("DE0001234567").orders
+
+
+def test_orders_enqueued_before_start_are_kept(session_factory):
+    processor = AsyncStockExchangeProcessor(session_factory, OrderBookRegistry())
+    processor.enqueue(new_order("u1", "buy", 5))
+
+    async def main():
+        with patch.object(processor, "_run"):
+            await processor.start()
+        return processor.q.qsize()
+
+    assert asyncio.run(main()) == 1
+    processor.stop()
+
+
+def test_cancellation_waits_for_the_batch_being_matched(session_factory):
+    order = new_order("u1", "sell", 5)
+    order.id = 1
+
+    async def main():
+        processor = AsyncStockExchangeProcessor(session_factory, OrderBookRegistry())
+        with patch.object(processor, "_run"):
+            await processor.start()
+        book = processor.order_books.get(order.instrument)
+        book.add_order(order)
+        async with processor._matching:
+            cancel = asyncio.create_task(processor.cancel_async(order))
+            await asyncio.sleep(0.01)
+            # Still resting while the batch holds the lock
+            assert order.id in book.orders
+        await cancel
+        processor.stop()
+        return book
+
+    assert asyncio.run(main()).orders == {}
+
+
+@patch("app.processor.async_stock_exchange_processor.place_order")
+def test_failed_order_leaves_the_book_between_batches(
+    place_order_mock, session_factory
+):
+    place_order_mock.side_effect = OrderPlacementError("Exchange rejected the order")
+
+    async def main():
+        processor = AsyncStockExchangeProcessor(session_factory, OrderBookRegistry())
+        with patch.object(processor, "_run"):
+            await processor.start()
+        (order,) = await save(session_factory, new_order("u1", "buy", 5))
+        book = processor.order_books.get(order.instrument)
+        book.add_order(order)
+        async with processor._matching:
+            placement = asyncio.create_task(processor._place_async(order.id, None))
+            await asyncio.sleep(0.2)
+            # Failed already, but a batch is being matched against the book
+            assert not placement.done()
+            assert order.id in book.orders
+        await placement
+        processor.stop()
+        return book
+
+    assert asyncio.run(main()).orders == {}
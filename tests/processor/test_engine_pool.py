@@ -0,0 +1,75 @@
+from collections import Counter
+from unittest.mock import Mock
+
+from app.processor.engine_pool import EnginePool, HashRing
+from app.processor.order_book_registry import OrderBookRegistry
+from app.processor.stock_exchange_processor import StockExchangeProcessor
+
+INSTRUMENTS = [f"DE{i:010d}" for i in range(1000)]
+
+
+def test_hash_ring_is_stable():
+    first = HashRing(range(4))
+    second = HashRing(range(4))
+
+    assert all(first.node_for(i) == second.node_for(i) for i in INSTRUMENTS)
+
+
+def test_hash_ring_spreads_instruments():
+    ring = HashRing(range(4))
+
+    counts = Counter(ring.node_for(i) for i in INSTRUMENTS)
+
+    assert set(counts) == {0, 1, 2, 3}
+    assert min(counts.values()) > len(INSTRUMENTS) / 4 / 2
+
+
+def test_hash_ring_moves_only_instruments_of_added_node():
+    before = HashRing(range(4))
+    after = HashRing(range(5))
+
+    moved = [i for i in INSTRUMENTS if before.node_for(i) != after.node_for(i)]
+
+    assert all(after.node_for(i) == 4 for i in moved)
+    assert len(moved) < len(INSTRUMENTS) / 2
+
+
+def test_engine_pool_routes_by_instrument():
+    pool = EnginePool(3, engine_factory=Mock())
+    pool._inboxes = [Mock(), Mock(), Mock()]
+
+    pool.dispatch(1, "DE0001234567")
+    pool.cancel(1, "DE0001234567")
+
+    inbox = pool._inboxes[pool.shard_for("DE0001234567")]
+    assert [c.args[0] for c in inbox.put.call_args_list] == [
+        ("order", 1, "DE0001234567"),
+        ("cancel", 1, "DE0001234567"),
+    ]
+
+
+def test_processor_hands_orders_to_engine_pool():
+    engine_pool = Mock(processes=2)
+    processor = StockExchangeProcessor(
+        session_factory=Mock(),
+        order_books=OrderBookRegistry(),
+        engine_pool=engine_pool,
+        max_queue_depth=1,
+    )
+    order = Mock(id=1, instrument="DE0001234567")
+
+    processor.enqueue(order)
+    assert processor.is_saturated()
+    processor.cancel(order)
+
+    assert processor.thread is None
+    engine_pool.dispatch.assert_called_once_with(1, "DE0001234567")
+    engine_pool.cancel.assert_called_once_with(1, "DE0001234567")
+
+    # Engines report the orders they picked up through the start callback
+    on_dequeued = engine_pool.start.call_args.args[0]
+    on_dequeued([1])
+    assert processor.queue_depth() == 0
+
+    processor.stop()
+    engine_pool.stop.assert_called_once_with()
@@ -0,0 +1,144 @@
+import asyncio
+import io
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+import pytest
+
+from app.processor.engine_client import EngineClient
+from app.processor.engine_protocol import (
+    CANCEL,
+    ORDER,
+    STATS,
+    Frame,
+    encode_frame,
+    encode_reply,
+    read_frame,
+    read_reply,
+)
+from app.processor.engine_server import EngineServer
+from app.service.async_order_service import AsyncOrderService
+
+
+@pytest.fixture
+def engine_processor():
+    processor = Mock()
+    processor.stats.return_value = {"queue_depth": 2, "saturated": True}
+    return processor
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "engine.sock")
+
+
+@pytest.fixture
+def server(socket_path, engine_processor):
+    server = EngineServer(socket_path, engine_processor)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_frames_round_trip():
+    stream = io.BytesIO(
+        encode_frame(ORDER, 42, "DE0001234567")
+        + encode_frame(CANCEL, 2**40, "DE0009876543")
+        + encode_frame(STATS)
+    )
+
+    assert read_frame(stream) == Frame(ORDER, 42, "DE0001234567")
+    assert read_frame(stream) == Frame(CANCEL, 2**40, "DE0009876543")
+    assert read_frame(stream) == Frame(STATS, 0, "")
+    assert read_frame(stream) is None
+
+
+def test_order_frame_is_compact():
+    assert len(encode_frame(ORDER, 42, "DE0001234567")) == 22
+
+
+def test_truncated_frame_reads_as_closed():
+    assert read_frame(io.BytesIO(encode_frame(ORDER, 42, "DE0001234567")[:-1])) is None
+
+
+def test_reply_round_trip():
+    assert read_reply(io.BytesIO(encode_reply({"queue_depth": 3}))) == {
+        "queue_depth": 3
+    }
+
+
+def test_client_forwards_orders_and_cancellations(
+    server, socket_path, engine_processor
+):
+    client = EngineClient(socket_path)
+    order = Mock(id=7, instrument="DE0001234567")
+
+    client.enqueue(order)
+    client.cancel(order)
+
+    assert wait_for(lambda: engine_processor.cancel_id.called)
+    engine_processor.enqueue_id.assert_called_once_with(7, "DE0001234567")
+    engine_processor.cancel_id.assert_called_once_with(7, "DE0001234567")
+    client.stop()
+
+
+def test_async_service_cancels_through_the_engine(
+    server, socket_path, engine_processor
+):
+    client = EngineClient(socket_path)
+    order = Mock(id=7, instrument="DE0001234567", status="OPEN")
+    service = AsyncOrderService(MagicMock(), Mock(), client)
+
+    with patch("app.service.async_order_service.AsyncOrderRepository") as repo_class:
+        repository = repo_class.return_value = AsyncMock()
+        repository.get_by_order_id.return_value = order
+        repository.cancel.return_value = True
+        asyncio.run(service.cancel_order("uuid-7"))
+
+    assert wait_for(lambda: engine_processor.cancel_id.called)
+    engine_processor.cancel_id.assert_called_once_with(7, "DE0001234567")
+    repository.cancel.assert_awaited_once_with(order)
+    client.stop()
+
+
+def test_client_reads_engine_stats(server, socket_path, engine_processor):
+    client = EngineClient(socket_path, stats_ttl=60)
+
+    assert client.stats() == {"queue_depth": 2, "saturated": True}
+    assert client.is_saturated()
+    engine_processor.stats.assert_called_once_with()  # cached within the TTL
+    client.stop()
+
+
+def test_client_reconnects_after_engine_restart(socket_path, engine_processor):
+    client = EngineClient(socket_path, stats_ttl=0)
+    for _ in range(2):
+        server = EngineServer(socket_path, engine_processor)
+        thread = threading.Thread(
+            target=server.serve_forever, args=(0.05,), daemon=True
+        )
+        thread.start()
+        assert client.stats()["queue_depth"] == 2
+        server.shutdown()
+        server.server_close()
+        client._sock.shutdown(2)  # the engine went away with its connections
+    client.stop()
+
+
+def test_client_survives_missing_engine(socket_path):
+    client = EngineClient(socket_path)
+
+    client.enqueue(Mock(id=1, instrument="DE0001234567"))
+
+    assert client.stats() == {}
+    assert not client.is_saturated()
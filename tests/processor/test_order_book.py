@@ -2,8 +2,11 @@ from datetime import datetime, timedelta
 
 import pytest
 
+from app.dto.types import OrderSide
 from app.entity.order import Order
-from app.processor.order_book import OrderBook
+from app.processor.order_book import OrderBook, RestingOrder
+from app.processor.order_book_registry import OrderBookRegistry
+from app.utils.price import MARKET_BID_TICKS
 
 
 @pytest.fixture
@@ -16,6 +19,7 @@ def sample_orders():
             type="limit",
             instrument="XYZ",
             limit_price=100.0,
+            limit_price_ticks=10000,
             quantity=10,
             created_at=base_time,
             status="OPEN",
@@ -26,6 +30,7 @@ def sample_orders():
             type="limit",
             instrument="XYZ",
             limit_price=100.0,
+            limit_price_ticks=10000,
             quantity=10,
             created_at=base_time + timedelta(seconds=1),
             status="OPEN",
@@ -57,16 +62,16 @@ def test_add_order_limit(sample_orders):
     ob = OrderBook()
     ob.add_order(sample_orders[0])  # Buy limit order
     assert sample_orders[0].id in ob.orders
-    assert 100.0 in ob.bids
-    assert len(ob.bids[100.0]) == 1
+    assert 10000 in ob.bids
+    assert len(ob.bids[10000]) == 1
 
 
 def test_add_order_market(sample_orders):
     ob = OrderBook()
     ob.add_order(sample_orders[2])  # Buy market order
     assert sample_orders[2].id in ob.orders
-    assert float("inf") in ob.bids
-    assert len(ob.bids[float("inf")]) == 1
+    assert MARKET_BID_TICKS in ob.bids
+    assert len(ob.bids[MARKET_BID_TICKS]) == 1
 
 
 def test_remove_order(sample_orders):
@@ -74,7 +79,7 @@ def test_remove_order(sample_orders):
     ob.add_order(sample_orders[0])
     ob.remove_order("1")
     assert "1" not in ob.orders
-    assert 100.0 not in ob.bids or len(ob.bids[100.0]) == 0
+    assert 10000 not in ob.bids or len(ob.bids[10000]) == 0
 
 
 def test_get_matching_orders_limit_buy(sample_orders):
@@ -109,6 +114,7 @@ def test_get_matching_orders_ignore_closed_orders(sample_orders):
         type="limit",
         instrument="XYZ",
         limit_price=100.0,
+        limit_price_ticks=10000,
         quantity=10,
         created_at=datetime.utcnow(),
         status="CANCELLED",
@@ -116,3 +122,161 @@ def test_get_matching_orders_ignore_closed_orders(sample_orders):
     ob.add_order(closed_order)
     match = ob.get_matching_orders(sample_orders[0])  # Buy limit
     assert len(match) == 0
+
+
+def test_best_bid_and_ask(sample_orders):
+    ob = OrderBook()
+    assert ob.best_bid() is None
+    assert ob.best_ask() is None
+    ob.add_order(sample_orders[0])  # Buy limit at 100
+    ob.add_order(sample_orders[1])  # Sell limit at 100
+    assert ob.best_bid() == 10000
+    assert ob.best_ask() == 10000
+    ob.add_order(sample_orders[2])  # Buy market rests on top of the bids
+    assert ob.best_bid() == MARKET_BID_TICKS
+
+
+def test_get_matching_orders_price_time_priority(sample_orders):
+    ob = OrderBook()
+    base_time = datetime.utcnow()
+    asks = [
+        Order(
+            id=str(i),
+            side="sell",
+            type="limit",
+            instrument="XYZ",
+            limit_price=price,
+            limit_price_ticks=int(price * 100),
+            quantity=1,
+            created_at=base_time + timedelta(seconds=i),
+            status="OPEN",
+        )
+        for i, price in [(10, 101.0), (11, 99.0), (12, 100.0), (13, 99.0)]
+    ]
+    for ask in asks:
+        ob.add_order(ask)
+
+    match = ob.get_matching_orders(sample_orders[0])  # Buy limit at 100
+    assert [o.id for o in match] == ["11", "13", "12"]
+
+
+def test_add_order_twice_keeps_single_entry(sample_orders):
+    ob = OrderBook()
+    ob.add_order(sample_orders[0])
+    ob.add_order(sample_orders[0])
+    assert len(ob.bids[10000]) == 1
+    ob.remove_order("1")
+    assert 10000 not in ob.bids
+
+
+def test_registry_keeps_one_book_per_instrument(sample_orders):
+    registry = OrderBookRegistry()
+    xyz_book = registry.get("XYZ")
+    assert registry.get("XYZ") is xyz_book
+    assert registry.get("ABC") is not xyz_book
+
+    xyz_book.add_order(sample_orders[1])  # Sell limit at 100 on XYZ
+    assert registry.get("ABC").get_matching_orders(sample_orders[0]) == []
+
+    registry.remove_order("2")
+    assert "2" not in xyz_book.orders
+
+
+def test_remove_order_from_middle_of_level(sample_orders):
+    ob = OrderBook()
+    base_time = datetime.utcnow()
+    for i in range(3):
+        ob.add_order(
+            Order(
+                id=str(20 + i),
+                side="sell",
+                type="limit",
+                instrument="XYZ",
+                limit_price=100.0,
+                limit_price_ticks=10000,
+                quantity=1,
+                created_at=base_time + timedelta(seconds=i),
+                status="OPEN",
+            )
+        )
+    ob.remove_order("21")
+    assert len(ob.asks[10000]) == 2
+    assert [o.id for o in ob.get_matching_orders(sample_orders[0])] == ["20", "22"]
+    ob.remove_order("20")
+    ob.remove_order("22")
+    assert 10000 not in ob.asks
+    assert ob.orders == {}
+
+
+def test_iter_matching_orders_stops_once_quantity_is_covered(sample_orders):
+    ob = OrderBook()
+    base_time = datetime.utcnow()
+    for i, price in enumerate([99.0, 99.0, 100.0]):
+        ob.add_order(
+            Order(
+                id=str(30 + i),
+                side="sell",
+                type="limit",
+                instrument="XYZ",
+                limit_price=price,
+                limit_price_ticks=int(price * 100),
+                quantity=4,
+                created_at=base_time + timedelta(seconds=i),
+                status="OPEN",
+            )
+        )
+
+    matches = ob.iter_matching_orders(sample_orders[2], 5)  # Market buy for 5
+    assert [o.id for o in matches] == ["30", "31"]
+
+
+def test_iter_matching_orders_allows_removal_while_iterating(sample_orders):
+    ob = OrderBook()
+    ob.add_order(sample_orders[1])  # Sell limit at 100
+    seen = []
+    for match in ob.iter_matching_orders(sample_orders[0], 10):
+        seen.append(match.id)
+        ob.remove_order(match.id)
+    assert seen == ["2"]
+    assert ob.best_ask() is None
+
+
+def test_restore_follows_the_database_row(sample_orders):
+    ob = OrderBook()
+    ob.add_order(sample_orders[1])  # Sell limit at 100
+    behind = Order(
+        id="5",
+        side="sell",
+        type="limit",
+        instrument="XYZ",
+        limit_price=100.0,
+        limit_price_ticks=10000,
+        quantity=10,
+        status="PARTIAL",
+    )
+    record = ob.add_order(behind)
+    ob.fill(record, 5)  # Rolled back
+
+    assert ob.restore(behind) is record
+    assert record.quantity == 10
+    assert [o.id for o in ob.asks[10000]] == ["2", "5"]
+
+    sample_orders[1].status = "MATCHED"
+    assert ob.restore(sample_orders[1]) is None
+    assert "2" not in ob.orders
+
+
+def test_book_keeps_compact_records_detached_from_entities(sample_orders):
+    ob = OrderBook()
+    record = ob.add_order(sample_orders[0])
+    assert isinstance(record, RestingOrder)
+    assert not hasattr(record, "__dict__")
+    assert record.side is OrderSide.BUY
+    assert (record.id, record.price, record.quantity) == ("1", 10000, 10)
+
+    ob.fill(record, 4)
+    assert record.quantity == 6
+    assert sample_orders[0].quantity == 10  # The entity is left untouched
+    ob.fill(record, 6)
+    assert "1" not in ob.orders
+    assert 10000 not in ob.bids
@@ -0,0 +1,129 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.entity.base import Base
+from app.entity.order import Order
+from app.processor.order_book_loader import load_order_books
+from app.processor.order_book_registry import OrderBookRegistry
+from app.utils.price import MARKET_ASK_TICKS
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def insert_orders(engine, *orders):
+    with engine.begin() as connection:
+        connection.execute(
+            Order.__table__.insert(),
+            [
+                dict(
+                    order_id=f"uuid-{i}",
+                    created_at=datetime.utcnow(),
+                    type=type_,
+                    side=side,
+                    status=status,
+                    instrument=instrument,
+                    limit_price_ticks=ticks,
+                    quantity=quantity,
+                )
+                for i, (type_, side, status, instrument, ticks, quantity) in enumerate(
+                    orders
+                )
+            ],
+        )
+
+
+def test_load_order_books_rebuilds_resting_orders(engine):
+    insert_orders(
+        engine,
+        ("limit", "buy", "OPEN", "DE0001234567", 10000, 10),
+        ("limit", "sell", "SUBMITTED", "DE0001234567", 10100, 5),
+        ("limit", "buy", "PARTIAL", "DE0001234567", 10000, 3),
+        ("market", "sell", "OPEN", "DE0009876543", None, 7),
+        ("limit", "buy", "MATCHED", "DE0001234567", 10000, 0),
+        ("limit", "sell", "FAILED", "DE0009876543", 9900, 4),
+    )
+    order_books = OrderBookRegistry()
+
+    stats = load_order_books(engine, order_books, chunk_size=2)
+
+    assert stats.rows == 2
+    assert stats.books == 1
+    book = order_books.get("DE0001234567")
+    assert [o.id for o in book.bids[10000]] == [3]
+    assert book.best_ask() == 10100
+    # OPEN orders were never matched, they are handed back to be enqueued
+    assert stats.open_orders == ((1, "DE0001234567"), (4, "DE0009876543"))
+    assert "DE0009876543" not in order_books
+
+
+def test_load_order_books_keeps_time_priority(engine):
+    insert_orders(
+        engine,
+        ("limit", "buy", "SUBMITTED", "DE0001234567", 10000, 10),
+        ("market", "sell", "SUBMITTED", "DE0009876543", None, 7),
+        ("limit", "buy", "PARTIAL", "DE0001234567", 10000, 3),
+    )
+    order_books = OrderBookRegistry()
+
+    load_order_books(engine, order_books, chunk_size=1)
+
+    book = order_books.get("DE0001234567")
+    assert [o.id for o in book.bids[10000]] == [1, 3]  # Primary key (time) order
+    assert order_books.get("DE0009876543").best_ask() == MARKET_ASK_TICKS
+
+
+def test_load_order_books_empty_table(engine):
+    order_books = OrderBookRegistry()
+
+    stats = load_order_books(engine, order_books)
+
+    assert stats.rows == 0
+    assert len(order_books) == 0
+
+
+def test_load_order_books_filters_instruments(engine):
+    insert_orders(
+        engine,
+        ("limit", "buy", "SUBMITTED", "DE0001234567", 10000, 10),
+        ("limit", "sell", "SUBMITTED", "DE0009876543", 10100, 5),
+        ("limit", "buy", "OPEN", "DE0001234567", 9900, 3),
+    )
+    order_books = OrderBookRegistry()
+
+    stats = load_order_books(
+        engine,
+        order_books,
+        chunk_size=1,
+        instruments=lambda instrument: instrument == "DE0001234567",
+    )
+
+    assert stats.rows == 1
+    assert "DE0009876543" not in order_books
+    assert set(order_books.get("DE0001234567").orders) == {1}
+    assert stats.open_orders == ((3, "DE0001234567"),)
+
+
+def test_load_order_books_asks_once_per_instrument(engine):
+    insert_orders(
+        engine,
+        ("limit", "buy", "SUBMITTED", "DE0001234567", 10000, 10),
+        ("limit", "buy", "SUBMITTED", "DE0001234567", 9900, 5),
+        ("limit", "sell", "PARTIAL", "DE0009876543", 10100, 5),
+    )
+    asked = []
+
+    def instruments(instrument):
+        asked.append(instrument)
+        return False
+
+    stats = load_order_books(engine, OrderBookRegistry(), instruments=instruments)
+
+    assert sorted(asked) == ["DE0001234567", "DE0009876543"]
+    assert stats.rows == 0
@@ -0,0 +1,42 @@
+import random
+import threading
+import time
+
+from app.processor.retry_scheduler import RetryScheduler
+
+
+def test_backoff_grows_exponentially_with_jitter():
+    scheduler = RetryScheduler(base_delay=1.0, max_delay=10.0, rng=random.Random(7))
+    for attempt, delay in [(0, 1.0), (1, 2.0), (2, 4.0), (3, 8.0), (6, 10.0)]:
+        backoff = scheduler.backoff(attempt)
+        assert delay / 2 <= backoff <= delay
+
+
+def test_schedule_runs_actions_when_due_in_order():
+    scheduler = RetryScheduler(base_delay=0.1)
+    ran = []
+    done = threading.Event()
+    scheduler.schedule(1, lambda: (ran.append("late"), done.set()))
+    scheduler.schedule(0, lambda: ran.append("early"))
+    assert len(scheduler) == 2
+    assert ran == []
+
+    assert done.wait(1.0)
+    assert ran == ["early", "late"]
+    assert len(scheduler) == 0
+
+
+def test_schedule_does_not_block_the_caller():
+    scheduler = RetryScheduler(base_delay=5.0)
+    started = time.monotonic()
+    delay = scheduler.schedule(0, lambda: None)
+    assert time.monotonic() - started < 0.1
+    assert 2.5 <= delay <= 5.0
+
+
+def test_failing_action_does_not_stop_the_scheduler():
+    scheduler = RetryScheduler(base_delay=0.01)
+    done = threading.Event()
+    scheduler.schedule(0, lambda: 1 / 0)
+    scheduler.schedule(0, done.set)
+    assert done.wait(1.0)
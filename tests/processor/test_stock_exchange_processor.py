@@ -1,18 +1,36 @@
+import queue
+import threading
 import time
 from datetime import datetime
 from unittest.mock import Mock, patch
 
 import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
+from app.entity.base import Base
 from app.entity.order import Order
-from app.processor.order_book import OrderBook
+from app.entity.order_outbox import OrderOutbox
+from app.processor.order_book_registry import OrderBookRegistry
 from app.processor.stock_exchange_processor import StockExchangeProcessor
+from app.repo.order_outbox_repository import OrderOutboxRepository
+from app.stock_exchange import OrderPlacementError
+from app.utils.metrics import stage_seconds
 
 
 @pytest.fixture
-def session_mock():
+def db_orders():
+    """Orders visible through the mocked session, by primary key"""
+    return {}
+
+
+@pytest.fixture
+def session_mock(db_orders):
     mock_session = Mock()
-    mock_session.merge.side_effect = lambda obj, load=True: obj
+    query = mock_session.query.return_value
+    query.get.side_effect = db_orders.get
+    query.with_for_update.return_value = query
     return mock_session
 
 
@@ -24,14 +42,19 @@ def session_factory_mock(session_mock):
 
 
 @pytest.fixture
-def order_book():
-    return OrderBook()
+def order_books():
+    return OrderBookRegistry()
+
+
+@pytest.fixture
+def order_book(order_books):
+    return order_books.get("XYZ")
 
 
 @pytest.fixture
-def processor(session_factory_mock, order_book):
+def processor(session_factory_mock, order_books):
     return StockExchangeProcessor(
-        session_factory=session_factory_mock, order_book=order_book
+        session_factory=session_factory_mock, order_books=order_books
     )
 
 
@@ -45,6 +68,7 @@ def fake_order():
         quantity=10,
         instrument="XYZ",
         limit_price=100.0,
+        limit_price_ticks=10000,
         created_at=datetime.utcnow(),
     )
 
@@ -59,6 +83,7 @@ def matching_order():
         quantity=10,
         instrument="XYZ",
         limit_price=100.0,
+        limit_price_ticks=10000,
         created_at=datetime.utcnow(),
     )
 
@@ -70,12 +95,13 @@ def test_successful_order_match(
     place_order_mock,
     processor,
     session_factory_mock,
+    db_orders,
     fake_order,
     matching_order,
     order_book,
 ):
     session = session_factory_mock.return_value
-    session.query.return_value.get.return_value = fake_order
+    db_orders.update({fake_order.id: fake_order, matching_order.id: matching_order})
     order_book.add_order(matching_order)
     order_matching_repo_mock = Mock()
     order_matching_repo_mock_class.return_value = order_matching_repo_mock
@@ -85,7 +111,7 @@ def test_successful_order_match(
     assert matching_order.quantity == 0
     assert fake_order.status == "MATCHED"
     assert matching_order.status == "MATCHED"
-    order_matching_repo_mock.save.assert_called_once()
+    order_matching_repo_mock.save_all.assert_called_once()
     session.commit.assert_called()
     place_order_mock.assert_not_called()
 
@@ -97,6 +123,7 @@ def test_partial_order_match(
     place_order_mock,
     processor,
     session_factory_mock,
+    db_orders,
     fake_order,
     matching_order,
     order_book,
@@ -104,7 +131,7 @@ def test_partial_order_match(
     fake_order.quantity = 10
     matching_order.quantity = 5
     session = session_factory_mock.return_value
-    session.query.return_value.get.return_value = fake_order
+    db_orders.update({fake_order.id: fake_order, matching_order.id: matching_order})
     order_book.add_order(matching_order)
     order_matching_repo_mock = Mock()
     order_matching_repo_mock_class.return_value = order_matching_repo_mock
@@ -114,7 +141,7 @@ def test_partial_order_match(
     assert matching_order.quantity == 0
     assert fake_order.status == "PARTIAL"
     assert matching_order.status == "MATCHED"
-    order_matching_repo_mock.save.assert_called_once()
+    order_matching_repo_mock.save_all.assert_called_once()
     session.commit.assert_called()
     place_order_mock.assert_not_called()
 
@@ -126,19 +153,20 @@ def test_no_match_found(
     place_order_mock,
     processor,
     session_factory_mock,
+    db_orders,
     fake_order,
     matching_order,
     order_book,
 ):
     session = session_factory_mock.return_value
-    session.query.return_value.get.return_value = fake_order
+    db_orders.update({fake_order.id: fake_order, matching_order.id: matching_order})
     order_matching_repo_mock = Mock()
     order_matching_repo_mock_class.return_value = order_matching_repo_mock
     processor.enqueue(fake_order)
     time.sleep(0.2)
     assert fake_order.status == "SUBMITTED"
     assert matching_order.status == "OPEN"
-    order_matching_repo_mock.save.assert_not_called()
+    order_matching_repo_mock.save_all.assert_not_called()
     session.commit.assert_called()
     place_order_mock.assert_called_once()
 
@@ -150,11 +178,11 @@ def test_order_not_found_in_db(
     place_order_mock,
     processor,
     session_factory_mock,
+    db_orders,
     fake_order,
     order_book,
 ):
     session = session_factory_mock.return_value
-    session.query.return_value.get.return_value = None
     order_book.add_order(fake_order)
     order_matching_repo_mock = Mock()
     order_matching_repo_mock_class.return_value = order_matching_repo_mock
@@ -162,5 +190,732 @@ def test_order_not_found_in_db(
     time.sleep(0.2)
     assert fake_order.id not in order_book.orders
     place_order_mock.assert_not_called()
-    order_matching_repo_mock.save.assert_not_called()
+    order_matching_repo_mock.save_all.assert_not_called()
     session.commit.assert_called()
+
+
+@patch("app.processor.stock_exchange_processor.place_order")
+@patch("app.processor.stock_exchange_processor.OrderMatchingRepository")
+def test_orders_do_not_match_across_instruments(
+    order_matching_repo_mock_class,
+    place_order_mock,
+    processor,
+    session_factory_mock,
+    db_orders,
+    fake_order,
+    matching_order,
+    order_books,
+):
+    matching_order.instrument = "ABC"
+    db_orders.update({fake_order.id: fake_order, matching_order.id: matching_order})
+    order_books.get("ABC").add_order(matching_order)
+    processor.enqueue(fake_order)
+    time.sleep(0.2)
+    assert fake_order.status == "SUBMITTED"
+    assert matching_order.quantity == 10
+    order_matching_repo_mock_class.return_value.save_all.assert_not_called()
+    place_order_mock.assert_called_once()
+
+
+@patch("app.processor.stock_exchange_processor.place_order")
+@patch("app.processor.stock_exchange_processor.OrderMatchingRepository")
+def test_per_instrument_lanes(
+    order_matching_repo_mock_class,
+    place_order_mock,
+    session_factory_mock,
+    db_orders,
+    fake_order,
+    matching_order,
+    order_books,
+):
+    processor = StockExchangeProcessor(
+        session_factory=session_factory_mock,
+        order_books=order_books,
+        per_instrument_lanes=True,
+    )
+    db_orders.update({fake_order.id: fake_order, matching_order.id: matching_order})
+    order_books.get("XYZ").add_order(matching_order)
+    processor.enqueue(fake_order)
+    time.sleep(0.2)
+    assert list(processor.lanes) == [processor.lane_ring.node_for("XYZ")]
+    assert fake_order.status == "MATCHED"
+    assert matching_order.status == "MATCHED"
+    place_order_mock.assert_not_called()
+
+
+def test_lanes_are_bounded(session_factory_mock, order_books):
+    processor = StockExchangeProcessor(
+        session_factory=session_factory_mock,
+        order_books=order_books,
+        per_instrument_lanes=True,
+        max_lanes=2,
+    )
+
+    queues = {processor._lane_queue(f"DE{i:010d}") for i in range(50)}
+
+    assert len(queues) == len(processor.lanes) == 2
+
+
+def test_cancel_removes_order_from_book(processor, fake_order, order_book):
+    order_book.add_order(fake_order)
+    processor.cancel(fake_order)
+    assert fake_order.id not in order_book.orders
+    assert order_book.best_bid() is None
+
+
+@patch("app.processor.stock_exchange_processor.place_order")
+@patch("app.processor.stock_exchange_processor.OrderMatchingRepository")
+def test_only_consumed_matches_are_merged(
+    order_matching_repo_mock_class,
+    place_order_mock,
+    processor,
+    session_factory_mock,
+    db_orders,
+    fake_order,
+    order_book,
+):
+    session = session_factory_mock.return_value
+    db_orders[fake_order.id] = fake_order
+    resting = [
+        Order(
+            id=f"ask{i}",
+            side="sell",
+            type="limit",
+            status="OPEN",
+            quantity=10,
+            instrument="XYZ",
+            limit_price=100.0,
+            limit_price_ticks=10000,
+            created_at=datetime.utcnow(),
+        )
+        for i in range(5)
+    ]
+    for order in resting:
+        order_book.add_order(order)
+        db_orders[order.id] = order
+    processor.enqueue(fake_order)
+    time.sleep(0.2)
+    assert fake_order.status == "MATCHED"
+    assert [o.status for o in resting] == ["MATCHED"] + ["OPEN"] * 4
+    # Only the incoming order and the single consumed match are loaded
+    loaded = {c.args[0] for c in session.query.return_value.get.call_args_list}
+    assert loaded == {fake_order.id, "ask0"}
+
+
+@patch("app.processor.stock_exchange_processor.place_order")
+@patch("app.processor.stock_exchange_processor.OrderMatchingRepository")
+def test_exchange_submissions_overlap(
+    order_matching_repo_mock_class,
+    place_order_mock,
+    session_factory_mock,
+    db_orders,
+    order_books,
+):
+    place_order_mock.side_effect = lambda order: time.sleep(0.3)
+    processor = StockExchangeProcessor(
+        session_factory=session_factory_mock,
+        order_books=order_books,
+        max_submit_concurrency=4,
+    )
+    orders = [
+        Order(
+            id=f"buy{i}",
+            side="buy",
+            type="limit",
+            status="OPEN",
+            quantity=10,
+            instrument="XYZ",
+            limit_price=100.0,
+            limit_price_ticks=10000,
+            created_at=datetime.utcnow(),
+        )
+        for i in range(4)
+    ]
+    for order in orders:
+        db_orders[order.id] = order
+        processor.enqueue(order)
+    time.sleep(0.5)
+    # Sequential placement would need 1.2s
+    assert place_order_mock.call_count == 4
+    assert [o.status for o in orders] == ["SUBMITTED"] * 4
+
+
+@patch("app.processor.stock_exchange_processor.place_order")
+@patch("app.processor.stock_exchange_processor.OrderMatchingRepository")
+def test_transient_failure_is_retried_without_blocking(
+    order_matching_repo_mock_class,
+    place_order_mock,
+    session_factory_mock,
+    db_orders,
+    fake_order,
+    order_books,
+):
+    place_order_mock.side_effect = [
+        OrderPlacementError("Connection not available"),
+        None,
+    ]
+    processor = StockExchangeProcessor(
+        session_factory=session_factory_mock,
+        order_books=order_books,
+        retry_delay=0.1,
+    )
+    db_orders[fake_order.id] = fake_order
+    processor.enqueue(fake_order)
+    deadline = time.monotonic() + 1
+    while not len(processor.retry_scheduler) and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert place_order_mock.call_count == 1
+    assert len(processor.retry_scheduler) == 1
+    deadline = time.monotonic() + 1
+    while place_order_mock.call_count < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert place_order_mock.call_count == 2
+    assert fake_order.status == "SUBMITTED"
+    assert fake_order.id not in processor.retry_counts
+
+
+@patch("app.processor.stock_exchange_processor.place_order")
+@patch("app.processor.stock_exchange_processor.OrderMatchingRepository")
+def test_order_fails_after_max_retries(
+    order_matching_repo_mock_class,
+    place_order_mock,
+    session_factory_mock,
+    db_orders,
+    fake_order,
+    order_books,
+):
+    place_order_mock.side_effect = OrderPlacementError("Connection not available")
+    processor = StockExchangeProcessor(
+        session_factory=session_factory_mock,
+        order_books=order_books,
+        max_retries=2,
+        retry_delay=0.01,
+    )
+    db_orders[fake_order.id] = fake_order
+    processor.enqueue(fake_order)
+    time.sleep(0.3)
+    assert place_order_mock.call_count == 3
+    assert fake_order.status == "FAILED"
+    assert fake_order.id not in order_books.get("XYZ").orders
+
+
+@patch("app.processor.stock_exchange_processor.place_order")
+def test_cancellation_during_placement_is_kept(
+    place_order_mock, processor, session_mock, db_orders, fake_order
+):
+    db_orders[fake_order.id] = fake_order
+
+    def refresh(order, with_for_update=None):
+        # Cancelled by the API while the exchange call was running
+        order.status = "CANCELLED"
+
+    session_mock.refresh.side_effect = refresh
+
+    processor._place(fake_order.id, queue.Queue())
+
+    place_order_mock.assert_called_once()
+    session_mock.refresh.assert_called_once_with(fake_order, with_for_update=True)
+    assert fake_order.status == "CANCELLED"
+
+
+def test_next_batch_drains_up_to_batch_size(session_factory_mock, order_books):
+    processor = StockExchangeProcessor(
+        session_factory=session_factory_mock, order_books=order_books, batch_size=3
+    )
+    q = queue.Queue()
+    for order_id in range(5):
+        q.put(order_id)
+    assert processor._next_batch(q) == [0, 1, 2]
+    assert processor._next_batch(q) == [3, 4]
+
+
+@patch("app.processor.stock_exchange_processor.place_order")
+@patch("app.processor.stock_exchange_processor.OrderMatchingRepository")
+def test_batch_is_committed_once_with_bulk_matches(
+    order_matching_repo_mock_class,
+    place_order_mock,
+    processor,
+    session_factory_mock,
+    db_orders,
+    fake_order,
+    matching_order,
+    order_book,
+):
+    session = session_factory_mock.return_value
+    second_buy = Order(
+        id="ord3",
+        side="buy",
+        type="market",
+        status="OPEN",
+        quantity=5,
+        instrument="XYZ",
+        limit_price=None,
+        created_at=datetime.utcnow(),
+    )
+    matching_order.quantity = 15
+    for order in (fake_order, matching_order, second_buy):
+        db_orders[order.id] = order
+    order_book.add_order(matching_order)
+
+    processor._process_batch([fake_order.id, second_buy.id], queue.Queue())
+
+    session.commit.assert_called_once()
+    save_all = order_matching_repo_mock_class.return_value.save_all
+    save_all.assert_called_once()
+    assert [row["matched_quantity"] for row in save_all.call_args[0][0]] == [10, 5]
+    assert matching_order.status == "MATCHED"
+    assert fake_order.status == "MATCHED"
+    assert second_buy.status == "MATCHED"
+    place_order_mock.assert_not_called()
+
+
+@patch("app.processor.stock_exchange_processor.place_order")
+@patch("app.processor.stock_exchange_processor.OrderMatchingRepository")
+def test_failed_batch_commit_reloads_touched_orders(
+    order_matching_repo_mock_class,
+    place_order_mock,
+    processor,
+    session_factory_mock,
+    db_orders,
+    fake_order,
+    matching_order,
+    order_book,
+):
+    session = session_factory_mock.return_value
+    session.commit.side_effect = Exception("Lost connection")
+    # A partially filled maker, matched by the lost batch
+    matching_order.status = "PARTIAL"
+    db_orders.update({fake_order.id: fake_order, matching_order.id: matching_order})
+
+    def rollback():
+        fake_order.status, fake_order.quantity = "OPEN", 10
+        matching_order.status, matching_order.quantity = "PARTIAL", 10
+
+    session.rollback.side_effect = rollback
+    order_book.add_order(matching_order)
+    q = queue.Queue()
+
+    processor._process_batch([fake_order.id], q)
+
+    session.rollback.assert_called_once()
+    # The maker is back in the book and only the open taker is matched again
+    assert order_book.orders[matching_order.id].quantity == 10
+    assert fake_order.id not in order_book.orders
+    assert q.get_nowait() == fake_order.id
+    assert q.empty()
+
+
+def test_reload_keeps_the_queue_position_of_resting_orders(
+    processor, session_mock, db_orders, matching_order, order_book
+):
+    ahead = Order(
+        id="ord0",
+        side="sell",
+        type="limit",
+        status="SUBMITTED",
+        quantity=10,
+        instrument="XYZ",
+        limit_price=100.0,
+        limit_price_ticks=10000,
+        created_at=datetime.utcnow(),
+    )
+    order_book.add_order(ahead)
+    order_book.add_order(matching_order)
+    order_book.orders[ahead.id].quantity = 4  # Filled by a rolled back match
+    matching_order.status = "SUBMITTED"
+    db_orders.update({ahead.id: ahead, matching_order.id: matching_order})
+    q = queue.Queue()
+
+    processor._reload(session_mock, {ahead.id, matching_order.id}, q)
+
+    level = order_book.asks[10000]
+    assert [o.id for o in level] == [ahead.id, matching_order.id]
+    assert order_book.orders[ahead.id].quantity == 10
+    assert q.empty()
+
+
+@patch("app.processor.stock_exchange_processor.place_order")
+@patch("app.processor.stock_exchange_processor.OrderOutboxRepository")
+@patch("app.processor.stock_exchange_processor.OrderMatchingRepository")
+def test_durable_queue_claims_and_acks_outbox_entries(
+    order_matching_repo_mock_class,
+    outbox_repo_mock_class,
+    place_order_mock,
+    session_factory_mock,
+    db_orders,
+    fake_order,
+    matching_order,
+    order_books,
+):
+    outbox_repo = outbox_repo_mock_class.return_value
+    claims = iter([[(fake_order.id, fake_order.instrument)]])
+    # Pollers of processors from other tests may still be running
+    outbox_repo.claim.side_effect = lambda worker_id, *args: (
+        next(claims, []) if worker_id == "worker-a" else []
+    )
+    db_orders.update({fake_order.id: fake_order, matching_order.id: matching_order})
+    order_books.get("XYZ").add_order(matching_order)
+
+    processor = StockExchangeProcessor(
+        session_factory=session_factory_mock,
+        order_books=order_books,
+        durable_queue=True,
+        worker_id="worker-a",
+        outbox_poll_interval=0.01,
+    )
+    processor.enqueue(fake_order)
+    time.sleep(0.2)
+    processor.stop()
+
+    outbox_repo.claim.assert_any_call("worker-a", processor.batch_size, 60.0)
+    outbox_repo.ack.assert_called_once_with([fake_order.id], "worker-a")
+    assert fake_order.status == "MATCHED"
+    place_order_mock.assert_not_called()
+
+
+@patch("app.processor.stock_exchange_processor.place_order")
+@patch("app.processor.stock_exchange_processor.OrderOutboxRepository")
+@patch("app.processor.stock_exchange_processor.OrderMatchingRepository")
+def test_durable_queue_parks_retries_in_the_outbox(
+    order_matching_repo_mock_class,
+    outbox_repo_mock_class,
+    place_order_mock,
+    session_factory_mock,
+    db_orders,
+    fake_order,
+    order_books,
+):
+    place_order_mock.side_effect = OrderPlacementError("Connection not available")
+    outbox_repo = outbox_repo_mock_class.return_value
+    claims = iter([[(fake_order.id, fake_order.instrument)]])
+    outbox_repo.claim.side_effect = lambda worker_id, *args: (
+        next(claims, []) if worker_id == "worker-b" else []
+    )
+    db_orders[fake_order.id] = fake_order
+
+    processor = StockExchangeProcessor(
+        session_factory=session_factory_mock,
+        order_books=order_books,
+        durable_queue=True,
+        worker_id="worker-b",
+        outbox_poll_interval=0.01,
+    )
+    time.sleep(0.2)
+    processor.stop()
+
+    place_order_mock.assert_called_once()
+    # The claimed entry is handed back instead of acknowledged
+    outbox_repo.release.assert_called_once()
+    order_id, worker_id, delay = outbox_repo.release.call_args[0]
+    assert (order_id, worker_id) == (fake_order.id, "worker-b")
+    assert 2.5 <= delay <= 5.0
+    outbox_repo.add.assert_not_called()
+    assert fake_order.id not in outbox_repo.ack.call_args_list[0][0][0]
+
+
+@patch("app.processor.stock_exchange_processor.place_order")
+@patch("app.processor.stock_exchange_processor.OrderMatchingRepository")
+def test_cancelled_resting_order_is_not_matched(
+    order_matching_repo_mock_class,
+    place_order_mock,
+    processor,
+    db_orders,
+    fake_order,
+    matching_order,
+    order_book,
+):
+    # Cancelled in the database before the cancellation reached the book
+    order_book.add_order(matching_order)
+    matching_order.status = "CANCELLED"
+    db_orders.update({fake_order.id: fake_order, matching_order.id: matching_order})
+
+    processor._process_batch([fake_order.id], queue.Queue())
+
+    assert fake_order.quantity == 10
+    assert matching_order.quantity == 10
+    assert matching_order.id not in order_book.orders
+    order_matching_repo_mock_class.return_value.save_all.assert_not_called()
+
+
+@patch("app.processor.stock_exchange_processor.place_order")
+@patch("app.processor.stock_exchange_processor.OrderMatchingRepository")
+def test_cancelled_resting_order_does_not_use_up_the_taker(
+    order_matching_repo_mock_class,
+    place_order_mock,
+    processor,
+    db_orders,
+    fake_order,
+    matching_order,
+    order_book,
+):
+    cancelled = Order(
+        id="ord0",
+        side="sell",
+        type="limit",
+        status="OPEN",
+        quantity=10,
+        instrument="XYZ",
+        limit_price=100.0,
+        limit_price_ticks=10000,
+        created_at=datetime.utcnow(),
+    )
+    # The cancelled ask is ahead of the live one at the same price
+    order_book.add_order(cancelled)
+    order_book.add_order(matching_order)
+    cancelled.status = "CANCELLED"
+    db_orders.update(
+        {o.id: o for o in (fake_order, matching_order, cancelled)},
+    )
+
+    processor._process_batch([fake_order.id], queue.Queue())
+
+    assert fake_order.status == "MATCHED"
+    assert matching_order.status == "MATCHED"
+    assert cancelled.quantity == 10
+    assert order_book.orders == {}
+    place_order_mock.assert_not_called()
+
+
+def test_queue_depth_and_saturation(session_factory_mock, order_books, fake_order):
+    processor = StockExchangeProcessor(
+        session_factory=session_factory_mock, order_books=order_books, max_queue_depth=1
+    )
+    processor._dispatch = Mock()  # keep the order queued
+
+    assert not processor.is_saturated()
+    processor.enqueue(fake_order)
+
+    assert processor.queue_depth() == 1
+    assert processor.queue_lag() >= 0
+    assert processor.is_saturated()
+    assert processor.stats()["saturated"] is True
+    processor.stop()
+
+
+def test_processed_orders_leave_the_queue(processor, fake_order, db_orders):
+    db_orders[fake_order.id] = fake_order
+    processor._dispatch = Mock()
+    processor.enqueue(fake_order)
+
+    with patch("app.processor.stock_exchange_processor.place_order"):
+        processor._process_batch([fake_order.id], queue.Queue())
+
+    assert processor.queue_depth() == 0
+    assert processor.queue_lag() == 0.0
+
+
+def test_enqueue_many_dispatches_every_order(processor, fake_order, matching_order):
+    processor._dispatch = Mock()
+
+    processor.enqueue_many([fake_order, matching_order])
+
+    assert processor.queue_depth() == 2
+    assert [c.args for c in processor._dispatch.call_args_list] == [
+        ("ord1", "XYZ"),
+        ("ord2", "XYZ"),
+    ]
+
+
+@patch("app.processor.stock_exchange_processor.place_order")
+@patch("app.processor.stock_exchange_processor.OrderMatchingRepository")
+def test_listeners_are_told_about_committed_changes(
+    order_matching_repo_mock_class,
+    place_order_mock,
+    processor,
+    db_orders,
+    fake_order,
+    matching_order,
+    order_book,
+):
+    changed = []
+    processor.add_listener(changed.extend)
+    processor.add_listener(Mock(side_effect=RuntimeError("listener bug")))
+    db_orders.update({fake_order.id: fake_order, matching_order.id: matching_order})
+    order_book.add_order(matching_order)
+
+    processor.enqueue(fake_order)
+    time.sleep(0.2)
+
+    assert fake_order.status == "MATCHED"
+    assert sorted((event.id, event.status) for event in changed) == [
+        ("ord1", "MATCHED"),
+        ("ord2", "MATCHED"),
+    ]
+
+
+@patch("app.processor.stock_exchange_processor.place_order")
+@patch("app.processor.stock_exchange_processor.OrderMatchingRepository")
+def test_batch_stages_are_timed(
+    order_matching_repo_mock_class,
+    place_order_mock,
+    processor,
+    db_orders,
+    fake_order,
+    matching_order,
+    order_book,
+):
+    counts = {
+        stage: stage_seconds.labels(stage).count
+        for stage in ("queue_wait", "match", "commit")
+    }
+    db_orders.update({fake_order.id: fake_order, matching_order.id: matching_order})
+    order_book.add_order(matching_order)
+
+    processor.enqueue(fake_order)
+    processor.q.join()
+
+    for stage, count in counts.items():
+        assert stage_seconds.labels(stage).count == count + 1
+    assert order_book.depth() == (0, 0)
+
+
+@pytest.fixture
+def sqlite_session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+    # Let SQLAlchemy emit BEGIN itself so that savepoints work on SQLite
+    @event.listens_for(engine, "connect")
+    def disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+def test_unmatched_order_is_claimed_again_after_a_crash_before_placement(
+    sqlite_session_factory, order_books
+):
+    session = sqlite_session_factory()
+    session.add(
+        Order(
+            id=1,
+            order_id="ord1",
+            type="limit",
+            side="buy",
+            status="OPEN",
+            instrument="XYZ",
+            limit_price_ticks=10000,
+            quantity=10,
+        )
+    )
+    OrderOutboxRepository(session).add(1, "XYZ")
+    session.commit()
+    assert OrderOutboxRepository(session).claim("worker-a", 10, 0) == [(1, "XYZ")]
+    session.close()
+    processor = StockExchangeProcessor(
+        session_factory=sqlite_session_factory,
+        order_books=order_books,
+        durable_queue=True,
+        worker_id="worker-a",
+        poll_outbox=False,
+    )
+
+    # The process dies after the batch commits, before placing the order
+    with patch.object(processor, "_submit") as submit:
+        processor._process_batch([1], processor.q)
+
+    submit.assert_called_once_with(1, processor.q)
+    session = sqlite_session_factory()
+    assert OrderOutboxRepository(session).claim("worker-b", 10, 60) == [(1, "XYZ")]
+    session.close()
+
+
+def test_placement_acknowledges_the_outbox_entry(sqlite_session_factory, order_books):
+    session = sqlite_session_factory()
+    session.add(
+        Order(
+            id=1,
+            order_id="ord1",
+            type="limit",
+            side="buy",
+            status="OPEN",
+            instrument="XYZ",
+            limit_price_ticks=10000,
+            quantity=10,
+        )
+    )
+    OrderOutboxRepository(session).add(1, "XYZ")
+    session.commit()
+    OrderOutboxRepository(session).claim("worker-a", 10, 60)
+    session.close()
+    processor = StockExchangeProcessor(
+        session_factory=sqlite_session_factory,
+        order_books=order_books,
+        durable_queue=True,
+        worker_id="worker-a",
+        poll_outbox=False,
+    )
+
+    with patch("app.processor.stock_exchange_processor.place_order"):
+        processor._place(1, processor.q)
+
+    session = sqlite_session_factory()
+    assert session.query(Order).get(1).status == "SUBMITTED"
+    assert session.query(OrderOutbox).count() == 0
+    session.close()
+
+
+def test_failed_placement_waits_for_matching_to_release_the_book(
+    processor, session_factory_mock, order_book, fake_order
+):
+    order_book.add_order(fake_order)
+    session_factory_mock.return_value.query.side_effect = Exception("DB error")
+
+    # A match holds the book while the placement of the order fails
+    with order_book.lock:
+        placement = threading.Thread(target=processor._place, args=("ord1", None))
+        placement.start()
+        placement.join(0.1)
+        assert placement.is_alive()
+        assert "ord1" in order_book.orders
+
+    placement.join(1)
+    assert not placement.is_alive()
+    assert "ord1" not in order_book.orders
+
+
+@patch("app.processor.stock_exchange_processor.place_order")
+@patch("app.processor.stock_exchange_processor.OrderMatchingRepository")
+def test_resting_orders_are_locked_in_bulk_outside_the_book_lock(
+    order_matching_repo_mock_class,
+    place_order_mock,
+    processor,
+    session_mock,
+    db_orders,
+    fake_order,
+    matching_order,
+    order_book,
+):
+    order_book.add_order(matching_order)
+    db_orders.update({fake_order.id: fake_order, matching_order.id: matching_order})
+    book_free = []
+
+    def probe():
+        acquired = order_book.lock.acquire(blocking=False)
+        if acquired:
+            order_book.lock.release()
+        book_free.append(acquired)
+
+    def lock_rows():
+        # Another thread must be able to take the book meanwhile
+        thread = threading.Thread(target=probe)
+        thread.start()
+        thread.join()
+
+    locked_query = session_mock.query.return_value.filter.return_value
+    locked_query.with_for_update.return_value.all.side_effect = lock_rows
+
+    processor._process_batch([fake_order.id], queue.Queue())
+
+    assert fake_order.status == "MATCHED"
+    assert book_free == [True, True]  # the batch takers, then the makers
+    session_mock.query.return_value.with_for_update.assert_not_called()
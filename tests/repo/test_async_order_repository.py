@@ -0,0 +1,146 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.dto.order_request import OrderFilter
+from app.entity.base import Base
+from app.entity.idempotency_key import IdempotencyKey
+from app.entity.order import Order
+from app.entity.order_matching import OrderMatching
+from app.entity.order_outbox import OrderOutbox
+from app.repo.async_order_repository import AsyncOrderRepository
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+
+    async def create_all():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_all())
+    return sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def new_order(order_id="uuid-1", status="OPEN"):
+    return Order(
+        order_id=order_id,
+        created_at=datetime.utcnow(),
+        type="limit",
+        side="buy",
+        status=status,
+        instrument="DE0001234567",
+        limit_price_ticks=10000,
+        quantity=10,
+    )
+
+
+def run(session_factory, work):
+    async def main():
+        async with session_factory() as db:
+            return await work(AsyncOrderRepository(db), db)
+
+    return asyncio.run(main())
+
+
+def test_save_and_get_by_order_id(session_factory):
+    async def work(repository, db):
+        saved = await repository.save(new_order())
+        found = await repository.get_by_order_id("uuid-1")
+        missing = await repository.get_by_order_id("uuid-2")
+        return saved, found, missing
+
+    saved, found, missing = run(session_factory, work)
+
+    assert saved.id is not None
+    assert found.id == saved.id
+    assert missing is None
+
+
+def test_save_with_outbox_queues_the_order(session_factory):
+    async def work(repository, db):
+        saved = await repository.save_with_outbox(new_order())
+        entries = (await db.execute(OrderOutbox.__table__.select())).all()
+        return saved, entries
+
+    saved, entries = run(session_factory, work)
+
+    assert [(e.order_id, e.instrument) for e in entries] == [(saved.id, "DE0001234567")]
+
+
+def test_cancel_only_resting_orders(session_factory):
+    async def work(repository, db):
+        resting = await repository.save(new_order("uuid-1"))
+        matched = await repository.save(new_order("uuid-2", status="MATCHED"))
+        return await repository.cancel(resting), await repository.cancel(matched)
+
+    assert run(session_factory, work) == (True, False)
+
+
+def test_save_all_sets_primary_keys(session_factory):
+    async def work(repository, db):
+        orders = [new_order(f"uuid-{i}") for i in range(3)]
+        saved = await repository.save_all(orders, outbox=True)
+        entries = (await db.execute(OrderOutbox.__table__.select())).all()
+        return saved, entries
+
+    saved, entries = run(session_factory, work)
+
+    assert [o.id for o in saved] == [1, 2, 3]
+    assert sorted(e.order_id for e in entries) == [1, 2, 3]
+
+
+def test_get_fills_on_either_side(session_factory):
+    async def work(repository, db):
+        buy = await repository.save(new_order("uuid-1"))
+        sell = await repository.save(new_order("uuid-2"))
+        other = await repository.save(new_order("uuid-3"))
+        db.add(
+            OrderMatching(
+                order_buy_id=buy.id,
+                order_sell_id=sell.id,
+                matched_quantity=5,
+                instrument="DE0001234567",
+            )
+        )
+        await db.commit()
+        return [
+            len(await repository.get_fills(order.id)) for order in (buy, sell, other)
+        ]
+
+    assert run(session_factory, work) == [1, 1, 0]
+
+
+def test_list_page_and_stream(session_factory):
+    async def work(repository, db):
+        await repository.save_all([new_order(f"uuid-{i}") for i in range(3)])
+        page = await repository.list_page(OrderFilter(), after=1, limit=1)
+        result = await repository.stream(OrderFilter())
+        rows = [row async for row in result]
+        return page, rows
+
+    page, rows = run(session_factory, work)
+
+    assert [o.order_id for o in page] == ["uuid-1", "uuid-2"]
+    assert [row.id for row in rows] == ["uuid-0", "uuid-1", "uuid-2"]
+
+
+def test_save_with_idempotency_key(session_factory):
+    async def work(repository, db):
+        key = IdempotencyKey(
+            key="key-1",
+            request_hash="hash",
+            response="{}",
+            expires_at=datetime.now() + timedelta(days=1),
+        )
+        saved = await repository.save(new_order(), key)
+        return saved, await repository.get_idempotency_key("key-1")
+
+    saved, key = run(session_factory, work)
+
+    assert key.order_id == saved.id
+    assert key.request_hash == "hash"
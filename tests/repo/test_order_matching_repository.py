@@ -2,8 +2,12 @@ from typing import List
 from unittest.mock import MagicMock
 
 import pytest
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
 
+from app.dto.order_request import OrderFilter
+from app.entity.base import Base
+from app.entity.order import Order
 from app.entity.order_matching import OrderMatching
 from app.repo.order_matching_repository import OrderMatchingRepository
 
@@ -51,3 +55,62 @@ def test_get_by_order_id(order_matching_repository, mock_db, fake_order_matching
     mock_db.query.return_value.filter.return_value.all.assert_called_once()
 
     assert result == [fake_order_matching]
+
+
+def test_save_all_order_matchings(order_matching_repository, mock_db):
+    rows = [
+        dict(order_buy_id=1, order_sell_id=2, matched_quantity=5, instrument="XYZ"),
+        dict(order_buy_id=3, order_sell_id=2, matched_quantity=5, instrument="XYZ"),
+    ]
+
+    assert order_matching_repository.save_all(rows) == 2
+
+    mock_db.execute.assert_called_once()
+    assert mock_db.execute.call_args[0][1] == rows
+    mock_db.commit.assert_not_called()
+
+
+def test_save_all_without_rows(order_matching_repository, mock_db):
+    assert order_matching_repository.save_all([]) == 0
+    mock_db.execute.assert_not_called()
+
+
+def test_stream_exports_fills_with_public_order_ids():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    orders = [
+        Order(
+            order_id=f"uuid-{i}",
+            type="limit",
+            side=side,
+            instrument="DE0001234567",
+            quantity=0,
+            status="MATCHED",
+        )
+        for i, side in enumerate(("buy", "sell"))
+    ]
+    db.add_all(orders)
+    db.flush()
+    OrderMatchingRepository(db).save_all(
+        [
+            dict(
+                order_buy_id=orders[0].id,
+                order_sell_id=orders[1].id,
+                matched_quantity=10,
+                instrument="DE0001234567",
+            )
+        ]
+    )
+    db.commit()
+
+    result = OrderMatchingRepository(db).stream(OrderFilter())
+    rows = [row._asdict() for rows in result.partitions(100) for row in rows]
+    other = OrderMatchingRepository(db).stream(OrderFilter(instrument="DE0009876543"))
+
+    assert len(rows) == 1
+    assert rows[0]["buy_order_id"] == "uuid-0"
+    assert rows[0]["sell_order_id"] == "uuid-1"
+    assert rows[0]["matched_quantity"] == 10
+    assert other.all() == []
+    db.close()
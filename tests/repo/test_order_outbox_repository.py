@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.entity.base import Base
+from app.entity.order_outbox import OrderOutbox
+from app.repo.order_outbox_repository import OrderOutboxRepository
+
+
+@pytest.fixture
+def db():
+    # SQLite stands in for MySQL, it ignores FOR UPDATE SKIP LOCKED
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def outbox_repository(db):
+    return OrderOutboxRepository(db=db)
+
+
+def test_claim_returns_due_entries_in_order(outbox_repository, db):
+    outbox_repository.add(1, "DE0001234567")
+    outbox_repository.add(2, "DE0009876543")
+    outbox_repository.add(3, "DE0001234567", delay=60)
+    db.commit()
+
+    claimed = outbox_repository.claim("worker-a", limit=10, lease_seconds=30)
+
+    assert claimed == [(1, "DE0001234567"), (2, "DE0009876543")]
+
+
+def test_claim_respects_limit(outbox_repository, db):
+    for order_id in range(5):
+        outbox_repository.add(order_id, "DE0001234567")
+    db.commit()
+
+    assert len(outbox_repository.claim("worker-a", limit=2, lease_seconds=30)) == 2
+    assert len(outbox_repository.claim("worker-b", limit=10, lease_seconds=30)) == 3
+
+
+def test_claimed_entries_are_not_claimed_twice(outbox_repository, db):
+    outbox_repository.add(1, "DE0001234567")
+    db.commit()
+
+    assert outbox_repository.claim("worker-a", limit=10, lease_seconds=30) == [
+        (1, "DE0001234567")
+    ]
+    assert outbox_repository.claim("worker-b", limit=10, lease_seconds=30) == []
+
+
+def test_expired_lease_can_be_claimed_again(outbox_repository, db):
+    outbox_repository.add(1, "DE0001234567")
+    db.commit()
+    outbox_repository.claim("worker-a", limit=10, lease_seconds=30)
+    db.query(OrderOutbox).update(
+        {OrderOutbox.claimed_until: datetime.now() - timedelta(seconds=1)}
+    )
+    db.commit()
+
+    assert outbox_repository.claim("worker-b", limit=10, lease_seconds=30) == [
+        (1, "DE0001234567")
+    ]
+
+
+def test_ack_removes_only_own_claims(outbox_repository, db):
+    outbox_repository.add(1, "DE0001234567")
+    outbox_repository.add(2, "DE0001234567")
+    db.commit()
+    outbox_repository.claim("worker-a", limit=1, lease_seconds=30)
+    outbox_repository.claim("worker-b", limit=1, lease_seconds=30)
+
+    assert outbox_repository.ack([1, 2], "worker-a") == 1
+    db.commit()
+
+    assert [entry.order_id for entry in db.query(OrderOutbox)] == [2]
+
+
+def test_release_makes_an_own_claim_due_again_later(outbox_repository, db):
+    outbox_repository.add(1, "DE0001234567")
+    db.commit()
+    outbox_repository.claim("worker-a", limit=10, lease_seconds=30)
+
+    assert outbox_repository.release(1, "worker-b", delay=0) == 0
+    assert outbox_repository.release(1, "worker-a", delay=60) == 1
+    db.commit()
+
+    entry = db.query(OrderOutbox).one()
+    assert entry.claimed_by is None
+    assert entry.available_at > datetime.now() + timedelta(seconds=30)
+    assert outbox_repository.claim("worker-b", limit=10, lease_seconds=30) == []
+
+
+def test_backlog_counts_entries_and_oldest(outbox_repository, db):
+    assert outbox_repository.backlog() == (0, None)
+    outbox_repository.add(1, "DE0001234567")
+    outbox_repository.add(2, "DE0001234567", delay=60)
+    db.commit()
+
+    count, oldest = outbox_repository.backlog()
+
+    assert count == 2
+    assert oldest <= datetime.now()
@@ -1,9 +1,15 @@
+from datetime import datetime
 from unittest.mock import MagicMock
 
 import pytest
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
 
+from app.dto.order_request import OrderFilter
+from app.dto.types import OrderSide, OrderStatus
+from app.entity.base import Base
 from app.entity.order import Order
+from app.entity.order_outbox import OrderOutbox
 from app.repo.order_repository import OrderRepository
 
 
@@ -43,3 +49,143 @@ def test_save_order(order_repository, mock_db, fake_order):
     mock_db.refresh.assert_called_once_with(fake_order)
 
     assert saved_order == fake_order
+
+
+def test_get_by_order_id(order_repository, mock_db, fake_order):
+    mock_db.query.return_value.filter.return_value.first.return_value = fake_order
+
+    result = order_repository.get_by_order_id("uuid-1")
+
+    mock_db.query.assert_called_once_with(Order)
+    assert result == fake_order
+
+
+def test_cancel_order(order_repository, mock_db, fake_order):
+    mock_db.query.return_value.filter.return_value.update.return_value = 1
+
+    assert order_repository.cancel(fake_order) is True
+    mock_db.commit.assert_called_once()
+
+
+def test_cancel_order_already_filled(order_repository, mock_db, fake_order):
+    mock_db.query.return_value.filter.return_value.update.return_value = 0
+
+    assert order_repository.cancel(fake_order) is False
+
+
+def test_save_order_with_outbox(order_repository, mock_db, fake_order):
+    saved_order = order_repository.save_with_outbox(fake_order)
+
+    assert mock_db.add.call_count == 2
+    mock_db.add.assert_any_call(fake_order)
+    outbox_entry = mock_db.add.call_args_list[1][0][0]
+    assert outbox_entry.order_id == fake_order.id
+    assert outbox_entry.instrument == fake_order.instrument
+    mock_db.flush.assert_called_once()
+    mock_db.commit.assert_called_once()
+    assert saved_order == fake_order
+
+
+@pytest.fixture
+def sqlite_db():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def new_order(order_id, side="buy", instrument="DE0001234567"):
+    return Order(
+        order_id=order_id,
+        type="limit",
+        side=side,
+        instrument=instrument,
+        limit_price_ticks=10000,
+        quantity=10,
+    )
+
+
+def test_save_all_inserts_orders_in_one_statement(sqlite_db):
+    statements = []
+    engine = sqlite_db.get_bind()
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    orders = [new_order(f"uuid-{i}") for i in range(3)]
+
+    saved = OrderRepository(db=sqlite_db).save_all(orders, outbox=True)
+
+    assert [o.id for o in saved] == [1, 2, 3]
+    assert all(o.status == "OPEN" and o.created_at for o in saved)
+    assert sum(s.startswith("INSERT INTO orders") for s in statements) == 1
+    assert sum(s.startswith("INSERT INTO order_outbox") for s in statements) == 1
+    assert sorted(e.order_id for e in sqlite_db.query(OrderOutbox)) == [1, 2, 3]
+
+
+def test_save_all_empty_batch(sqlite_db):
+    assert OrderRepository(db=sqlite_db).save_all([]) == []
+
+
+def test_list_page_seeks_by_primary_key(sqlite_db):
+    repository = OrderRepository(db=sqlite_db)
+    repository.save_all(
+        [new_order(f"uuid-{i}", side=("buy", "sell")[i % 2]) for i in range(5)]
+    )
+    buys = OrderFilter(side=OrderSide.BUY)
+
+    first = repository.list_page(buys, after=None, limit=2)
+    second = repository.list_page(buys, after=first[1].id, limit=2)
+
+    # One row more than the limit tells that another page follows
+    assert [o.order_id for o in first] == ["uuid-0", "uuid-2", "uuid-4"]
+    assert [o.order_id for o in second] == ["uuid-4"]
+    assert (
+        repository.list_page(
+            OrderFilter(status=OrderStatus.MATCHED), after=None, limit=2
+        )
+        == []
+    )
+
+
+def test_list_page_filters_by_creation_time(sqlite_db):
+    repository = OrderRepository(db=sqlite_db)
+    orders = [new_order(f"uuid-{i}") for i in range(3)]
+    for day, order in enumerate(orders, start=1):
+        order.created_at = datetime(2025, 4, day)
+    repository.save_all(orders)
+
+    page = repository.list_page(
+        OrderFilter(created_from=datetime(2025, 4, 2), created_to=datetime(2025, 4, 3)),
+        after=None,
+        limit=10,
+    )
+
+    assert [o.order_id for o in page] == ["uuid-1"]
+
+
+def test_stream_exports_public_columns(sqlite_db):
+    repository = OrderRepository(db=sqlite_db)
+    repository.save_all(
+        [
+            new_order("uuid-1"),
+            new_order("uuid-2", instrument="DE0009876543"),
+        ]
+    )
+
+    result = repository.stream(OrderFilter(instrument="DE0001234567"))
+    rows = [row._asdict() for rows in result.partitions(1) for row in rows]
+
+    assert [row["id"] for row in rows] == ["uuid-1"]
+    assert set(rows[0]) == {
+        "id",
+        "created_at",
+        "type",
+        "side",
+        "instrument",
+        "limit_price",
+        "quantity",
+        "status",
+    }
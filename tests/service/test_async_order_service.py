@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+import pytest
+
+from app.dto.order_request import CreateOrderModel
+from app.exception.order_exception import (
+    OrderNotFoundException,
+    OrderQueueFullException,
+    OrderStateException,
+)
+from app.service.async_order_service import AsyncOrderService
+
+
+@pytest.fixture
+def mock_dependencies():
+    session_factory = MagicMock()
+    mapper = Mock()
+    mapper.to_response.return_value = {
+        "id": "test-id-123",
+        "created_at": datetime(2023, 1, 1).isoformat(),
+        "type": "market",
+        "side": "buy",
+        "instrument": "DE0001234567",
+        "limit_price": None,
+        "quantity": 100,
+    }
+    processor = Mock()
+    processor.is_saturated.return_value = False
+    processor.cancel_async = AsyncMock()
+    return session_factory, mapper, processor
+
+
+@pytest.fixture
+def mock_repo():
+    with patch("app.service.async_order_service.AsyncOrderRepository") as repo_class:
+        repo_class.return_value = AsyncMock()
+        yield repo_class.return_value
+
+
+def market_order():
+    return CreateOrderModel(
+        type="market", side="buy", instrument="DE0001234567", quantity=100
+    )
+
+
+def test_create_order(mock_repo, mock_dependencies):
+    session_factory, mapper, processor = mock_dependencies
+    service = AsyncOrderService(session_factory, mapper, processor)
+
+    response = asyncio.run(service.create_order(market_order()))
+
+    assert response.id == "test-id-123"
+    mock_repo.save.assert_awaited_once_with(mapper.to_entity.return_value, None)
+    processor.enqueue.assert_called_once_with(mock_repo.save.return_value)
+
+
+def test_create_order_with_outbox(mock_repo, mock_dependencies):
+    session_factory, mapper, processor = mock_dependencies
+    service = AsyncOrderService(session_factory, mapper, processor, outbox=True)
+
+    asyncio.run(service.create_order(market_order()))
+
+    mock_repo.save_with_outbox.assert_awaited_once()
+    mock_repo.save.assert_not_awaited()
+
+
+def test_create_order_rejected_when_queue_is_full(mock_repo, mock_dependencies):
+    session_factory, mapper, processor = mock_dependencies
+    processor.is_saturated.return_value = True
+    service = AsyncOrderService(session_factory, mapper, processor)
+
+    with pytest.raises(OrderQueueFullException):
+        asyncio.run(service.create_order(market_order()))
+    mock_repo.save.assert_not_awaited()
+
+
+def test_cancel_order(mock_repo, mock_dependencies):
+    session_factory, mapper, processor = mock_dependencies
+    order = Mock(id=1, status="OPEN")
+    mock_repo.get_by_order_id.return_value = order
+    mock_repo.cancel.return_value = True
+    service = AsyncOrderService(session_factory, mapper, processor)
+
+    asyncio.run(service.cancel_order("test-id-123"))
+
+    processor.cancel_async.assert_awaited_once_with(order)
+    mock_repo.cancel.assert_awaited_once_with(order)
+
+
+def test_cancel_order_not_found(mock_repo, mock_dependencies):
+    session_factory, mapper, processor = mock_dependencies
+    mock_repo.get_by_order_id.return_value = None
+    service = AsyncOrderService(session_factory, mapper, processor)
+
+    with pytest.raises(OrderNotFoundException):
+        asyncio.run(service.cancel_order("missing"))
+
+
+def test_cancel_order_already_matched(mock_repo, mock_dependencies):
+    session_factory, mapper, processor = mock_dependencies
+    mock_repo.get_by_order_id.return_value = Mock(id=1, status="MATCHED")
+    service = AsyncOrderService(session_factory, mapper, processor)
+
+    with pytest.raises(OrderStateException):
+        asyncio.run(service.cancel_order("test-id-123"))
+    processor.cancel_async.assert_not_awaited()
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+from datetime import datetime
+
+from app.processor.order_event import OrderEvent
+from app.service.broadcaster import Broadcaster
+
+
+def event(order_id="uuid-1", instrument="DE0001234567", status="MATCHED"):
+    return OrderEvent(1, order_id, instrument, status, 0, datetime(2025, 4, 19))
+
+
+def test_events_are_fanned_out_to_matching_subscribers():
+    broadcaster = Broadcaster()
+
+    async def main():
+        everything = broadcaster.subscribe()
+        one_order = broadcaster.subscribe(order_ids=["uuid-2"])
+        other_instrument = broadcaster.subscribe(instrument="DE0009876543")
+        # Published from a processor thread
+        thread = threading.Thread(
+            target=broadcaster.publish, args=([event("uuid-1"), event("uuid-2")],)
+        )
+        thread.start()
+        thread.join()
+        received = [await everything.get(), await everything.get()]
+        return received, await one_order.get(), other_instrument.queue.qsize()
+
+    received, one, other = asyncio.run(main())
+
+    assert [e.order_id for e in received] == ["uuid-1", "uuid-2"]
+    assert one.order_id == "uuid-2"
+    assert other == 0
+    assert broadcaster.stats()["delivered"] == 3
+
+
+def test_slow_subscriber_is_dropped():
+    broadcaster = Broadcaster(max_buffer=2)
+
+    async def main():
+        slow = broadcaster.subscribe()
+        fast = broadcaster.subscribe()
+        broadcaster.publish([event(), event()])
+        await asyncio.sleep(0)
+        await fast.get(), await fast.get()
+        broadcaster.publish([event()])
+        await asyncio.sleep(0)
+        return slow, await slow.get(), await fast.get()
+
+    slow, end_of_stream, latest = asyncio.run(main())
+
+    assert slow.dropped
+    assert end_of_stream is None
+    assert latest.status == "MATCHED"
+    assert broadcaster.stats()["subscribers"] == 1
+    assert broadcaster.stats()["dropped_subscribers"] == 1
+
+
+def test_publish_without_subscribers_is_a_no_op():
+    broadcaster = Broadcaster()
+    broadcaster.publish([event()])
+    assert broadcaster.stats()["published"] == 0
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import close_all_sessions, sessionmaker
+
+from app.entity.base import Base
+from app.entity.idempotency_key import IdempotencyKey
+from app.entity.order import Order
+from app.repo.idempotency_key_repository import IdempotencyKeyRepository
+from app.service.idempotency_key_cleaner import IdempotencyKeyCleaner
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    yield factory
+    close_all_sessions()
+    engine.dispose()
+
+
+def add_keys(session_factory, *expires_in):
+    db = session_factory()
+    order = Order(
+        order_id="uuid-1",
+        created_at=datetime.now(),
+        type="market",
+        side="buy",
+        status="OPEN",
+        instrument="DE0001234567",
+        quantity=10,
+    )
+    db.add(order)
+    db.flush()
+    db.add_all(
+        IdempotencyKey(
+            key=f"key-{i}",
+            request_hash="hash",
+            order_id=order.id,
+            response="{}",
+            expires_at=datetime.now() + timedelta(seconds=seconds),
+        )
+        for i, seconds in enumerate(expires_in)
+    )
+    db.commit()
+    db.close()
+
+
+def test_clean_deletes_only_expired_keys(session_factory):
+    add_keys(session_factory, -60, -1, 3600)
+    cleaner = IdempotencyKeyCleaner(session_factory, batch_size=1)
+
+    assert cleaner.clean() == 2
+
+    keys = session_factory().query(IdempotencyKey.key).all()
+    assert [key for (key,) in keys] == ["key-2"]
+
+
+def test_expired_keys_are_honored_until_deleted(session_factory):
+    add_keys(session_factory, -60)
+    repository = IdempotencyKeyRepository(session_factory())
+
+    assert repository.get("key-0") is not None
+    IdempotencyKeyCleaner(session_factory).clean()
+    assert repository.get("key-0") is None
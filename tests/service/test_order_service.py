@@ -1,11 +1,26 @@
+from datetime import datetime, timedelta
 from unittest.mock import Mock, patch
 
 import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import close_all_sessions, sessionmaker
 
-from app.dto.order_request import CreateOrderModel
+from app.dto.order_request import CreateOrderModel, OrderFilter
 from app.dto.order_response import OrderResponse
+from app.entity.base import Base
+from app.entity.idempotency_key import IdempotencyKey
 from app.entity.order import Order  # Assuming your DB entity is `Order`
+from app.exception.order_exception import (
+    IdempotencyKeyReusedException,
+    OrderBatchTooLargeException,
+    OrderNotFoundException,
+    OrderQueueFullException,
+    OrderStateException,
+)
+from app.mapper.order_mapper import OrderMapper
+from app.service.order_cache import OrderCache
 from app.service.order_service import OrderService
+from app.utils.cache import LRUCache
 
 
 @pytest.fixture
@@ -13,11 +28,14 @@ def mock_dependencies():
     db = Mock()
     mapper = Mock()
     processor = Mock()
+    processor.is_saturated.return_value = False
     return db, mapper, processor
 
 
 @patch("app.service.order_service.OrderRepository")
-@patch("app.service.order_service.IdGenerator.generate", return_value="test-id-123")
+@patch(
+    "app.service.order_service_base.IdGenerator.generate", return_value="test-id-123"
+)
 def test_create_order_success(mock_id_gen, mock_repo_class, mock_dependencies):
     db, mapper, processor = mock_dependencies
     mock_repo = Mock()
@@ -53,7 +71,7 @@ def test_create_order_success(mock_id_gen, mock_repo_class, mock_dependencies):
     # Assert
     mock_id_gen.assert_called_once()
     mapper.to_entity.assert_called_once_with(order_input, "test-id-123")
-    mock_repo.save.assert_called_once_with(fake_entity)
+    mock_repo.save.assert_called_once_with(fake_entity, None)
     processor.enqueue.assert_called_once_with(mock_repo.save.return_value)
     mapper.to_response.assert_called_once_with(mock_repo.save.return_value)
     db.commit.assert_called_once()
@@ -63,3 +81,340 @@ def test_create_order_success(mock_id_gen, mock_repo_class, mock_dependencies):
     assert response.type_ == "market"
     assert response.instrument == "DE0001234567"
     assert response.quantity == 100
+
+
+@patch("app.service.order_service.OrderRepository")
+def test_cancel_order_success(mock_repo_class, mock_dependencies):
+    db, mapper, processor = mock_dependencies
+    mock_repo = Mock()
+    order = Mock(id=1, status="OPEN")
+    mock_repo.get_by_order_id.return_value = order
+    mock_repo.cancel.return_value = True
+    mock_repo_class.return_value = mock_repo
+
+    service = OrderService(db=db, mapper=mapper, processor=processor)
+    service.cancel_order("test-id-123")
+
+    mock_repo.get_by_order_id.assert_called_once_with("test-id-123")
+    processor.cancel.assert_called_once_with(order)
+    mock_repo.cancel.assert_called_once_with(order)
+
+
+@patch("app.service.order_service.OrderRepository")
+def test_cancel_order_is_pushed_to_subscribers(mock_repo_class, mock_dependencies):
+    db, mapper, processor = mock_dependencies
+    mock_repo_class.return_value.get_by_order_id.return_value = Order(
+        id=1, order_id="test-id-123", instrument="DE0001234567", status="OPEN"
+    )
+    mock_repo_class.return_value.cancel.return_value = True
+    broadcaster = Mock()
+    cache = Mock()
+
+    service = OrderService(
+        db=db, mapper=mapper, processor=processor, cache=cache, broadcaster=broadcaster
+    )
+    service.cancel_order("test-id-123")
+
+    (event,) = broadcaster.publish.call_args.args[0]
+    assert (event.order_id, event.status) == ("test-id-123", "CANCELLED")
+    cache.invalidate.assert_called_once_with([1])
+
+
+@patch("app.service.order_service.OrderRepository")
+def test_cancel_order_not_found(mock_repo_class, mock_dependencies):
+    db, mapper, processor = mock_dependencies
+    mock_repo_class.return_value.get_by_order_id.return_value = None
+
+    service = OrderService(db=db, mapper=mapper, processor=processor)
+    with pytest.raises(OrderNotFoundException):
+        service.cancel_order("missing")
+    processor.cancel.assert_not_called()
+
+
+@patch("app.service.order_service.OrderRepository")
+def test_cancel_order_already_matched(mock_repo_class, mock_dependencies):
+    db, mapper, processor = mock_dependencies
+    mock_repo_class.return_value.get_by_order_id.return_value = Mock(
+        id=1, status="MATCHED"
+    )
+
+    service = OrderService(db=db, mapper=mapper, processor=processor)
+    with pytest.raises(OrderStateException):
+        service.cancel_order("test-id-123")
+    processor.cancel.assert_not_called()
+
+
+@patch("app.service.order_service.OrderRepository")
+@patch(
+    "app.service.order_service_base.IdGenerator.generate", return_value="test-id-123"
+)
+def test_create_order_with_outbox(mock_id_gen, mock_repo_class, mock_dependencies):
+    db, mapper, processor = mock_dependencies
+    mock_repo = Mock()
+    mock_repo_class.return_value = mock_repo
+    mapper.to_response.return_value = {
+        "id": "test-id-123",
+        "created_at": "2023-01-01T00:00:00",
+        "type": "market",
+        "side": "buy",
+        "instrument": "DE0001234567",
+        "limit_price": None,
+        "quantity": 100,
+    }
+    service = OrderService(db=db, mapper=mapper, processor=processor, outbox=True)
+
+    service.create_order(
+        CreateOrderModel(
+            type="market", side="buy", instrument="DE0001234567", quantity=100
+        )
+    )
+
+    mock_repo.save_with_outbox.assert_called_once_with(
+        mapper.to_entity.return_value, None
+    )
+    mock_repo.save.assert_not_called()
+    processor.enqueue.assert_called_once_with(mock_repo.save_with_outbox.return_value)
+
+
+@patch("app.service.order_service.OrderRepository")
+def test_create_order_rejected_when_queue_is_full(mock_repo_class, mock_dependencies):
+    db, mapper, processor = mock_dependencies
+    processor.is_saturated.return_value = True
+    service = OrderService(db=db, mapper=mapper, processor=processor, retry_after=3)
+
+    with pytest.raises(OrderQueueFullException) as exc_info:
+        service.create_order(
+            CreateOrderModel(
+                type="market", side="buy", instrument="DE0001234567", quantity=100
+            )
+        )
+
+    assert exc_info.value.retry_after == 3
+    mock_repo_class.return_value.save.assert_not_called()
+    processor.enqueue.assert_not_called()
+
+
+@patch("app.service.order_service.OrderRepository")
+def test_create_orders_reports_results_per_item(mock_repo_class, mock_dependencies):
+    db, mapper, processor = mock_dependencies
+    valid = [Mock(id=1), Mock(id=2)]
+    mapper.batch_to_entities.return_value = (
+        [(0, valid[0]), (2, valid[1])],
+        {1: ["quantity: field required"]},
+    )
+    mapper.to_response.side_effect = lambda order: {
+        "id": f"uuid-{order.id}",
+        "created_at": "2023-01-01T00:00:00",
+        "type": "market",
+        "side": "buy",
+        "instrument": "DE0001234567",
+        "limit_price": None,
+        "quantity": 100,
+    }
+    mock_repo_class.return_value.save_all.side_effect = lambda orders, outbox: orders
+    service = OrderService(db=db, mapper=mapper, processor=processor)
+
+    response = service.create_orders([{}, {}, {}])
+
+    assert (response.accepted, response.rejected) == (2, 1)
+    assert [r.index for r in response.results] == [0, 1, 2]
+    assert response.results[0].order.id == "uuid-1"
+    assert response.results[1].errors == ["quantity: field required"]
+    assert response.results[2].order.id == "uuid-2"
+    mock_repo_class.return_value.save_all.assert_called_once_with(valid, outbox=False)
+    processor.enqueue_many.assert_called_once_with(valid)
+
+
+@patch("app.service.order_service.OrderRepository")
+def test_create_orders_rejects_oversized_batch(mock_repo_class, mock_dependencies):
+    db, mapper, processor = mock_dependencies
+    service = OrderService(db=db, mapper=mapper, processor=processor, max_batch_size=2)
+
+    with pytest.raises(OrderBatchTooLargeException):
+        service.create_orders([{}, {}, {}])
+    mock_repo_class.return_value.save_all.assert_not_called()
+
+
+@patch("app.service.order_service.OrderMatchingRepository")
+@patch("app.service.order_service.OrderRepository")
+def test_get_order_is_served_from_cache_until_invalidated(
+    mock_repo_class, mock_matching_repo_class, mock_dependencies
+):
+    db, _, processor = mock_dependencies
+    mock_repo_class.return_value.get_by_order_id.return_value = Order(
+        id=1,
+        order_id="test-id-123",
+        created_at=datetime(2023, 1, 1),
+        type="limit",
+        side="buy",
+        instrument="DE0001234567",
+        limit_price=10,
+        quantity=40,  # left unfilled
+        status="PARTIAL",
+    )
+    mock_matching_repo_class.return_value.get_by_order_id.return_value = [
+        Mock(id=1, matched_quantity=60, matched_at=datetime(2023, 1, 1, 0, 1))
+    ]
+    cache = OrderCache()
+    service = OrderService(
+        db=db, mapper=OrderMapper(), processor=processor, cache=cache
+    )
+
+    response = service.get_order("test-id-123")
+    assert response.status == "PARTIAL"
+    assert response.quantity == 100
+    assert response.filled_quantity == 60
+    assert response.remaining_quantity == 40
+    assert response.fills[0].matched_quantity == 60
+
+    assert service.get_order("test-id-123") is response
+    mock_repo_class.return_value.get_by_order_id.assert_called_once_with("test-id-123")
+
+    # The processor reports changed orders by primary key
+    cache.invalidate([1])
+    service.get_order("test-id-123")
+    assert mock_repo_class.return_value.get_by_order_id.call_count == 2
+
+
+@patch("app.service.order_service.OrderRepository")
+def test_get_order_not_found(mock_repo_class, mock_dependencies):
+    db, mapper, processor = mock_dependencies
+    mock_repo_class.return_value.get_by_order_id.return_value = None
+
+    service = OrderService(db=db, mapper=mapper, processor=processor)
+    with pytest.raises(OrderNotFoundException):
+        service.get_order("missing")
+
+
+@patch("app.service.order_service.OrderRepository")
+def test_list_orders_returns_cursor_of_last_item(mock_repo_class, mock_dependencies):
+    db, _, processor = mock_dependencies
+    mock_repo_class.return_value.list_page.return_value = [
+        Order(
+            id=i,
+            order_id=f"uuid-{i}",
+            created_at=datetime(2023, 1, 1),
+            type="market",
+            side="buy",
+            instrument="DE0001234567",
+            quantity=10,
+            status="OPEN",
+        )
+        for i in (4, 5, 6)
+    ]
+    service = OrderService(db=db, mapper=OrderMapper(), processor=processor)
+
+    page = service.list_orders(OrderFilter(), after=3, limit=2)
+
+    assert [item.id for item in page.items] == ["uuid-4", "uuid-5"]
+    assert page.next_cursor == 5
+
+    mock_repo_class.return_value.list_page.return_value = []
+    assert service.list_orders(OrderFilter(), after=6, limit=2).next_cursor is None
+
+
+@pytest.fixture
+def sqlite_session_factory():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    yield factory
+    close_all_sessions()
+    engine.dispose()
+
+
+def limit_order(quantity=100):
+    return CreateOrderModel(
+        type="limit",
+        side="buy",
+        instrument="DE0001234567",
+        limit_price="10.50",
+        quantity=quantity,
+    )
+
+
+@pytest.mark.parametrize("cache", [None, LRUCache()])
+def test_retried_order_is_created_once(sqlite_session_factory, cache):
+    processor = Mock()
+    processor.is_saturated.return_value = False
+
+    def create(order):
+        # Every request has its own session and service
+        db = sqlite_session_factory()
+        service = OrderService(
+            db=db, mapper=OrderMapper(), processor=processor, idempotency_cache=cache
+        )
+        return service.create_order(order, idempotency_key="key-1")
+
+    first = create(limit_order())
+    retry = create(limit_order())
+
+    assert retry == first
+    assert sqlite_session_factory().query(Order).count() == 1
+    processor.enqueue.assert_called_once()
+    with pytest.raises(IdempotencyKeyReusedException):
+        create(limit_order(quantity=5))
+
+
+def test_replayed_order_matches_the_stored_order(sqlite_session_factory):
+    processor = Mock()
+    processor.is_saturated.return_value = False
+    db = sqlite_session_factory()
+    service = OrderService(db=db, mapper=OrderMapper(), processor=processor)
+
+    created = service.create_order(limit_order(), idempotency_key="key-1")
+
+    # MySQL keeps whole seconds, the response must not carry more
+    assert "." not in created.created_at
+    assert service.create_order(limit_order(), idempotency_key="key-1") == created
+
+
+def test_idempotency_key_expires_after_its_ttl(sqlite_session_factory):
+    processor = Mock()
+    processor.is_saturated.return_value = False
+    db = sqlite_session_factory()
+    service = OrderService(
+        db=db, mapper=OrderMapper(), processor=processor, idempotency_key_ttl=60
+    )
+
+    service.create_order(limit_order(), idempotency_key="key-1")
+
+    key = db.query(IdempotencyKey).get("key-1")
+    ttl = key.expires_at - key.created_at
+    assert abs(ttl - timedelta(seconds=60)) < timedelta(seconds=1)
+
+
+def test_concurrent_retry_loses_the_insert(sqlite_session_factory):
+    processor = Mock()
+    processor.is_saturated.return_value = False
+    db = sqlite_session_factory()
+    service = OrderService(db=db, mapper=OrderMapper(), processor=processor)
+    first = service.create_order(limit_order(), idempotency_key="key-1")
+
+    # The other request saw no key yet and inserts its order anyway
+    with patch(
+        "app.service.order_service.IdempotencyKeyRepository.get",
+        side_effect=[None, db.query(IdempotencyKey).get("key-1")],
+    ):
+        retry = service.create_order(limit_order(), idempotency_key="key-1")
+
+    assert retry == first
+    assert db.query(Order).count() == 1
+    processor.enqueue.assert_called_once()
+
+
+def test_created_order_response_matches_validated_response(sqlite_session_factory):
+    processor = Mock()
+    processor.is_saturated.return_value = False
+    service = OrderService(
+        db=sqlite_session_factory(), mapper=OrderMapper(), processor=processor
+    )
+
+    response = service.create_order(limit_order())
+
+    # Built without validation, it must serialize like a validated one
+    assert response.dict(by_alias=True) == OrderResponse(
+        **response.dict(by_alias=True)
+    ).dict(by_alias=True)
+    assert response.limit_price == 10.5
+    assert isinstance(response.limit_price, float)
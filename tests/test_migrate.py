@@ -0,0 +1,33 @@
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+from app.migrate import migrate_fixed_point_prices
+from app.utils.price import TickSizes
+
+
+def test_backfills_ticks_with_each_instruments_tick_size():
+    cursor = MagicMock()
+    cursor.fetchone.return_value = (0,)  # limit_price_ticks does not exist yet
+    cursor.fetchall.return_value = [
+        (1, "DE0005557508", Decimal("10.05")),
+        (2, "US0378331005", Decimal("10.50")),
+        (3, "US0378331005", Decimal("10.55")),  # off the 0.5 grid
+    ]
+    sizes = TickSizes(overrides={"US0378331005": Decimal("0.5")})
+
+    with patch("app.migrate.tick_sizes", sizes):
+        migrate_fixed_point_prices(cursor, "lemon_markets")
+
+    cursor.executemany.assert_called_once()
+    updates = cursor.executemany.call_args[0][1]
+    assert updates == [(1005, 1), (21, 2), (21, 3)]
+
+
+def test_skips_migrated_tables():
+    cursor = MagicMock()
+    cursor.fetchone.return_value = (1,)
+
+    migrate_fixed_point_prices(cursor, "lemon_markets")
+
+    assert cursor.execute.call_count == 1
+    cursor.executemany.assert_not_called()
@@ -0,0 +1,46 @@
+import time
+
+from app.utils.cache import LRUCache
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = LRUCache(ttl=0.01)
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_invalidate_drops_entries():
+    cache = LRUCache()
+    cache.put("a", 1)
+    cache.invalidate(["a", "missing"])
+
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_value_loaded_before_invalidation_is_not_cached():
+    cache = LRUCache()
+    loaded_at = time.monotonic()
+    cache.invalidate(["a"])  # the data changed while it was being loaded
+
+    assert not cache.put("a", "stale", since=loaded_at)
+    assert cache.get("a") is None
+    assert cache.put("a", "fresh", since=time.monotonic())
+    assert cache.get("a") == "fresh"
@@ -0,0 +1,55 @@
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import Mock
+
+from app.dto.types import ExportFormat
+from app.utils.export import iter_export
+
+ROWS = [
+    ("uuid-1", Decimal("10.50"), datetime(2025, 4, 19, 12, 0)),
+    ("uuid-2", None, datetime(2025, 4, 19, 12, 1)),
+]
+
+
+def fake_result(rows, chunk_size):
+    result = Mock()
+    result.keys.return_value = ["id", "limit_price", "created_at"]
+    result.partitions.return_value = [
+        rows[i : i + chunk_size] for i in range(0, len(rows), chunk_size)
+    ]
+    return result
+
+
+def test_ndjson_export_streams_one_chunk_per_partition():
+    result = fake_result(ROWS, 1)
+
+    chunks = list(iter_export(result, ExportFormat.NDJSON, chunk_size=1))
+
+    assert chunks == [
+        '{"id": "uuid-1", "limit_price": 10.5, "created_at": "2025-04-19T12:00:00"}\n',
+        '{"id": "uuid-2", "limit_price": null, "created_at": "2025-04-19T12:01:00"}\n',
+    ]
+    result.partitions.assert_called_once_with(1)
+    result.close.assert_called_once()
+
+
+def test_csv_export_starts_with_a_header():
+    result = fake_result(ROWS, 2)
+
+    body = "".join(iter_export(result, ExportFormat.CSV, chunk_size=2))
+
+    assert body.splitlines() == [
+        "id,limit_price,created_at",
+        "uuid-1,10.5,2025-04-19T12:00:00",
+        "uuid-2,,2025-04-19T12:01:00",
+    ]
+
+
+def test_abandoned_export_closes_the_result():
+    result = fake_result(ROWS, 1)
+
+    chunks = iter_export(result, ExportFormat.NDJSON, chunk_size=1)
+    next(chunks)
+    chunks.close()
+
+    result.close.assert_called_once()
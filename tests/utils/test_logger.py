@@ -0,0 +1,62 @@
+import json
+import logging
+from logging.handlers import QueueHandler
+
+from app.utils.logger import JsonFormatter, RateLimitFilter, get_logger
+
+
+def record(msg, *args, level=logging.INFO, name="test"):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_json_formatter_writes_one_object_per_record():
+    entry = record("Order %s created", "abc")
+    entry.suppressed = 3
+
+    line = JsonFormatter().format(entry)
+
+    assert "\n" not in line
+    parsed = json.loads(line)
+    assert parsed["message"] == "Order abc created"
+    assert parsed["level"] == "INFO"
+    assert parsed["logger"] == "test"
+    assert parsed["suppressed"] == 3
+
+
+def test_rate_limit_suppresses_excess_records_per_message():
+    clock = FakeClock()
+    limit = RateLimitFilter(rate=2, clock=clock)
+
+    passed = [limit.filter(record("Order %s created", i)) for i in range(5)]
+    other = limit.filter(record("Order %s cancelled", 1))
+    warning = limit.filter(record("Order %s created", 9, level=logging.WARNING))
+
+    assert passed == [True, True, False, False, False]
+    assert other and warning
+
+    clock.now = 1.0
+    next_second = record("Order %s created", 5)
+    assert limit.filter(next_second)
+    assert next_second.suppressed == 3
+
+
+def test_rate_limit_of_zero_passes_everything():
+    limit = RateLimitFilter(rate=0, clock=FakeClock())
+
+    assert all(limit.filter(record("Order %s created", i)) for i in range(100))
+
+
+def test_loggers_share_one_queue_handler():
+    first = get_logger("test_logger_a")
+    second = get_logger("test_logger_b")
+
+    assert isinstance(first.handlers[0], QueueHandler)
+    assert first.handlers == second.handlers
@@ -0,0 +1,67 @@
+import pytest
+
+from app.utils.metrics import Registry
+
+
+def test_counter_and_gauge_are_rendered():
+    registry = Registry()
+    registry.counter("orders", "Orders seen").inc(2)
+    registry.gauge("depth", "Queue depth").set(5)
+
+    text = registry.render()
+
+    assert "# TYPE orders counter\norders_total 2\n" in text
+    assert "# TYPE depth gauge\ndepth 5\n" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    histogram = registry.histogram(
+        "stage_seconds", "Stage time", ("stage",), buckets=(0.1, 1.0)
+    )
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.labels("save").observe(value)
+
+    lines = registry.render().splitlines()
+
+    assert 'stage_seconds_bucket{stage="save",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="save",le="1"} 3' in lines
+    assert 'stage_seconds_bucket{stage="save",le="+Inf"} 4' in lines
+    assert 'stage_seconds_count{stage="save"} 4' in lines
+    assert 'stage_seconds_sum{stage="save"} 4.05' in lines
+
+
+def test_metrics_are_shared_by_name():
+    registry = Registry()
+    first = registry.counter("orders", "Orders seen")
+
+    assert registry.counter("orders", "Orders seen") is first
+    with pytest.raises(ValueError):
+        registry.gauge("orders", "Orders seen")
+
+
+def test_gauge_callbacks_are_read_at_scrape_time():
+    registry = Registry()
+    depth = {("XYZ", "buy"): 1}
+    registry.gauge("book", "Book depth", ("instrument", "side"), callback=lambda: depth)
+    depth[("XYZ", "sell")] = 2
+
+    lines = registry.render().splitlines()
+
+    assert 'book{instrument="XYZ",side="buy"} 1' in lines
+    assert 'book{instrument="XYZ",side="sell"} 2' in lines
+
+
+def test_failing_callback_does_not_hide_other_metrics():
+    registry = Registry()
+    registry.gauge("broken", "Broken", callback=lambda: 1 / 0)
+    registry.counter("orders", "Orders seen").inc()
+
+    assert "orders_total 1" in registry.render()
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.counter("errors", "Errors", ("reason",)).labels('say "hi"\n').inc()
+
+    assert 'errors_total{reason="say \\"hi\\"\\n"} 1' in registry.render()
@@ -0,0 +1,48 @@
+from decimal import Decimal
+
+import pytest
+
+from app.utils.price import DEFAULT_TICK_SIZE, TickSizes
+
+
+@pytest.fixture
+def tick_sizes():
+    return TickSizes(overrides={"DE0001234567": Decimal("0.05")})
+
+
+def test_to_ticks_default_tick_size(tick_sizes):
+    assert tick_sizes.tick_size("DE0009876543") == DEFAULT_TICK_SIZE
+    assert tick_sizes.to_ticks("DE0009876543", Decimal("123.45")) == 12345
+    assert tick_sizes.to_ticks("DE0009876543", 100.1) == 10010
+
+
+def test_to_ticks_instrument_tick_size(tick_sizes):
+    assert tick_sizes.to_ticks("DE0001234567", Decimal("10.05")) == 201
+
+
+def test_to_ticks_rejects_prices_off_the_grid(tick_sizes):
+    with pytest.raises(ValueError):
+        tick_sizes.to_ticks("DE0001234567", Decimal("10.01"))
+
+
+def test_from_ticks_round_trips(tick_sizes):
+    ticks = tick_sizes.to_ticks("DE0001234567", Decimal("10.05"))
+    assert tick_sizes.from_ticks("DE0001234567", ticks) == Decimal("10.05")
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("DEFAULT_TICK_SIZE", "0.02")
+    monkeypatch.setenv("TICK_SIZES", "DE0001234567=0.5, DE0009876543=1")
+    tick_sizes = TickSizes.from_env()
+    assert tick_sizes.default == Decimal("0.02")
+    assert tick_sizes.tick_size("DE0001234567") == Decimal("0.5")
+    assert tick_sizes.tick_size("DE0009876543") == Decimal("1")
+
+
+@pytest.mark.parametrize(
+    "default, overrides",
+    [("0.001", {}), ("0", {}), ("0.01", {"DE0001234567": "0.005"})],
+)
+def test_rejects_tick_sizes_finer_than_a_cent(default, overrides):
+    with pytest.raises(ValueError):
+        TickSizes(Decimal(default), overrides)
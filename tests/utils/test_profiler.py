@@ -0,0 +1,82 @@
+import threading
+import time
+
+from app.utils.profiler import (
+    RequestProfile,
+    RequestProfiler,
+    SamplingProfiler,
+    call_profiled,
+    current_request_profile,
+)
+
+
+def busy_matching(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampling_profiler_collapses_thread_stacks():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_matching, args=(stop,), name="worker")
+    worker.start()
+    profiler = SamplingProfiler(interval=0.001)
+    try:
+        assert profiler.start(seconds=5)
+        assert not profiler.start(seconds=5)  # one window at a time
+        time.sleep(0.1)
+        profiler.stop()
+    finally:
+        stop.set()
+        worker.join()
+
+    lines = profiler.collapsed().splitlines()
+    worker_lines = [line for line in lines if line.startswith("worker;")]
+    assert worker_lines
+    stack, count = worker_lines[0].rsplit(" ", 1)
+    assert "busy_matching (test_profiler.py:" in stack
+    assert int(count) > 0
+    assert not profiler.running
+    assert profiler.stats()["samples"] == sum(
+        int(line.rsplit(" ", 1)[1]) for line in lines
+    )
+
+
+def test_sampling_profiler_writes_output_when_window_ends(tmp_path):
+    output = tmp_path / "profile.folded"
+    profiler = SamplingProfiler(interval=0.001, output=str(output))
+
+    profiler.start(seconds=0.05)
+    profiler._thread.join()
+
+    assert output.read_text() == profiler.collapsed()
+
+
+def test_request_profiler_samples_one_in_every():
+    request_profiler = RequestProfiler(every=3)
+
+    sampled = [request_profiler.begin("GET", "/orders") for _ in range(6)]
+
+    # Only one request is profiled at a time
+    assert [profile is not None for profile in sampled] == [False, False, True] + [
+        False
+    ] * 3
+    request_profiler.end(sampled[2])
+    assert request_profiler.begin("GET", "/orders") is None
+    assert request_profiler.begin("GET", "/orders") is None
+    assert request_profiler.begin("GET", "/orders") is not None
+    assert request_profiler.reports[0]["path"] == "/orders"
+
+
+def test_call_profiled_records_into_sampled_request():
+    assert call_profiled(sum, [1, 2]) == 3
+
+    request_profile = RequestProfile("POST", "/orders/")
+    stop = threading.Event()
+    stop.set()
+    token = current_request_profile.set(request_profile)
+    try:
+        assert call_profiled(busy_matching, stop) is None
+    finally:
+        current_request_profile.reset(token)
+
+    assert "busy_matching" in request_profile.report()
@@ -1,3 +1,4 @@
+import time
 from datetime import datetime
 from decimal import Decimal
 from unittest.mock import Mock
@@ -7,7 +8,23 @@ from fastapi.testclient import TestClient
 
 from app.api import get_app  # Ensure the app is imported
 from app.config import app_config
-from app.dto.order_response import OrderResponse
+from app.dto.order_response import (
+    BatchOrderResponse,
+    BatchOrderResult,
+    OrderPageResponse,
+    OrderResponse,
+    OrderStatusResponse,
+)
+from app.dto.types import ExportFormat, OrderSide
+from app.exception.order_exception import (
+    IdempotencyKeyReusedException,
+    OrderNotFoundException,
+    OrderQueueFullException,
+    OrderStateException,
+)
+from app.processor.order_event import OrderEvent
+from app.service.async_order_service import AsyncOrderService
+from app.service.broadcaster import Broadcaster
 from app.service.order_service import OrderService
 
 
@@ -77,6 +94,7 @@ def test_create_limit_order_success(client: TestClient, mock_order_service):
     assert response.status_code == 201
     assert response.json()["type"] == "limit"
     assert response.json()["limit_price"] == 123.45
+    assert response.headers["content-type"] == "application/json"
 
 
 def test_market_order_with_limit_price_should_fail(client: TestClient):
@@ -156,3 +174,364 @@ def test_invalid_order_side_should_fail(client: TestClient):
     response = client.post("/orders/", json=order_data)
     assert response.status_code == 422
     assert "side" in response.text
+
+
+def test_cancel_order_success(client: TestClient, mock_order_service):
+    mock_order_service.cancel_order.return_value = None
+
+    response = client.delete("/orders/test-id-123")
+
+    assert response.status_code == 204
+    mock_order_service.cancel_order.assert_called_once_with("test-id-123")
+
+
+def test_cancel_order_not_found(client: TestClient, mock_order_service):
+    mock_order_service.cancel_order.side_effect = OrderNotFoundException("not found")
+
+    response = client.delete("/orders/missing")
+
+    assert response.status_code == 404
+
+
+def test_cancel_order_already_matched(client: TestClient, mock_order_service):
+    mock_order_service.cancel_order.side_effect = OrderStateException("matched")
+
+    response = client.delete("/orders/test-id-123")
+
+    assert response.status_code == 409
+
+
+def test_create_order_queue_full(client: TestClient, mock_order_service):
+    mock_order_service.create_order.side_effect = OrderQueueFullException(
+        "queue full", retry_after=2
+    )
+
+    response = client.post(
+        "/orders/",
+        json={
+            "type": "market",
+            "side": "buy",
+            "instrument": "DE0001234567",
+            "quantity": 100,
+        },
+    )
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
+
+
+def test_processor_stats(client: TestClient, mock_order_service):
+    mock_order_service.processor_stats.return_value = {"queue_depth": 3}
+
+    response = client.get("/processor/stats")
+
+    assert response.status_code == 200
+    assert response.json() == {"queue_depth": 3}
+
+
+def test_async_service_is_awaited():
+    mock_service = Mock(spec=AsyncOrderService)
+    app = get_app()
+    app.dependency_overrides[app_config.get_order_service] = lambda: mock_service
+
+    response = TestClient(app).delete("/orders/test-id-123")
+
+    assert response.status_code == 204
+    mock_service.cancel_order.assert_awaited_once_with("test-id-123")
+
+
+def test_order_service_is_built_per_request(monkeypatch):
+    factory = Mock(side_effect=lambda db: Mock(db=db))
+    monkeypatch.setattr(app_config, "order_service_factory", factory)
+    first, second = Mock(), Mock()
+
+    assert app_config.get_order_service(first).db is first
+    assert app_config.get_order_service(second).db is second
+
+
+def test_database_pool_stats():
+    response = TestClient(get_app()).get("/database/pool")
+
+    assert response.status_code == 200
+    assert set(response.json()) == {"sync", "async"}
+    assert "avg_wait_ms" in response.json()["sync"]
+
+
+def batch_response():
+    return BatchOrderResponse(
+        accepted=0,
+        rejected=1,
+        results=[BatchOrderResult(index=0, errors=["quantity: field required"])],
+    )
+
+
+def test_create_orders_from_json_array(client: TestClient, mock_order_service):
+    mock_order_service.create_orders.return_value = batch_response()
+
+    response = client.post("/orders/batch", json=[{"type": "market"}])
+
+    assert response.status_code == 200
+    assert response.json()["results"][0]["errors"] == ["quantity: field required"]
+    mock_order_service.create_orders.assert_called_once_with([{"type": "market"}])
+
+
+def test_create_orders_from_ndjson(client: TestClient, mock_order_service):
+    mock_order_service.create_orders.return_value = batch_response()
+
+    response = client.post(
+        "/orders/batch",
+        data=b'{"type": "market"}\n\n{"type": "limit"}\n',
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 200
+    mock_order_service.create_orders.assert_called_once_with(
+        [{"type": "market"}, {"type": "limit"}]
+    )
+
+
+def test_create_orders_malformed_batch(client: TestClient, mock_order_service):
+    response = client.post("/orders/batch", json={"type": "market"})
+
+    assert response.status_code == 400
+    mock_order_service.create_orders.assert_not_called()
+
+
+def test_get_order(client: TestClient, mock_order_service):
+    mock_order_service.get_order.return_value = OrderStatusResponse(
+        id="1",
+        created_at="2023-01-01T00:00:00",
+        type="limit",
+        side="buy",
+        instrument="DE0001234567",
+        limit_price=10.0,
+        quantity=100,
+        status="PARTIAL",
+        filled_quantity=60,
+        remaining_quantity=40,
+        fills=[{"matched_quantity": 60, "matched_at": "2023-01-01T00:01:00"}],
+    )
+
+    response = client.get("/orders/1")
+
+    assert response.status_code == 200
+    assert response.json()["type"] == "limit"
+    assert response.json()["remaining_quantity"] == 40
+    assert response.json()["fills"][0]["matched_quantity"] == 60
+    mock_order_service.get_order.assert_called_once_with("1")
+
+
+def test_get_order_not_found(client: TestClient, mock_order_service):
+    mock_order_service.get_order.side_effect = OrderNotFoundException(
+        "Order missing not found"
+    )
+
+    response = client.get("/orders/missing")
+
+    assert response.status_code == 404
+
+
+def test_list_orders(client: TestClient, mock_order_service):
+    mock_order_service.list_orders.return_value = OrderPageResponse(
+        items=[
+            {
+                "id": "1",
+                "created_at": "2023-01-01T00:00:00",
+                "type": "market",
+                "side": "buy",
+                "instrument": "DE0001234567",
+                "limit_price": None,
+                "quantity": 100,
+                "status": "OPEN",
+            }
+        ],
+        next_cursor=7,
+    )
+
+    response = client.get("/orders/", params={"side": "buy", "after": 3, "limit": 1})
+
+    assert response.status_code == 200
+    assert response.json()["items"][0]["status"] == "OPEN"
+    assert response.json()["next_cursor"] == 7
+    filters, after, limit = mock_order_service.list_orders.call_args.args
+    assert filters.side is OrderSide.BUY
+    assert filters.instrument is None
+    assert (after, limit) == (3, 1)
+
+
+def test_list_orders_rejects_invalid_filters(client: TestClient):
+    assert client.get("/orders/", params={"status": "UNKNOWN"}).status_code == 422
+    assert client.get("/orders/", params={"limit": 0}).status_code == 422
+
+
+def test_export_orders_streams_csv(client: TestClient, mock_order_service):
+    mock_order_service.export_orders.return_value = iter(["id\n", "1\n", "2\n"])
+
+    response = client.get("/orders/export", params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "orders.csv" in response.headers["content-disposition"]
+    assert response.text == "id\n1\n2\n"
+    assert mock_order_service.export_orders.call_args.args[1] is ExportFormat.CSV
+
+
+def test_export_fills_streams_ndjson(client: TestClient, mock_order_service):
+    mock_order_service.export_fills.return_value = iter(['{"id": 1}\n'])
+
+    response = client.get("/orders/fills/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.text == '{"id": 1}\n'
+
+
+def order_event(order_id="1", status="MATCHED"):
+    return OrderEvent(1, order_id, "DE0001234567", status, 0, datetime(2025, 4, 19))
+
+
+def test_websocket_pushes_order_events(client: TestClient):
+    broadcaster = Broadcaster()
+    client.app.dependency_overrides[app_config.get_broadcaster] = lambda: broadcaster
+
+    with client.websocket_connect("/ws/orders?order_id=1") as websocket:
+        while not broadcaster.stats()["subscribers"]:
+            time.sleep(0.001)
+        broadcaster.publish([order_event("2"), order_event("1")])
+        message = websocket.receive_json()
+
+    assert message["id"] == "1"
+    assert message["status"] == "MATCHED"
+    assert message["remaining_quantity"] == 0
+
+
+def test_sse_streams_events_until_dropped(client: TestClient):
+    class ReplayBroadcaster(Broadcaster):
+        def subscribe(self, order_ids=(), instrument=None):
+            subscription = super().subscribe(order_ids, instrument)
+            subscription.queue.put_nowait(order_event(status="PARTIAL"))
+            subscription.queue.put_nowait(None)  # dropped as a slow consumer
+            return subscription
+
+    broadcaster = ReplayBroadcaster()
+    client.app.dependency_overrides[app_config.get_broadcaster] = lambda: broadcaster
+
+    response = client.get("/sse/orders")
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = response.text.split("\n\n")
+    assert events[0].startswith("event: order\ndata: ")
+    assert '"status": "PARTIAL"' in events[0]
+    assert events[1] == "event: dropped\ndata: {}"
+    assert broadcaster.stats()["subscribers"] == 0
+
+
+def test_create_order_passes_idempotency_key(client: TestClient, mock_order_service):
+    mock_order_service.create_order.return_value = OrderResponse(
+        id="1",
+        created_at="2023-01-01T00:00:00",
+        type="market",
+        side="buy",
+        instrument="DE0001234567",
+        limit_price=None,
+        quantity=100,
+    )
+    order_data = {
+        "type": "market",
+        "side": "buy",
+        "instrument": "DE0001234567",
+        "quantity": 100,
+    }
+
+    response = client.post(
+        "/orders/", json=order_data, headers={"Idempotency-Key": "key-1"}
+    )
+
+    assert response.status_code == 201
+    assert mock_order_service.create_order.call_args.args[1] == "key-1"
+    assert (
+        client.post(
+            "/orders/", json=order_data, headers={"Idempotency-Key": "k" * 129}
+        ).status_code
+        == 422
+    )
+
+
+def test_reused_idempotency_key(client: TestClient, mock_order_service):
+    mock_order_service.create_order.side_effect = IdempotencyKeyReusedException(
+        "Idempotency key key-1 was already used for another order"
+    )
+
+    response = client.post(
+        "/orders/",
+        json={
+            "type": "market",
+            "side": "buy",
+            "instrument": "DE0001234567",
+            "quantity": 100,
+        },
+        headers={"Idempotency-Key": "key-1"},
+    )
+
+    assert response.status_code == 422
+    assert "already used" in response.json()["detail"]["message"]
+
+
+def test_metrics_exposes_request_latency(client: TestClient, mock_order_service):
+    mock_order_service.processor_stats.return_value = {"queue_depth": 0}
+    client.get("/processor/stats")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE order_stage_seconds histogram" in response.text
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        'handler="processor_stats",status="200"}'
+    ) in response.text
+
+
+def test_admin_endpoints_require_the_admin_token(client: TestClient, monkeypatch):
+    assert client.get("/admin/profile").status_code == 403  # no ADMIN_TOKEN set
+
+    monkeypatch.setattr(app_config, "admin_token", "secret")
+    assert client.get("/admin/profile").status_code == 403
+    response = client.get("/admin/profile", headers={"X-Admin-Token": "wrong"})
+    assert response.status_code == 403
+    response = client.get("/admin/profile", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+
+
+def test_profile_window_returns_collapsed_stacks(client: TestClient, monkeypatch):
+    monkeypatch.setattr(app_config, "admin_token", "secret")
+    headers = {"X-Admin-Token": "secret"}
+
+    response = client.post("/admin/profile?seconds=5&interval=0.001", headers=headers)
+    assert response.status_code == 202
+    assert response.json()["running"]
+    assert client.post("/admin/profile", headers=headers).status_code == 409
+    time.sleep(0.05)
+    assert not client.delete("/admin/profile", headers=headers).json()["running"]
+
+    stacks = client.get("/admin/profile", headers=headers).text
+    assert "order-processor;" in stacks
+
+
+def test_sampled_requests_are_profiled(
+    client: TestClient, mock_order_service, monkeypatch
+):
+    monkeypatch.setattr(app_config, "admin_token", "secret")
+    headers = {"X-Admin-Token": "secret"}
+    mock_order_service.get_order.side_effect = OrderNotFoundException("missing")
+
+    client.put("/admin/profile/requests?every=1", headers=headers)
+    try:
+        client.get("/orders/abc")
+    finally:
+        client.put("/admin/profile/requests?every=0", headers=headers)
+
+    reports = client.get("/admin/profile/requests", headers=headers).json()
+    report = next(report for report in reports if report["path"] == "/orders/abc")
+    assert report["method"] == "GET"
+    assert "get_order" in report["report"]